@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 import pandas as pd
-import ast
-from collections import Counter
+
+from table_cache import TABLES_DIR, load_nested_tables
+from tmdb_parsing import parse_nested_columns
 
 MOVIES_CSV = "tmdb_5000_movies.csv"
 CREDITS_CSV = "tmdb_5000_credits.csv"
@@ -11,18 +12,9 @@ pd.set_option("display.max_columns", 50)
 pd.set_option("display.width", 200)
 
 
-def safe_parse_list(value):
-    """
-    tmdb поля (genres, keywords, cast, crew, ...) — это строки вида:
-    "[{'id': 28, 'name': 'Action'}, ...]"
-    После чтения через pandas это обычно валидный Python-литерал.
-    """
-    if not isinstance(value, str) or not value.strip():
-        return []
-    try:
-        return ast.literal_eval(value)
-    except Exception:
-        return []
+# tmdb поля (genres, keywords, cast, crew, ...) — это JSON-строки вида
+# "[{"id": 28, "name": "Action"}, ...]"; их разбор целыми колонками — в tmdb_parsing,
+# а разобранные таблицы кэшируются в tmdb_tables/ (table_cache) и читаются через mmap
 
 
 def analyze_movies(path: str = MOVIES_CSV):
@@ -55,67 +47,49 @@ def analyze_movies(path: str = MOVIES_CSV):
     print("\nБазовая статистика по численным полям:")
     print(movies[num_cols].describe(percentiles=[0.25, 0.5, 0.75, 0.9, 0.99]))
 
-    # Разбор жанров
-    all_genres = Counter()
-    for s in movies["genres"]:
-        for g in safe_parse_list(s):
-            name = g.get("name")
-            if name:
-                all_genres[name] += 1
+    # Разбор жанров (вся колонка разом)
+    genres = load_nested_tables(movies_csv=path, names=["genres"], categorical=True)["genres"]
+    all_genres = genres["name"].dropna()
+    all_genres = all_genres[all_genres != ""].value_counts()
 
     print("\nТоп-20 жанров по количеству фильмов:")
-    for genre, cnt in all_genres.most_common(20):
+    for genre, cnt in all_genres.head(20).items():
         print(f"{genre:25s} {cnt:5d}")
 
     # Пример: сколько жанров в среднем у фильма
-    num_genres_per_movie = movies["genres"].apply(lambda s: len(safe_parse_list(s)))
+    num_genres_per_movie = (
+        genres.groupby("movie_id").size()
+        .reindex(movies["id"], fill_value=0)
+        .reset_index(drop=True)
+    )
     print("\nСколько жанров на фильм (описательная статистика):")
     print(num_genres_per_movie.describe())
 
     return movies
 
 
-def explode_credits(credits: pd.DataFrame):
+def explode_credits(credits: pd.DataFrame, tables=None):
     """
     Разворачиваем cast и crew в таблички:
     - cast_exploded: одна строка на актёра в фильме
     - crew_exploded: одна строка на члена съёмочной группы в фильме
+    tables — уже разобранные cast/crew (например, из table_cache).
     """
+    if tables is None:
+        tables = parse_nested_columns(credits, id_column="movie_id", columns=["cast", "crew"])
+    titles = credits.drop_duplicates("movie_id").set_index("movie_id")["title"]
+
     # CAST
-    cast_records = []
-    for _, row in credits.iterrows():
-        movie_id = row["movie_id"]
-        title = row["title"]
-        for c in safe_parse_list(row["cast"]):
-            cast_records.append({
-                "movie_id": movie_id,
-                "movie_title": title,
-                "person_id": c.get("id"),
-                "person_name": c.get("name"),
-                "character": c.get("character"),
-                "order": c.get("order"),
-                "cast_id": c.get("cast_id"),
-                "gender": c.get("gender"),
-            })
-    cast_exploded = pd.DataFrame(cast_records)
+    cast_exploded = tables["cast"].rename(columns={"name": "person_name"})
+    cast_exploded.insert(1, "movie_title", cast_exploded["movie_id"].map(titles))
+    cast_exploded = cast_exploded[["movie_id", "movie_title", "person_id", "person_name",
+                                   "character", "order", "cast_id", "gender"]]
 
     # CREW
-    crew_records = []
-    for _, row in credits.iterrows():
-        movie_id = row["movie_id"]
-        title = row["title"]
-        for c in safe_parse_list(row["crew"]):
-            crew_records.append({
-                "movie_id": movie_id,
-                "movie_title": title,
-                "person_id": c.get("id"),
-                "person_name": c.get("name"),
-                "job": c.get("job"),
-                "department": c.get("department"),
-                "credit_id": c.get("credit_id"),
-                "gender": c.get("gender"),
-            })
-    crew_exploded = pd.DataFrame(crew_records)
+    crew_exploded = tables["crew"].rename(columns={"name": "person_name"})
+    crew_exploded.insert(1, "movie_title", crew_exploded["movie_id"].map(titles))
+    crew_exploded = crew_exploded[["movie_id", "movie_title", "person_id", "person_name",
+                                   "job", "department", "credit_id", "gender"]]
 
     return cast_exploded, crew_exploded
 
@@ -126,7 +100,8 @@ def analyze_credits(path: str = CREDITS_CSV):
     print(f"Всего записей в credits (по фильмам): {len(credits)}")
     print("Колонки:", credits.columns.tolist())
 
-    cast_exploded, crew_exploded = explode_credits(credits)
+    cast_exploded, crew_exploded = explode_credits(
+        credits, load_nested_tables(credits_csv=path, names=["cast", "crew"], categorical=True))
 
     print(f"\nCast (актёры): {len(cast_exploded)} строк (actor-in-movie)")
     print(f"Crew (съёмочная группа): {len(crew_exploded)} строк (crew-member-in-movie)")
@@ -172,15 +147,12 @@ def analyze_credits(path: str = CREDITS_CSV):
     char_counts = cast_exploded["character"].value_counts().head(30)
     char_counts.to_csv("cast_character_stats.csv", header=["count"])
 
-    cast_exploded.to_csv("cast_exploded_sample.csv", index=False)
-    crew_exploded.to_csv("crew_exploded_sample.csv", index=False)
-
     print("\nСводки сохранены в файлы:")
     print("  - crew_jobs_stats.csv (job -> count)")
     print("  - crew_job_department_stats.csv (job, department, count)")
     print("  - cast_character_stats.csv (character -> count)")
-    print("  - cast_exploded_sample.csv (полная 'плоская' cast-таблица)")
-    print("  - crew_exploded_sample.csv (полная 'плоская' crew-таблица)")
+    print(f"Плоские cast/crew/genres/... таблицы: {TABLES_DIR}/*.feather "
+          "(pd.read_feather или table_cache.read_table)")
 
     return credits, cast_exploded, crew_exploded
 
@@ -194,6 +166,7 @@ def main():
     directing_jobs = (
         crew_exploded[crew_exploded["department"] == "Directing"]["job"]
         .value_counts()
+        .loc[lambda counts: counts > 0]  # job — Categorical: без чужих job с нулями
         .head(20)
     )
     print("\nТоп-20 job в департаменте Directing:")
@@ -203,6 +176,7 @@ def main():
     writing_jobs = (
         crew_exploded[crew_exploded["department"] == "Writing"]["job"]
         .value_counts()
+        .loc[lambda counts: counts > 0]  # job — Categorical: без чужих job с нулями
         .head(20)
     )
     print("\nТоп-20 job в департаменте Writing:")
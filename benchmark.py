@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк CQ: загрузка графа + все запросы из check_queries и
+competency_queries (sparql.py).
+
+- cold — каждая итерация в новом процессе: загрузка графа и первый
+  прогон каждого запроса;
+- warm — в этом процессе на уже загруженном графе, N прогонов подряд.
+
+Запросы идут через sparql.answer_query, как в sparql.py: CQ из реестра
+отвечает куб (graph_cube) или, с --engine numpy, колоночный движок, и
+меряется именно этот путь. Кэш результатов не подключается.
+
+Для каждого запроса пишутся время (медиана и минимум), пиковый RSS во
+время запроса, число строк и кто ответил. Результаты сверяются с
+эталоном (bench_golden.json: число строк + sha256 строк), ответы куба и
+движка — ещё и с graph.query (columnar_engine.compare), время — с
+прошлым базовым прогоном (bench_baseline.json) того же режима. Если
+результат разошёлся или запрос стал медленнее порога, скрипт
+завершается с кодом 1.
+
+    python benchmark.py --warm 5 --cold 2
+    python benchmark.py --engine numpy --no-cube
+    python benchmark.py --update-baseline --update-golden   # записать эталоны
+
+Порядок строк с одинаковым ключом ORDER BY в rdflib зависит от hash
+seed, поэтому скрипт перезапускает себя с PYTHONHASHSEED=0: иначе
+эталон «плавал» бы на запросах с LIMIT.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from chunked_ingest import current_rss
+from columnar_engine import compare, order_key
+
+BASELINE = "bench_baseline.json"
+GOLDEN = "bench_golden.json"
+REPORT = "bench_report.json"
+THRESHOLD = 1.25       # во сколько раз можно замедлиться относительно baseline
+MIN_DELTA = 0.1        # сек: меньшие изменения — шум, даже если превышен порог
+SAMPLE_EVERY = 0.01    # сек между замерами RSS
+
+
+class PeakRSS:
+    """Пиковый RSS процесса за время блока (фоновый поток опрашивает /proc)."""
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_EVERY):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def all_queries():
+    import sparql
+
+    return sparql.check_queries() + sparql.competency_queries()
+
+
+def rows_digest(rows):
+    h = hashlib.sha256()
+    for row in rows:
+        h.update("\t".join(v.n3() if v is not None else "UNDEF" for v in row).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def run_query(graph, query):
+    """
+    Один прогон через sparql.answer_query: (секунды, пиковый RSS в МБ,
+    переменные, строки, кто ответил — "cube", "numpy" или "sparql").
+    Текст запроса разбирается в замере, CQ из реестра — уже скомпилированы.
+    """
+    import sparql
+
+    with PeakRSS() as mem:
+        start = time.perf_counter()
+        variables, rows, source = sparql.answer_query(graph, query)
+        elapsed = time.perf_counter() - start
+    return elapsed, mem.peak / 2 ** 20, variables, rows, source
+
+
+def check_rdflib(graph, query, variables, rows, source):
+    """Строки куба или колоночного движка против graph.query того же CQ."""
+    if source == "sparql":
+        return "-"
+    expected = list(graph.query(query.prepared, initBindings=query.bindings))
+    problem = compare(expected, rows, order_key(query.name, query.text, variables))
+    return "ok" if problem is None else f"MISMATCH: {problem}"
+
+
+def configure(args):
+    """Режим sparql.py: куб и движок CQ — как у запусков sparql.py с теми же флагами."""
+    import sparql
+
+    sparql.CUBE = not args.no_cube
+    sparql.ENGINE = args.engine
+    return {"cube": sparql.CUBE, "engine": sparql.ENGINE}
+
+
+def load(graph_path):
+    import sparql
+
+    start = time.perf_counter()
+    graph = sparql.load_graph(graph_path)
+    elapsed = time.perf_counter() - start
+    return graph, sparql.setup_namespace(graph), elapsed
+
+
+# === cold: отдельный процесс на итерацию ===
+
+def cold_worker(graph_path):
+    graph, fr, load_time = load(graph_path)
+    result = {"load": load_time, "queries": {}}
+    for name, query in all_queries():
+        elapsed, peak, _, rows, _ = run_query(graph, query)
+        result["queries"][name] = {"time": elapsed, "peak_rss_mb": peak, "rows": len(rows)}
+    json.dump(result, sys.stdout)
+
+
+def run_cold(graph_path, mode):
+    flags = ["--engine", mode["engine"]] + ([] if mode["cube"] else ["--no-cube"])
+    out = subprocess.run([sys.executable, __file__, "--graph", graph_path, "--cold-worker", *flags],
+                         check=True, capture_output=True, text=True)
+    return json.loads(out.stdout)
+
+
+# === сравнение с эталонами ===
+
+def read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def check_golden(golden, name, rows):
+    if golden is None or name not in golden:
+        return "new"
+    expected = golden[name]
+    if expected["rows"] != len(rows) or expected["sha256"] != rows_digest(rows):
+        return "MISMATCH"
+    return "ok"
+
+
+def is_regression(current, previous, threshold, min_delta):
+    return previous is not None and current > previous * threshold and current - previous > min_delta
+
+
+def main():
+    import sparql
+
+    parser = argparse.ArgumentParser(description="Бенчмарк загрузки графа и CQ")
+    parser.add_argument("--graph", default=sparql.RDF_FILE)
+    parser.add_argument("--warm", type=int, default=3,
+                        help="прогонов каждого запроса в процессе (не меньше 1)")
+    parser.add_argument("--cold", type=int, default=1, help="прогонов в новых процессах")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--golden", default=GOLDEN)
+    parser.add_argument("--report", default=REPORT)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="допустимое замедление относительно baseline (1.25 = +25%%)")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA,
+                        help="сек: замедления меньше этого не считаются регрессией")
+    parser.add_argument("--no-cube", action="store_true",
+                        help="не отвечать на CQ из куба, как sparql.py --no-cube")
+    parser.add_argument("--engine", choices=["rdflib", "numpy"], default="rdflib",
+                        help="чем вычислять CQ из реестра, как sparql.py --engine")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="записать этот прогон как новый baseline")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="записать результаты запросов как эталон")
+    parser.add_argument("--cold-worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.warm < 1:
+        parser.error("--warm должен быть не меньше 1: по warm-прогону сверяется эталон")
+
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        os.execve(sys.executable, [sys.executable, *sys.argv], {**os.environ, "PYTHONHASHSEED": "0"})
+
+    mode = configure(args)
+    if args.cold_worker:
+        cold_worker(args.graph)
+        return
+
+    cold = [run_cold(args.graph, mode) for _ in range(args.cold)]
+    graph, fr, load_time = load(args.graph)
+    golden = read_json(args.golden)
+    baseline = read_json(args.baseline)
+    # строки с равным ключом ORDER BY куб, движок и rdflib отдают в разном
+    # порядке: эталон и baseline сравниваются только в своём режиме, а между
+    # режимами ответы сверяет check_rdflib
+    if golden and golden.get("mode") != mode:
+        print(f"эталон {args.golden} снят в другом режиме ({golden.get('mode')}), "
+              "строки сверяются только с graph.query")
+        golden = None
+    if baseline and baseline.get("mode") != mode:
+        print(f"baseline {args.baseline} снят в другом режиме ({baseline.get('mode')}), "
+              "время не сравнивается")
+        baseline = None
+
+    report = {"graph": args.graph, "triples": len(graph), "mode": mode, "warm_runs": args.warm,
+              "cold_runs": args.cold,
+              "load": {"warm": load_time, "cold": [c["load"] for c in cold]},
+              "queries": {}}
+    new_golden = {"mode": mode, "queries": {}}
+
+    print(f"Граф {args.graph}: {len(graph):,} триплетов, загрузка {load_time:.2f} сек")
+    print(f"{'запрос':60s} {'warm мед.':>9s} {'warm мин.':>9s} {'cold':>8s} "
+          f"{'RSS МБ':>8s} {'строк':>6s} {'ответил':>7s}  эталон / rdflib")
+    for name, query in all_queries():
+        times, peaks = [], []
+        rows = []
+        for _ in range(args.warm):
+            elapsed, peak, variables, rows, source = run_query(graph, query)
+            times.append(elapsed)
+            peaks.append(peak)
+        cold_times = [c["queries"][name]["time"] for c in cold]
+        entry = {
+            "warm": times,
+            "warm_median": statistics.median(times) if times else None,
+            "warm_min": min(times) if times else None,
+            "cold": cold_times,
+            "peak_rss_mb": max(peaks + [c["queries"][name]["peak_rss_mb"] for c in cold]),
+            "rows": len(rows),
+            "source": source,
+            "golden": check_golden(golden and golden["queries"], name, rows),
+            "rdflib": check_rdflib(graph, query, variables, rows, source),
+        }
+        report["queries"][name] = entry
+        new_golden["queries"][name] = {"rows": len(rows), "sha256": rows_digest(rows),
+                                       "head": [[v.n3() if v is not None else None for v in row]
+                                                for row in rows[:5]]}
+        cold_text = f"{statistics.median(cold_times):8.2f}" if cold_times else f"{'-':>8s}"
+        print(f"{name[:60]:60s} {entry['warm_median'] or 0:9.3f} {entry['warm_min'] or 0:9.3f} "
+              f"{cold_text} {entry['peak_rss_mb']:8.0f} {len(rows):6d} {source:>7s}  "
+              f"{entry['golden']} / {entry['rdflib']}")
+
+    # === регрессии ===
+    failures = []
+    for name, entry in report["queries"].items():
+        if entry["golden"] == "MISMATCH":
+            failures.append(f"{name}: результат не совпал с эталоном {args.golden}")
+        if entry["rdflib"].startswith("MISMATCH"):
+            failures.append(f"{name}: ответ {entry['source']} не совпал с graph.query "
+                            f"({entry['rdflib'].split(': ', 1)[1]})")
+        previous = (baseline or {}).get("queries", {}).get(name)
+        if previous and entry["warm_median"] is not None and is_regression(
+                entry["warm_median"], previous["warm_median"], args.threshold, args.min_delta):
+            failures.append(f"{name}: {entry['warm_median']:.3f} сек против "
+                            f"{previous['warm_median']:.3f} в baseline")
+    if baseline and is_regression(load_time, baseline["load"]["warm"], args.threshold, args.min_delta):
+        failures.append(f"загрузка графа: {load_time:.2f} сек против {baseline['load']['warm']:.2f}")
+
+    write_json(args.report, report)
+    if args.update_baseline:
+        write_json(args.baseline, report)
+        print(f"baseline записан в {args.baseline}")
+    if args.update_golden:
+        write_json(args.golden, new_golden)
+        print(f"эталон записан в {args.golden}")
+
+    if failures:
+        print("\nРЕГРЕССИИ:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print(f"\nОтчёт: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,21 @@
 #!/usr/bin/env python3
+import argparse
+import re
+
 import pandas as pd
-import ast
-from rdflib import Graph, Namespace, URIRef, Literal
+from rdflib import Graph, Namespace, Literal
 from rdflib.namespace import RDF, RDFS, XSD
 
+from graph_cube import write_cube
+from graph_snapshot import snapshot_path, write_snapshot
+from main import (CAST_MAPS, CREW_ROLE, ENTITY_TABLES, PERSON, entity_maps, is_director_job,
+                  job_slug, movie_t, release_year)
+from query_cache import file_version
+from rdf_mapping import Field, Ref, Template, TriplesMap, compile_mapping
+from table_cache import load_nested_tables
+from tmdb_parsing import parse_nested_columns
+from triple_emitter import TripleEmitter
+
 # === Пути к файлам ===
 MOVIES_CSV = "tmdb_5000_movies.csv"
 CREDITS_CSV = "tmdb_5000_credits.csv"
@@ -16,57 +28,25 @@ FR = Namespace(BASE)
 
 # === Вспомогательные функции ===
 
-def safe_parse_list(value):
-    if not isinstance(value, str) or not value.strip():
-        return []
-    try:
-        return ast.literal_eval(value)
-    except Exception:
-        return []
-
-
-def movie_uri(movie_id):
-    return FR[f"movie/{int(movie_id)}"]
-
-
-def person_uri(person_id):
-    return FR[f"person/{int(person_id)}"]
-
-
-def genre_uri(genre_id):
-    return FR[f"genre/{int(genre_id)}"]
-
-
-def company_uri(comp_id):
-    return FR[f"company/{int(comp_id)}"]
-
-
-def country_uri(code):
-    return FR[f"country/{code}"]
-
-
-def language_uri(code):
-    return FR[f"lang/{code}"]
-
-
-def keyword_uri(kw_id):
-    return FR[f"keyword/{int(kw_id)}"]
-
-
-def cast_role_uri(movie_id, person_id, order):
-    return FR[f"cast/{int(movie_id)}_{int(person_id)}_{int(order)}"]
-
-
-def crew_role_uri(movie_id, person_id, job):
-    job_clean = str(job).lower().replace(" ", "_").replace("/", "_")
-    return FR[f"crew/{int(movie_id)}_{int(person_id)}_{job_clean}"]
-
-
 def role_type_uri(canonical_role: str):
     # canonical_role вроде "Director", "Producer", "Screenwriter" etc.
     return FR[f"role/{canonical_role}"]
 
 
+def role_link(canonical_role: str):
+    # прямая ссылка фильм -> человек для роли: fr:hasDirector, fr:hasProducer, ...
+    return FR[f"has{canonical_role}"]
+
+
+NUMERIC_PROPS = [
+    ("budget", FR.budget, XSD.integer),
+    ("revenue", FR.revenue, XSD.integer),
+    ("runtime", FR.runtime, XSD.decimal),
+    ("popularity", FR.popularity, XSD.decimal),
+    ("vote_average", FR.voteAverage, XSD.decimal),
+    ("vote_count", FR.voteCount, XSD.integer),
+]
+
 # === Маппинг job + department → canonical_role ===
 
 DEFAULT_ROLE = "OtherCrewRole"
@@ -135,20 +115,134 @@ CANONICAL_ROLE_MAP = {
     ("Visual Effects Producer", "Visual Effects"): "VFXProducer",
 }
 
+# Правила по шаблону job для пар (job, department), которых нет в
+# CANONICAL_ROLE_MAP: (regex по job без учёта регистра, департамент или
+# None — любой, роль). Проверяются по порядку, первое совпадение решает.
+# Считаются в classify_crew один раз на уникальную пару, поэтому от их
+# числа время сборки почти не зависит.
+ROLE_PATTERNS = [
+    (r"^stunt coordinator$", None, "StuntCoordinator"),
+    (r"\bstunts?\b", None, "StuntPerformer"),
+    (r"\bgrip\b", None, "Grip"),
+    (r"\bgaffer\b|\belectrician\b|\bbest boy electric\b", None, "LightingTechnician"),
+    (r"\bfoley\b", None, "FoleyArtist"),
+    (r"\bsound\b|\bboom operator\b|\bmixer\b", "Sound", "SoundCrew"),
+    (r"\bassistant editor\b", "Editing", "AssistantEditor"),
+    (r"\bmusic supervisor\b|\borchestrat", "Sound", "MusicCrew"),
+    (r"\bvisual effects\b|\bvfx\b", "Visual Effects", "VFXArtist"),
+    (r"\banimat", None, "Animator"),
+    (r"\bmake-?up\b", "Costume & Make-Up", "MakeupArtist"),
+    (r"\bhair", "Costume & Make-Up", "HairStylist"),
+    (r"\bscript supervisor\b", None, "ScriptSupervisor"),
+    (r"\bcamera\b|\bsteadicam\b|\bfocus puller\b", "Camera", "CameraCrew"),
+    (r"\bset designer\b|\bproperty master\b|\bstoryboard\b|\bconceptual design\b",
+     "Art", "ArtDepartment"),
+]
+_ROLE_RULES = [(re.compile(pattern, re.IGNORECASE), dept, role)
+               for pattern, dept, role in ROLE_PATTERNS]
+
+
+def canonical_roles():
+    """Все роли, которые может выдать классификатор (для RoleType-индивидов)."""
+    return sorted(set(CANONICAL_ROLE_MAP.values())
+                  | {role for _, _, role in ROLE_PATTERNS} | {DEFAULT_ROLE})
+
+
 def get_canonical_role(job: str, department: str) -> str:
     key = (job, department)
     if key in CANONICAL_ROLE_MAP:
         return CANONICAL_ROLE_MAP[key]
-    # Можно попробовать по одному job без департамента, если захочешь расширить
-    for (j, d), role in CANONICAL_ROLE_MAP.items():
-        if j == job and (d is None or d == department):
-            return role
+    # (job, None) в карте — роль по одному job в любом департаменте
+    if (job, None) in CANONICAL_ROLE_MAP:
+        return CANONICAL_ROLE_MAP[(job, None)]
+    if isinstance(job, str):
+        for rule, dept, role in _ROLE_RULES:
+            if (dept is None or dept == department) and rule.search(job):
+                return role
     return DEFAULT_ROLE
 
 
+def classify_crew(crew):
+    """
+    Канонические роли для всей crew-таблицы разом: все правила (точные
+    пары, job без департамента, ROLE_PATTERNS) считаются один раз на
+    уникальную пару (job, department) — получается индекс пара -> роль, —
+    а строки получают роль join-ом по нему. Возвращает список в порядке
+    строк crew.
+    """
+    pairs = crew[["job", "department"]].drop_duplicates()
+    pairs["role"] = [get_canonical_role(job, dept) for job, dept in
+                     zip(pairs["job"].tolist(), pairs["department"].tolist())]
+    roles = crew[["job", "department"]].merge(pairs, on=["job", "department"], how="left")
+    return roles["role"].tolist()
+
+
+# === Маппинг таблиц в триплеты (rdf_mapping) ===
+# жанры, ключевые слова, компании, страны, языки и cast — как в main.py;
+# crew — с канонической ролью и только с непустым job
+
+MOVIE_MAP = TriplesMap("movies", movie_t("id"), cls=FR.Movie, fields=[
+    Field("movie_title", FR.movieTitle, XSD.string),
+    Field("original_title", FR.originalTitle, XSD.string),
+    *(Field(col, prop, dtype) for col, prop, dtype in NUMERIC_PROPS),
+    Field("release_date", FR.releaseDate, XSD.date),
+])
+
+CREW_MAPS = [
+    TriplesMap("crew", PERSON, cls=FR.Person, label=("name", XSD.string), entity=True,
+               required=["job"]),
+    TriplesMap("crew", CREW_ROLE, cls=FR.CrewRole, fields=[
+        Field("job", FR.crewJob, XSD.string),
+        Field("department", FR.crewDepartment, XSD.string),
+    ], refs=[
+        Ref(FR.hasCrew, movie_t(), inverse=True),
+        Ref(FR.creditsPerson, PERSON),
+        # канонический тип роли
+        Ref(FR.roleType, Template(BASE + "role/{canonical_role}")),
+    ], required=["job"]),
+]
+
+MAPPING = [MOVIE_MAP] + entity_maps(ENTITY_TABLES) + CAST_MAPS + CREW_MAPS
+
+DERIVED = {
+    "cast": {"order": lambda t: t["order"].fillna(0)},
+    # канонические роли — одним проходом по уникальным (job, department)
+    "crew": {"job_slug": lambda t: job_slug(t["job"]), "canonical_role": classify_crew},
+}
+
+emit_mapping = compile_mapping(MAPPING, DERIVED)
+
+
+# === Производные факты (--derived) ===
+# год выпуска целым числом, fr:directedBy как в main.py и по ссылке
+# фильм -> человек на каждую каноническую роль: CQ соединяют фильм с
+# людьми одним ребром, без CrewRole и фильтра по тексту job
+
+def role_link_maps():
+    return [TriplesMap("crew", movie_t(), refs=[Ref(role_link(role), PERSON)], required=["job"],
+                       where=lambda crew, role=role: crew["canonical_role"] == role)
+            for role in canonical_roles() if role != DEFAULT_ROLE]
+
+
+DERIVED_MAPS = [
+    TriplesMap("movies", movie_t("id"), fields=[
+        Field("release_year", FR.releaseYear, XSD.integer),
+    ]),
+    TriplesMap("crew", movie_t(), refs=[Ref(FR.directedBy, PERSON)], required=["job"],
+               where=is_director_job),
+    *role_link_maps(),
+]
+
+emit_derived_mapping = compile_mapping(MAPPING + DERIVED_MAPS,
+                                       {**DERIVED, "movies": {"release_year": release_year}})
+
+
 # === Основной скрипт ===
 
-def main():
+# derived — писать производные факты (--derived): год, ключи меток, прямые
+# ссылки по ролям
+
+def load_schema(derived=False):
     # 1. Грузим схему
     g = Graph()
     g.parse(SCHEMA_TTL, format="turtle")
@@ -160,158 +254,72 @@ def main():
     g.add((FR.roleType, RDFS.domain, FR.CrewRole))
     g.add((FR.roleType, RDFS.range, FR.RoleType))
 
-    for canonical_role in sorted(set(CANONICAL_ROLE_MAP.values()) | {DEFAULT_ROLE}):
+    for canonical_role in canonical_roles():
         rt = role_type_uri(canonical_role)
         g.add((rt, RDF.type, FR.RoleType))
         g.add((rt, FR.label, Literal(canonical_role, datatype=XSD.string)))
 
-    # 2. Читаем CSV
-    movies = pd.read_csv(MOVIES_CSV, low_memory=False)
-    credits = pd.read_csv(CREDITS_CSV, low_memory=False)
-    df = movies.merge(credits, left_on="id", right_on="movie_id", how="inner")
-
-    for _, row in df.iterrows():
-        mid = row["id"]
-        m = movie_uri(mid)
-        g.add((m, RDF.type, FR.Movie))
-
-        # ======== DATAPROPS (как раньше) =========
-        if isinstance(row.get("title"), str):
-            g.add((m, FR.movieTitle, Literal(row["title"], datatype=XSD.string)))
-        if isinstance(row.get("original_title"), str):
-            g.add((m, FR.originalTitle, Literal(row["original_title"], datatype=XSD.string)))
-
-        for col, prop, dtype in [
-            ("budget", FR.budget, XSD.integer),
-            ("revenue", FR.revenue, XSD.integer),
-            ("runtime", FR.runtime, XSD.decimal),
-            ("popularity", FR.popularity, XSD.decimal),
-            ("vote_average", FR.voteAverage, XSD.decimal),
-            ("vote_count", FR.voteCount, XSD.integer),
-        ]:
-            val = row.get(col)
-            if pd.notna(val):
-                g.add((m, prop, Literal(float(val) if dtype == XSD.decimal else int(val), datatype=dtype)))
-
-        if isinstance(row.get("release_date"), str) and row["release_date"]:
-            g.add((m, FR.releaseDate, Literal(row["release_date"], datatype=XSD.date)))
-
-        # ======== Genres ========
-        for gobj in safe_parse_list(row.get("genres", "")):
-            gid = gobj.get("id")
-            gname = gobj.get("name")
-            if gid is None:
-                continue
-            gen = genre_uri(gid)
-            g.add((gen, RDF.type, FR.Genre))
-            if gname:
-                g.add((gen, FR.label, Literal(gname, datatype=XSD.string)))
-            g.add((m, FR.hasGenre, gen))
-
-        # ======== Keywords ========
-        for k in safe_parse_list(row.get("keywords", "")):
-            kid = k.get("id")
-            kname = k.get("name")
-            if kid is None:
-                continue
-            kw = keyword_uri(kid)
-            g.add((kw, RDF.type, FR.Keyword))
-            if kname:
-                g.add((kw, FR.label, Literal(kname, datatype=XSD.string)))
-            g.add((m, FR.hasKeyword, kw))
-
-        # ======== Companies ========
-        for c in safe_parse_list(row.get("production_companies", "")):
-            cid = c.get("id")
-            cname = c.get("name")
-            if cid is None:
-                continue
-            comp = company_uri(cid)
-            g.add((comp, RDF.type, FR.Company))
-            if cname:
-                g.add((comp, FR.label, Literal(cname, datatype=XSD.string)))
-            g.add((m, FR.producedBy, comp))
-
-        # ======== Countries ========
-        for c in safe_parse_list(row.get("production_countries", "")):
-            code = c.get("iso_3166_1")
-            cname = c.get("name")
-            if not code:
-                continue
-            cou = country_uri(code)
-            g.add((cou, RDF.type, FR.Country))
-            if cname:
-                g.add((cou, FR.label, Literal(cname, datatype=XSD.string)))
-            g.add((m, FR.producedInCountry, cou))
-
-        # ======== Languages ========
-        for l in safe_parse_list(row.get("spoken_languages", "")):
-            code = l.get("iso_639_1")
-            lname = l.get("name")
-            if not code:
-                continue
-            lang = language_uri(code)
-            g.add((lang, RDF.type, FR.Language))
-            if lname:
-                g.add((lang, FR.label, Literal(lname, datatype=XSD.string)))
-            g.add((m, FR.spokenLanguage, lang))
-
-        # ======== CAST (оставляем как раньше) ========
-        for c in safe_parse_list(row.get("cast", "")):
-            pid = c.get("id")
-            pname = c.get("name")
-            character = c.get("character")
-            order = c.get("order", 0)
-
-            if pid is None:
+    # 1.2. Прямые ссылки по ролям — только когда они пишутся
+    if derived:
+        for canonical_role in canonical_roles():
+            if canonical_role == DEFAULT_ROLE:
                 continue
+            link = role_link(canonical_role)
+            g.add((link, RDF.type, RDF.Property))
+            g.add((link, RDFS.domain, FR.Movie))
+            g.add((link, RDFS.range, FR.Person))
+    return g
 
-            person = person_uri(pid)
-            g.add((person, RDF.type, FR.Person))
-            if pname:
-                g.add((person, FR.label, Literal(pname, datatype=XSD.string)))
-
-            role = cast_role_uri(mid, pid, order)
-            g.add((role, RDF.type, FR.CastRole))
-            g.add((m, FR.hasCast, role))
-            g.add((role, FR.playedBy, person))
-            if character:
-                g.add((role, FR.characterName, Literal(character, datatype=XSD.string)))
-            g.add((role, FR.castOrder, Literal(int(order), datatype=XSD.integer)))
-
-        # ======== CREW с каноническими ролями ========
-        for c in safe_parse_list(row.get("crew", "")):
-            pid = c.get("id")
-            pname = c.get("name")
-            job = c.get("job")
-            dept = c.get("department")
-
-            if pid is None or not job:
-                continue
 
-            person = person_uri(pid)
-            g.add((person, RDF.type, FR.Person))
-            if pname:
-                g.add((person, FR.label, Literal(pname, datatype=XSD.string)))
+def load_movies(movies_csv=MOVIES_CSV, credits_csv=CREDITS_CSV):
+    # 2. Читаем CSV
+    movies = pd.read_csv(movies_csv, low_memory=False)
+    credits = pd.read_csv(credits_csv, low_memory=False)
+    # title есть в обеих таблицах: без переименования после merge
+    # получились бы title_x/title_y и movieTitle терялся
+    movies = movies.rename(columns={"title": "movie_title"})
+    credits = credits.drop(columns=["title"])
+    return movies.merge(credits, left_on="id", right_on="movie_id", how="inner")
+
 
-            crew_ind = crew_role_uri(mid, pid, job)
-            g.add((crew_ind, RDF.type, FR.CrewRole))
-            g.add((m, FR.hasCrew, crew_ind))
-            g.add((crew_ind, FR.creditsPerson, person))
+def emit_movies(em, df, tables=None, derived=False):
+    # все вложенные колонки разбираются разом, а не построчно
+    if tables is None:
+        tables = parse_nested_columns(df)
+    emit = emit_derived_mapping if derived else emit_mapping
+    emit(em, {"movies": df, **tables})
 
-            # job/department как датапропы (если хочешь)
-            g.add((crew_ind, FR.crewJob, Literal(job, datatype=XSD.string)))
-            if dept:
-                g.add((crew_ind, FR.crewDepartment, Literal(dept, datatype=XSD.string)))
 
-            # канонический тип роли
-            canonical = get_canonical_role(job, dept)
-            rt = role_type_uri(canonical)
-            g.add((crew_ind, FR.roleType, rt))
+def new_emitter(store, derived=False):
+    key_predicate = FR.labelKey if derived else None
+    return TripleEmitter(store, FR.label, key_predicate=key_predicate)
+
+
+def build_graph(df, tables=None, derived=False):
+    g = load_schema(derived)
+    # триплеты идут пачками через addN, Person/Genre/... описываются один раз
+    with new_emitter(g, derived) as em:
+        emit_movies(em, df, tables, derived)
+    return g
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TMDB CSV -> RDF с каноническими ролями crew")
+    parser.add_argument("--derived", action="store_true",
+                        help="писать производные факты: fr:releaseYear, fr:labelKey, "
+                             "fr:directedBy и fr:has<Роль>")
+    derived = parser.parse_args().derived
+
+    g = load_schema(derived)
+    with new_emitter(g, derived) as em:
+        # разобранные cast/crew/genres/... — из колоночного кэша tmdb_tables/
+        emit_movies(em, load_movies(), load_nested_tables(MOVIES_CSV, CREDITS_CSV), derived)
 
     # 3. Сохраняем граф
     g.serialize(OUTPUT_TTL, format="turtle")
-    print(f"Saved ontology with roles to {OUTPUT_TTL}")
+    write_snapshot(g, snapshot_path(OUTPUT_TTL), source=OUTPUT_TTL)
+    write_cube(g, OUTPUT_TTL, file_version(OUTPUT_TTL))
+    print(f"Saved ontology with roles to {OUTPUT_TTL} (skipped {em.skipped:,} redundant adds)")
 
 
 if __name__ == "__main__":
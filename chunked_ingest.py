@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Загрузка по частям для корпусов, которые не помещаются в память.
+
+Вместо двух pd.read_csv целиком и movies.merge(credits):
+1. credits CSV один раз прочитывается кусками и складывается во
+   временную SQLite-базу с индексом по movie_id (join на диске);
+2. movies CSV читается пачками фильмов; к каждой пачке подтягиваются
+   её credits из базы, и пачка — та же таблица, что даёт load_movies,
+   но только для этих фильмов — уходит в emit_movies и дальше в
+   потоковый writer или SQLite-хранилище.
+
+Размер пачки подстраивается под лимит памяти: если RSS процесса
+подходит к max_rss, пачка уменьшается вдвое, а когда памяти снова
+хватает — растёт обратно до batch_size. Лимит мягкий: меньше памяти,
+чем занимают сами pandas/rdflib и множество уже описанных общих
+сущностей (Person, Genre, ...), взять нельзя.
+"""
+import os
+import resource
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+from incremental_build import movie_hashes
+from main import emit_movies, load_schema, new_emitter
+
+BATCH_SIZE = 1000           # фильмов в пачке (верхняя граница)
+CREDITS_CHUNK = 2000        # строк credits за одно чтение при индексации
+# доля max_rss, после которой пачка уменьшается / ниже которой растёт
+SHRINK_AT = 0.8
+GROW_AT = 0.5
+# сколько параметров отдаём в один IN (...)
+_IN_CHUNK = 500
+
+
+def current_rss():
+    """Текущий RSS процесса в байтах (вне Linux — пиковый)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss в Linux — килобайты
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# === credits на диске ===
+
+def index_credits(credits_csv, db_path, chunk_size=CREDITS_CHUNK):
+    """credits CSV -> SQLite (movie_id, cast, crew) с индексом по movie_id."""
+    conn = sqlite3.connect(db_path)
+    # cast — ключевое слово SQL, поэтому в кавычках
+    conn.execute('CREATE TABLE credits (movie_id INTEGER NOT NULL, "cast" TEXT, crew TEXT)')
+    for chunk in pd.read_csv(credits_csv, usecols=["movie_id", "cast", "crew"],
+                             chunksize=chunk_size):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        conn.executemany("INSERT INTO credits VALUES (?, ?, ?)",
+                         chunk[["movie_id", "cast", "crew"]].itertuples(index=False, name=None))
+    conn.execute("CREATE INDEX credits_movie ON credits (movie_id)")
+    conn.commit()
+    return conn
+
+
+def read_credits(conn, movie_ids):
+    """credits для перечисленных фильмов."""
+    ids = sorted({int(mid) for mid in movie_ids})
+    rows = []
+    for i in range(0, len(ids), _IN_CHUNK):
+        chunk = ids[i:i + _IN_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        rows.extend(conn.execute(
+            f'SELECT movie_id, "cast", crew FROM credits WHERE movie_id IN ({marks})', chunk))
+    return pd.DataFrame(rows, columns=["movie_id", "cast", "crew"]).astype({"movie_id": "int64"})
+
+
+# === пачки фильмов ===
+
+def iter_movie_batches(movies_csv, credits_csv, batch_size=BATCH_SIZE, max_rss=None,
+                       work_dir=None):
+    """
+    Пачки merged movies + credits (как load_movies, по batch_size фильмов).
+    max_rss — мягкий лимит RSS в байтах, по нему подстраивается размер пачки.
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        conn = index_credits(credits_csv, os.path.join(tmp, "credits.sqlite"))
+        try:
+            size = batch_size
+            with pd.read_csv(movies_csv, iterator=True) as reader:
+                while True:
+                    try:
+                        movies = reader.get_chunk(size)
+                    except StopIteration:
+                        break
+                    movies = movies.rename(columns={"title": "movie_title"})
+                    credits = read_credits(conn, movies["id"])
+                    # на пачке — тот же inner join, что в load_movies
+                    yield movies.merge(credits, left_on="id", right_on="movie_id", how="inner")
+
+                    if max_rss:
+                        rss = current_rss()
+                        if rss > SHRINK_AT * max_rss:
+                            size = max(1, size // 2)
+                        elif rss < GROW_AT * max_rss:
+                            size = min(batch_size, size * 2)
+        finally:
+            conn.close()
+
+
+def build_chunked(store, movies_csv, credits_csv, batch_size=BATCH_SIZE, max_rss=None,
+                  work_dir=None, on_batch=None, derived=False):
+    """
+    Схема и индивиды пачками в store (потоковый writer или граф над
+    персистентным хранилищем). on_batch() вызывается после каждой пачки —
+    например, чтобы закоммитить хранилище. derived — производные факты,
+    как у main.py --derived.
+    Возвращает (эмиттер, хэши фильмов для incremental_build, пик RSS).
+    """
+    for triple in load_schema():
+        store.add(triple)
+    if hasattr(store, "flush"):
+        store.flush()
+
+    em = new_emitter(store, derived)
+    hashes = {}
+    peak = current_rss()
+    for batch in iter_movie_batches(movies_csv, credits_csv, batch_size, max_rss, work_dir):
+        emit_movies(em, batch, derived=derived)
+        em.flush()
+        # URI фильмов и ролей больше не встретятся: не копим их между пачками
+        em.clear_interned()
+        hashes.update(movie_hashes(batch))
+        if on_batch is not None:
+            on_batch()
+        peak = max(peak, current_rss())
+    return em, hashes, peak
@@ -0,0 +1,677 @@
+#!/usr/bin/env python3
+"""
+Колоночный движок на NumPy для CQ из реестра.
+
+rdflib вычисляет CQ решение за решением на чистом питоне: CQ2 (актёры
+драм 2000–2010) — это сотни тысяч связок фильм × жанр × роль, каждая
+из которых проходит через словари привязок. Здесь граф один раз
+раскладывается в столбцы:
+
+- все термы получают целые id (terms[id] — сам терм);
+- рёбра hasGenre / hasCast / hasCrew / producedBy / spokenLanguage /
+  hasKeyword / directedBy / playedBy / creditsPerson / crewJob / label —
+  пары массивов (субъект, объект) из id;
+- числовые свойства фильма (revenue, voteAverage, runtime, profit) —
+  int64-столбцы в фиксированном масштабе (7.2 -> 72 при scale=1), чтобы
+  SUM и AVG были точными и совпадали с Decimal у rdflib до знака;
+- releaseDate — номер дня и год.
+
+Каждый CQ записан теми же шагами, что и его SPARQL: соединение по
+равенству id (join — сортировка + searchsorted, с кратностями, как в
+SPARQL), FILTER — булева маска, GROUP BY — np.unique по ключевым
+столбцам, COUNT / COUNT(DISTINCT) / SUM — bincount и np.add.at, ORDER BY
++ LIMIT — lexsort. Агрегаты превращаются в литералы так же, как у rdflib
+(graph_cube.sum_literal / avg_literal / count_literal), поэтому вывод
+совпадает с SPARQL с точностью до порядка строк с равными ключами
+сортировки. Если данные не сводятся к столбцам (у меры разные типы,
+float, не-xsd:date дата), answer() возвращает None и запрос идёт в rdflib.
+
+Столбцы кэшируются в <граф>.columns.pkl по версии содержимого графа.
+
+    python sparql.py --engine numpy      # CQ из реестра — этим движком
+    python columnar_engine.py            # сверка с rdflib на всех CQ
+"""
+import argparse
+import math
+import os
+import pickle
+import re
+import sys
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+from rdflib import Literal, Namespace, Variable
+from rdflib.namespace import RDF, XSD
+
+from cq_registry import decimal, lowercase, year_end, year_start
+from graph_cube import avg_literal, count_literal, sum_literal
+
+FR = Namespace("http://example.org/film-rating#")
+
+COLUMNS_VERSION = 1
+
+EDGES = {"genre": FR.hasGenre, "cast": FR.hasCast, "crew": FR.hasCrew,
+         "company": FR.producedBy, "language": FR.spokenLanguage, "keyword": FR.hasKeyword,
+         "director": FR.directedBy, "played_by": FR.playedBy, "credits": FR.creditsPerson,
+         "job": FR.crewJob, "label": FR.label}
+MEASURES = {"revenue": FR.revenue, "rating": FR.voteAverage, "runtime": FR.runtime,
+            "profit": FR.profit}
+
+
+def columns_path(graph_path):
+    return graph_path + ".columns.pkl"
+
+
+class Unsupported(Exception):
+    """Данные не сводятся к столбцам — запрос выполняет rdflib."""
+
+
+# === Реляционные операции над массивами ===
+
+def join(left, right):
+    """Все пары (i, j) с left[i] == right[j] — с кратностями, как соединение SPARQL."""
+    order = np.argsort(right, kind="stable")
+    sorted_right = right[order]
+    lo = np.searchsorted(sorted_right, left, "left")
+    counts = np.searchsorted(sorted_right, left, "right") - lo
+    i = np.repeat(np.arange(len(left)), counts)
+    offsets = np.repeat(lo - np.cumsum(counts) + counts, counts)
+    return i, order[offsets + np.arange(len(i))]
+
+
+def take(table, index):
+    return {name: column[index] for name, column in table.items()}
+
+
+def where(table, mask):
+    return take(table, np.flatnonzero(mask))
+
+
+def expand(table, var, edges, new):
+    """Таблица решений × ребро (table[var], new)."""
+    subjects, objects = edges
+    i, j = join(table[var], subjects)
+    out = take(table, i)
+    out[new] = objects[j]
+    return out
+
+
+def top(limit, *keys):
+    """ORDER BY DESC(k1) DESC(k2) ... LIMIT — индексы строк."""
+    order = np.lexsort([-np.asarray(k) for k in reversed(keys)])
+    return order[:limit]
+
+
+class Groups:
+    """GROUP BY по столбцам keys таблицы решений."""
+
+    def __init__(self, table, keys):
+        columns = [table[k] for k in keys]
+        if len(columns[0]):
+            self.keys, index = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+            self.index = index.reshape(-1)
+        else:
+            self.keys = np.empty((0, len(keys)), dtype=np.int64)
+            self.index = np.empty(0, dtype=np.int64)
+        self.size = len(self.keys)
+
+    def key(self, i):
+        return self.keys[i]
+
+    def count(self):
+        return np.bincount(self.index, minlength=self.size)
+
+    def count_distinct(self, values):
+        if not self.size:
+            return np.zeros(0, dtype=np.int64)
+        pairs = np.unique(np.stack([self.index, values], axis=1), axis=0)
+        return np.bincount(pairs[:, 0], minlength=self.size)
+
+    def sum(self, values):
+        out = np.zeros(self.size, dtype=np.int64)
+        np.add.at(out, self.index, values)
+        return out
+
+    def max(self, values):
+        out = np.zeros(self.size, dtype=values.dtype)
+        np.maximum.at(out, self.index, values)
+        return out
+
+
+# === Столбцы ===
+
+class Measure:
+    """
+    Числовое свойство: у subjects[i] значение values[i] / 10**scale,
+    places[i] — знаков после запятой в лексической форме (от них
+    зависит, как rdflib напечатает сумму).
+    """
+
+    def __init__(self, subjects, values, places, scale, datatype):
+        self.subjects = subjects
+        self.values = values
+        self.places = places
+        self.scale = scale
+        self.datatype = datatype
+
+    @classmethod
+    def collect(cls, pairs):
+        """None, если значения не одного типа xsd:integer или xsd:decimal."""
+        datatype = None
+        subjects, numbers = [], []
+        for subject, literal in pairs:
+            if not isinstance(literal, Literal) or literal.datatype not in (XSD.integer, XSD.decimal):
+                return None
+            if datatype is None:
+                datatype = literal.datatype
+            elif literal.datatype != datatype:
+                return None
+            try:
+                number = Decimal(str(literal))
+            except InvalidOperation:
+                return None
+            if not number.is_finite():
+                return None
+            subjects.append(subject)
+            numbers.append(number)
+        places = [max(-n.as_tuple().exponent, 0) for n in numbers]
+        scale = max(places, default=0)
+        return cls(np.array(subjects, dtype=np.int64),
+                   np.array([int(n.scaleb(scale)) for n in numbers], dtype=np.int64),
+                   np.array(places, dtype=np.int8), scale, datatype or XSD.integer)
+
+    def number(self, scaled, places=0):
+        """Сумма в масштабе -> число, каким его накопил бы rdflib."""
+        if self.datatype == XSD.integer:
+            return int(scaled)
+        return Decimal(int(scaled)).scaleb(-self.scale).quantize(Decimal(1).scaleb(-int(places)))
+
+    def bound(self, value, op):
+        """Маска-порог `?x op value` для столбца в масштабе (точно, без float)."""
+        limit = Decimal(str(value)).scaleb(self.scale)
+        if op == ">=":
+            return lambda values: values >= math.ceil(limit)
+        if op == ">":
+            return lambda values: values > math.floor(limit)
+        raise ValueError(op)
+
+
+class Dates:
+    """releaseDate: номер дня (date.toordinal) и год; некорректные даты отброшены, как FILTER."""
+
+    def __init__(self, subjects, days, years):
+        self.subjects = subjects
+        self.days = days
+        self.years = years
+
+    @classmethod
+    def collect(cls, pairs):
+        subjects, days, years = [], [], []
+        for subject, literal in pairs:
+            if not isinstance(literal, Literal) or literal.datatype != XSD.date:
+                return None
+            value = literal.toPython()
+            if isinstance(value, date):
+                subjects.append(subject)
+                days.append(value.toordinal())
+                years.append(value.year)
+        return cls(np.array(subjects, dtype=np.int64), np.array(days, dtype=np.int64),
+                   np.array(years, dtype=np.int64))
+
+
+class ColumnarGraph:
+    def __init__(self, version=None):
+        self.version = version
+        self.format = COLUMNS_VERSION
+        self.terms = []
+        self.edges = {}
+        self.measures = {}
+        self.dates = None
+        # маски по id терма
+        self.movies = self.cast_roles = self.crew_roles = None
+
+    @classmethod
+    def build(cls, graph, version=None):
+        columns = cls(version)
+        ids = {}
+        terms = columns.terms
+
+        def intern(term):
+            i = ids.get(term)
+            if i is None:
+                i = ids[term] = len(terms)
+                terms.append(term)
+            return i
+
+        def typed(cls_uri):
+            return [intern(s) for s in graph.subjects(RDF.type, cls_uri)]
+
+        movies, cast_roles, crew_roles = typed(FR.Movie), typed(FR.CastRole), typed(FR.CrewRole)
+        for name, predicate in EDGES.items():
+            pairs = [(intern(s), intern(o)) for s, o in graph.subject_objects(predicate)]
+            columns.edges[name] = (np.array([s for s, _ in pairs], dtype=np.int64),
+                                   np.array([o for _, o in pairs], dtype=np.int64))
+        for name, predicate in MEASURES.items():
+            columns.measures[name] = Measure.collect(
+                (intern(s), o) for s, o in graph.subject_objects(predicate))
+        columns.dates = Dates.collect((intern(s), o)
+                                      for s, o in graph.subject_objects(FR.releaseDate))
+
+        def mask(members):
+            m = np.zeros(len(terms), dtype=bool)
+            m[members] = True
+            return m
+
+        columns.movies = mask(movies)
+        columns.cast_roles = mask(cast_roles)
+        columns.crew_roles = mask(crew_roles)
+        return columns
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            columns = pickle.load(f)
+        if not isinstance(columns, cls) or columns.format != COLUMNS_VERSION:
+            raise ValueError(f"{path}: не столбцы версии {COLUMNS_VERSION}")
+        return columns
+
+    # === Шаги запросов ===
+
+    def term(self, i):
+        # отрицательный id — STR(узла) из COALESCE(?label, STR(?node))
+        return self.terms[i] if i >= 0 else Literal(str(self.terms[-1 - i]))
+
+    def measure(self, name):
+        measure = self.measures.get(name)
+        if measure is None:
+            raise Unsupported(name)
+        return measure
+
+    def all_movies(self):
+        return {"movie": np.flatnonzero(self.movies)}
+
+    def with_measure(self, table, name, var="movie"):
+        """?var fr:<name> ?name — столбцы name (в масштабе) и name:places."""
+        measure = self.measure(name)
+        i, j = join(table[var], measure.subjects)
+        out = take(table, i)
+        out[name] = measure.values[j]
+        out[name + ":places"] = measure.places[j]
+        return out
+
+    def with_date(self, table):
+        """?movie fr:releaseDate ?date — столбцы day и year."""
+        if self.dates is None:
+            raise Unsupported("releaseDate")
+        i, j = join(table["movie"], self.dates.subjects)
+        out = take(table, i)
+        out["day"] = self.dates.days[j]
+        out["year"] = self.dates.years[j]
+        return out
+
+    def with_optional_label(self, table, var, new):
+        """OPTIONAL { ?var fr:label ?new } + COALESCE(?new, STR(?var))."""
+        labelled = expand(table, var, self.edges["label"], new)
+        missing = where(table, ~np.isin(table[var], self.edges["label"][0]))
+        missing[new] = -1 - missing[var]
+        return {name: np.concatenate([labelled[name], missing[name]]) for name in labelled}
+
+    def contains(self, ids, key):
+        """CONTAINS(LCASE(?x), key) по термам ids; не строка — ложь, как ошибка в FILTER."""
+        uniq, inverse = np.unique(ids, return_inverse=True)
+        hits = np.zeros(len(uniq), dtype=bool)
+        for n, i in enumerate(uniq):
+            term = self.terms[i]
+            if isinstance(term, Literal) and term.datatype in (None, XSD.string):
+                hits[n] = key in str(term).lower()
+        return hits[inverse.reshape(-1)]
+
+    def genre_matches(self, table, genre, label="genreLabel"):
+        table = expand(table, "movie", self.edges["genre"], "genre")
+        table = expand(table, "genre", self.edges["label"], label)
+        return where(table, self.contains(table[label], str(lowercase(genre))))
+
+    def directing(self, table):
+        """?movie fr:hasCrew ?role . ?role a fr:CrewRole; crewJob ~ "director"; creditsPerson ?director."""
+        table = expand(table, "movie", self.edges["crew"], "role")
+        table = where(table, self.crew_roles[table["role"]])
+        table = expand(table, "role", self.edges["job"], "job")
+        table = where(table, self.contains(table["job"], "director"))
+        return expand(table, "role", self.edges["credits"], "director")
+
+    def in_dates(self, table, year_from, year_to):
+        first = year_start(year_from).toPython().toordinal()
+        last = year_end(year_to).toPython().toordinal()
+        return where(table, (table["day"] >= first) & (table["day"] <= last))
+
+    def aggregate_sum(self, groups, table, name):
+        return groups.sum(table[name]), groups.max(table[name + ":places"])
+
+    def avg(self, name, total, places, count):
+        measure = self.measure(name)
+        return avg_literal(measure.number(total, places), int(count), measure.datatype)
+
+    def sum(self, name, total, places):
+        measure = self.measure(name)
+        return sum_literal(measure.number(total, places), measure.datatype)
+
+    def rows(self, groups, chosen, make):
+        return [make(i, [self.term(k) for k in groups.key(i)]) for i in chosen]
+
+    # === Ответы на CQ ===
+
+    def answer(self, name, values):
+        """(переменные, строки) для CQ name с параметрами values или None."""
+        method = getattr(self, f"_answer_{name}", None)
+        if method is None:
+            return None
+        try:
+            return method(**values)
+        except Unsupported:
+            return None
+
+    def _answer_popular_genres(self):
+        t = expand(self.all_movies(), "movie", self.edges["genre"], "genre")
+        t = expand(t, "genre", self.edges["label"], "genreLabel")
+        groups = Groups(t, ["genreLabel"])
+        count = groups.count()
+        rows = self.rows(groups, top(10, count),
+                         lambda i, key: (*key, count_literal(int(count[i]))))
+        return _vars("genreLabel movieCount"), rows
+
+    def _answer_movies_in_year(self, year):
+        t = self.with_date(self.all_movies())
+        count = int(np.count_nonzero(t["year"] == int(year)))
+        return _vars("movieCount"), [(count_literal(count),)]
+
+    def _top_directors(self, t, year, keys):
+        t = self.with_measure(t, "revenue")
+        t = self.with_date(t)
+        t = where(t, t["year"] == int(year))
+        t = self.directing(t)
+        t = expand(t, "director", self.edges["label"], "directorName")
+        groups = Groups(t, keys)
+        total, places = self.aggregate_sum(groups, t, "revenue")
+        movies = groups.count_distinct(t["movie"])
+        return self.rows(groups, top(10, total), lambda i, key: (
+            *key, self.sum("revenue", total[i], places[i]), count_literal(int(movies[i]))))
+
+    def _answer_top_directors(self, genre, year):
+        t = self.genre_matches(self.all_movies(), genre)
+        rows = self._top_directors(t, year, ["director", "directorName", "genreLabel"])
+        return _vars("director directorName genreLabel totalRevenue movieCount"), rows
+
+    def _answer_top_directors_any_genre(self, year):
+        rows = self._top_directors(self.all_movies(), year, ["director", "directorName"])
+        return _vars("director directorName totalRevenue movieCount"), rows
+
+    def _answer_top_actors(self, genre, year_from, year_to, min_rating):
+        t = self.genre_matches(self.all_movies(), genre)
+        t = self.with_measure(t, "rating")
+        t = self.with_date(t)
+        t = where(t, (t["year"] >= int(year_from)) & (t["year"] <= int(year_to)))
+        t = where(t, self.measure("rating").bound(decimal(min_rating).toPython(), ">=")(t["rating"]))
+        t = expand(t, "movie", self.edges["cast"], "castRole")
+        t = where(t, self.cast_roles[t["castRole"]])
+        t = expand(t, "castRole", self.edges["played_by"], "actor")
+        t = expand(t, "actor", self.edges["label"], "actorName")
+        groups = Groups(t, ["actor", "actorName", "genreLabel"])
+        movies = groups.count_distinct(t["movie"])
+        total, places = self.aggregate_sum(groups, t, "rating")
+        count = groups.count()
+        keep = np.flatnonzero(movies >= 2)
+        chosen = keep[top(10, movies[keep], total[keep] / count[keep])]
+        rows = self.rows(groups, chosen, lambda i, key: (
+            *key, count_literal(int(movies[i])), self.avg("rating", total[i], places[i], count[i])))
+        return _vars("actor actorName genreLabel highRatedMovieCount avgRating"), rows
+
+    def _answer_top_companies(self, year_from, year_to):
+        t = expand(self.all_movies(), "movie", self.edges["company"], "company")
+        t = self.with_measure(t, "revenue")
+        t = self.in_dates(self.with_date(t), year_from, year_to)
+        t = expand(t, "company", self.edges["label"], "companyName")
+        groups = Groups(t, ["company", "companyName"])
+        total, places = self.aggregate_sum(groups, t, "revenue")
+        movies = groups.count_distinct(t["movie"])
+        rows = self.rows(groups, top(10, total), lambda i, key: (
+            *key, self.sum("revenue", total[i], places[i]), count_literal(int(movies[i]))))
+        return _vars("company companyName totalRevenue movieCount"), rows
+
+    def _answer_languages_by_rating(self, genre):
+        t = self.genre_matches(self.all_movies(), genre)
+        t = expand(t, "movie", self.edges["language"], "lang")
+        t = self.with_measure(t, "rating")
+        t = self.with_optional_label(t, "lang", "langLabel")
+        groups = Groups(t, ["lang", "langLabel"])
+        movies = groups.count_distinct(t["movie"])
+        total, places = self.aggregate_sum(groups, t, "rating")
+        count = groups.count()
+        keep = np.flatnonzero(movies >= 3)
+        chosen = keep[top(10, total[keep] / count[keep])]
+        rows = self.rows(groups, chosen, lambda i, key: (
+            *key, self.avg("rating", total[i], places[i], count[i]), count_literal(int(movies[i]))))
+        return _vars("lang langLabel avgRating movieCount"), rows
+
+    def _answer_directors_above_genre_avg(self):
+        positive = self.measure("rating").bound(0, ">")
+        rated = self.with_measure(self.all_movies(), "rating")
+        rated = where(rated, positive(rated["rating"]))
+        rated = expand(rated, "movie", self.edges["genre"], "genre")
+
+        # подзапрос: средний рейтинг жанра среди жанров с >= 10 фильмами
+        genres = Groups(rated, ["genre"])
+        genre_movies = genres.count_distinct(rated["movie"])
+        genre_total, genre_places = self.aggregate_sum(genres, rated, "rating")
+        genre_count = genres.count()
+        kept = genre_movies >= 10
+        genre_pos = np.full(len(self.terms), -1, dtype=np.int64)
+        genre_pos[genres.keys[kept, 0]] = np.flatnonzero(kept)
+
+        t = where(rated, genre_pos[rated["genre"]] >= 0)
+        t = expand(t, "movie", self.edges["director"], "director")
+        t = expand(t, "director", self.edges["label"], "directorName")
+        t = expand(t, "genre", self.edges["label"], "genreName")
+        groups = Groups(t, ["director", "directorName", "genre", "genreName"])
+        movies = groups.count_distinct(t["movie"])
+        total, places = self.aggregate_sum(groups, t, "rating")
+        count = groups.count()
+        g = genre_pos[groups.keys[:, 2]] if groups.size else np.zeros(0, dtype=np.int64)
+        # AVG(?rating) > ?genreAvgRating без деления: a/b > c/d <=> a*d > c*b
+        above = total * genre_count[g] > genre_total[g] * count
+        keep = np.flatnonzero((movies >= 2) & above)
+        diff = total[keep] / count[keep] - genre_total[g[keep]] / genre_count[g[keep]]
+        chosen = keep[top(50, diff)]
+        rows = []
+        for i in chosen:
+            director, director_name, _, genre_name = (self.term(k) for k in groups.key(i))
+            gi = g[i]
+            rows.append((director, director_name, genre_name,
+                         self.avg("rating", total[i], places[i], count[i]),
+                         self.avg("rating", genre_total[gi], genre_places[gi], genre_count[gi]),
+                         count_literal(int(movies[i]))))
+        return (_vars("director directorName genreName directorAvgRating genreAvgRating "
+                      "directorMovieCount"), rows)
+
+    def _answer_profitable_crew(self):
+        profit = self.measure("profit")
+        t = self.with_measure(self.all_movies(), "profit")
+        positive = t["profit"][profit.bound(0, ">")(t["profit"])]
+        # ?profit > AVG(?p) без деления; AVG пустого множества — 0, как у rdflib
+        count, total = len(positive), int(positive.sum())
+        if count:
+            t = where(t, t["profit"] * count > total)
+        else:
+            t = where(t, profit.bound(0, ">")(t["profit"]))
+        t = expand(t, "movie", self.edges["crew"], "crewRole")
+        t = expand(t, "crewRole", self.edges["credits"], "person")
+        t = expand(t, "person", self.edges["label"], "personName")
+        groups = Groups(t, ["person", "personName"])
+        movies = groups.count_distinct(t["movie"])
+        keep = np.flatnonzero(movies >= 2)
+        chosen = keep[top(10, movies[keep])]
+        rows = self.rows(groups, chosen, lambda i, key: (*key, count_literal(int(movies[i]))))
+        return _vars("person personName highProfitMovieCount"), rows
+
+    def _answer_long_genres(self, year, min_revenue):
+        t = expand(self.all_movies(), "movie", self.edges["genre"], "genre")
+        t = self.with_measure(self.with_measure(t, "runtime"), "revenue")
+        t = self.with_date(t)
+        t = where(t, t["year"] == int(year))
+        t = where(t, self.measure("revenue").bound(min_revenue, ">=")(t["revenue"]))
+        t = where(t, self.measure("runtime").bound(0, ">")(t["runtime"]))
+        t = expand(t, "genre", self.edges["label"], "genreName")
+        groups = Groups(t, ["genre", "genreName"])
+        movies = groups.count_distinct(t["movie"])
+        runtime, runtime_places = self.aggregate_sum(groups, t, "runtime")
+        revenue, revenue_places = self.aggregate_sum(groups, t, "revenue")
+        count = groups.count()
+        keep = np.flatnonzero(movies >= 2)
+        chosen = keep[top(15, runtime[keep] / count[keep])]
+        rows = self.rows(groups, chosen, lambda i, key: (
+            *key, self.avg("runtime", runtime[i], runtime_places[i], count[i]),
+            count_literal(int(movies[i])), self.sum("revenue", revenue[i], revenue_places[i])))
+        return _vars("genre genreName avgRuntime movieCount totalRevenue"), rows
+
+    def _answer_top_keywords(self, year_from, year_to, min_rating):
+        t = expand(self.all_movies(), "movie", self.edges["keyword"], "keyword")
+        t = self.with_measure(t, "rating")
+        t = self.in_dates(self.with_date(t), year_from, year_to)
+        t = where(t, self.measure("rating").bound(decimal(min_rating).toPython(), ">=")(t["rating"]))
+        t = expand(t, "keyword", self.edges["label"], "keywordLabel")
+        groups = Groups(t, ["keyword", "keywordLabel"])
+        movies = groups.count_distinct(t["movie"])
+        total, places = self.aggregate_sum(groups, t, "rating")
+        count = groups.count()
+        keep = np.flatnonzero(movies >= 3)
+        chosen = keep[top(10, movies[keep], total[keep] / count[keep])]
+        rows = self.rows(groups, chosen, lambda i, key: (
+            *key, count_literal(int(movies[i])), self.avg("rating", total[i], places[i], count[i])))
+        return _vars("keyword keywordLabel movieCount avgRating"), rows
+
+
+def _vars(names):
+    return [Variable(name) for name in names.split()]
+
+
+def graph_columns(graph):
+    """
+    Столбцы графа: уже привязанные, из <граф>.columns.pkl той же версии
+    или построенные заново (и сохранённые рядом с графом, если он из файла).
+    """
+    columns = getattr(graph, "columns", None)
+    version = getattr(graph, "content_version", None)
+    if columns is not None and columns.version == version:
+        return columns
+    path = getattr(graph, "source_path", None)
+    columns = None
+    if path and version and os.path.exists(columns_path(path)):
+        try:
+            columns = ColumnarGraph.load(columns_path(path))
+        except (OSError, ValueError, AttributeError, pickle.UnpicklingError) as e:
+            print(f"Столбцы {columns_path(path)} не прочитаны ({e}), строим заново")
+        if columns is not None and columns.version != version:
+            columns = None
+    if columns is None:
+        columns = ColumnarGraph.build(graph, version)
+        if path and version:
+            columns.save(columns_path(path))
+    graph.columns = columns
+    return columns
+
+
+# === Сверка с rdflib ===
+
+# ключ ORDER BY строки, если это не просто её столбцы
+SORT_KEYS = {
+    "directors_above_genre_avg": lambda row: (row[3].toPython() - row[4].toPython(),),
+}
+ORDER_VARIABLE = re.compile(r"\?(\w+)")
+
+
+def order_key(name, query, variables):
+    """
+    Ключ ORDER BY строки CQ name: из SORT_KEYS или по переменным после
+    ORDER BY в тексте query (variables — столбцы строк); None, если
+    ORDER BY нет и порядок строк не определён.
+    """
+    if name in SORT_KEYS:
+        return SORT_KEYS[name]
+    if "ORDER BY" not in query:
+        return None
+    order = query[query.rindex("ORDER BY"):]
+    columns = [variables.index(Variable(v)) for v in ORDER_VARIABLE.findall(order)]
+    return lambda row: tuple(row[i].n3() for i in columns)
+
+
+def compare(expected, actual, key):
+    """
+    None, если строки совпадают; иначе — описание расхождения. Строки с
+    равным ключом сортировки key(row) (см. order_key) могут идти в другом
+    порядке, а на границе LIMIT — быть другими из равных; key=None —
+    порядок не важен вовсе.
+    """
+    def text(row):
+        return tuple(v.n3() if v is not None else "UNDEF" for v in row)
+
+    if len(expected) != len(actual):
+        return f"строк {len(actual)}, а у rdflib {len(expected)}"
+    if key is None:
+        if sorted(map(text, expected)) != sorted(map(text, actual)):
+            return "другие строки"
+        return None
+    for n, (e, a) in enumerate(zip(expected, actual)):
+        if key(e) != key(a):
+            return f"строка {n + 1}: {text(a)}, а у rdflib {text(e)}"
+    if expected:
+        cut = key(expected[-1])
+        inner_e = sorted(text(r) for r in expected if key(r) != cut)
+        inner_a = sorted(text(r) for r in actual if key(r) != cut)
+        if inner_e != inner_a:
+            return "другие строки при тех же числах"
+    return None
+
+
+def main():
+    import sparql
+    from cq_registry import CHECK_QUERIES, COMPETENCY_QUERIES, get_cq
+
+    parser = argparse.ArgumentParser(description="Сверка колоночного движка с rdflib на всех CQ")
+    parser.add_argument("--graph", default=sparql.RDF_FILE)
+    args = parser.parse_args()
+
+    graph = sparql.load_graph(args.graph)
+    start = time.perf_counter()
+    columns = graph_columns(graph)
+    print(f"Столбцы: {len(columns.terms)} термов, {time.perf_counter() - start:.2f} сек")
+
+    failures = 0
+    print(f"{'CQ':28} {'rdflib':>8} {'numpy':>8}  результат")
+    for name in CHECK_QUERIES + COMPETENCY_QUERIES:
+        bound = get_cq(name).bind()
+        start = time.perf_counter()
+        expected = list(graph.query(bound.prepared, initBindings=bound.bindings))
+        rdflib_time = time.perf_counter() - start
+        start = time.perf_counter()
+        answered = columns.answer(name, bound.values)
+        numpy_time = time.perf_counter() - start
+        if answered is None:
+            status = "не поддержан"
+        else:
+            problem = compare(expected, answered[1], order_key(name, bound.text, answered[0]))
+            status = "ok" if problem is None else f"РАСХОЖДЕНИЕ: {problem}"
+            failures += problem is not None
+        print(f"{name:28} {rdflib_time:8.2f} {numpy_time:8.3f}  {status}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    # через импорт: иначе столбцы запишутся в pickle как __main__.ColumnarGraph
+    import columnar_engine
+
+    sys.exit(columnar_engine.main())
@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+"""
+Реестр CQ: параметризованные SPARQL-запросы, которые компилируются один раз.
+
+В CQ_&_SPARQL.md вопросы сформулированы как шаблоны («в определённом
+жанре», «за определённый год»), поэтому жанр, год, порог рейтинга и т.п.
+в текстах запросов — не литералы, а переменные (?genreKey, ?targetYear,
+...), значения которых подставляются через initBindings. Запрос
+разбирается и переводится в алгебру один раз на процесс (CQ.prepared),
+а каждый новый набор параметров — это только новые initBindings:
+
+    from cq_registry import run_cq
+    rows = run_cq(graph, "top_directors", genre="Action", year=2009)
+
+Параметры без значения берутся по умолчанию — так получаются ровно те
+CQ, что печатает sparql.py.
+
+Для графов, собранных с `main.py --derived`, есть два вида версий CQ:
+- *_derived (DERIVED_VERSIONS) — те же строки, что у исходной CQ:
+  YEAR(?date) = ?targetYear заменено точным совпадением fr:releaseYear;
+- *_exact (EXACT_VERSIONS) — другие запросы, а не ускоренные копии:
+  жанр — точный ключ fr:labelKey («action» не находит «Action & Adventure»,
+  а исходный CONTAINS находит), режиссёр — по fr:directedBy, поэтому в
+  SUM фильм входит один раз на режиссёра, а не на каждую его должность
+  с «director» (Director + Director of Photography — дважды).
+"""
+from decimal import Decimal
+
+from rdflib import Literal, Namespace, Variable
+from rdflib.namespace import RDF, RDFS, XSD
+from rdflib.plugins.sparql import prepareQuery
+
+from triple_emitter import label_key
+
+FR = Namespace("http://example.org/film-rating#")
+INIT_NS = {"rdf": RDF, "rdfs": RDFS, "fr": FR, "xsd": XSD}
+
+PREFIXES = f"""
+        PREFIX rdf:  <{RDF}>
+        PREFIX rdfs: <{RDFS}>
+        PREFIX fr:   <{FR}>
+        PREFIX xsd:  <{XSD}>
+"""
+
+
+# === Преобразование параметров в RDF-термы ===
+
+def lowercase(value):
+    """Подстрока для CONTAINS(LCASE(...), ?param)."""
+    return Literal(str(value).lower())
+
+
+def key(value):
+    """Точное значение fr:labelKey (метка в нижнем регистре)."""
+    return Literal(label_key(value), datatype=XSD.string)
+
+
+def integer(value):
+    return Literal(int(value))
+
+
+def decimal(value):
+    return Literal(Decimal(str(value)), datatype=XSD.decimal)
+
+
+def year_start(value):
+    return Literal(f"{int(value):04d}-01-01", datatype=XSD.date)
+
+
+def year_end(value):
+    return Literal(f"{int(value):04d}-12-31", datatype=XSD.date)
+
+
+class Param:
+    """Параметр CQ: переменная запроса, преобразование значения и значение по умолчанию."""
+
+    def __init__(self, variable, convert, default):
+        self.variable = Variable(variable)
+        self.convert = convert
+        self.default = default
+
+
+class CQ:
+    """
+    Параметризованный запрос. title форматируется значениями параметров
+    ("1. Кассовые режиссёры ({year} год, {genre})").
+    """
+
+    def __init__(self, name, title, text, **params):
+        self.name = name
+        self.title = title
+        self.text = PREFIXES + text
+        self.params = params
+        self._prepared = None
+
+    @property
+    def prepared(self):
+        """Запрос в алгебре SPARQL; разбирается при первом обращении."""
+        if self._prepared is None:
+            self._prepared = prepareQuery(self.text, initNs=INIT_NS)
+        return self._prepared
+
+    def values(self, **values):
+        unknown = set(values) - set(self.params)
+        if unknown:
+            raise TypeError(f"{self.name}: неизвестные параметры {sorted(unknown)}, "
+                            f"есть {sorted(self.params)}")
+        return {name: values.get(name, param.default) for name, param in self.params.items()}
+
+    def bind(self, **values):
+        return BoundCQ(self, self.values(**values))
+
+    def __repr__(self):
+        return f"CQ({self.name!r}, params={sorted(self.params)})"
+
+
+class BoundCQ:
+    """
+    CQ с конкретными значениями параметров — то, что отдаётся в
+    sparql.execute_query вместо текста запроса. Пиклится как (имя,
+    значения), поэтому уходит в воркеры parallel_queries без алгебры.
+    """
+
+    def __init__(self, cq, values):
+        self.cq = cq
+        self.values = values
+        self.bindings = {cq.params[name].variable: cq.params[name].convert(value)
+                         for name, value in values.items()}
+
+    @property
+    def name(self):
+        return self.cq.name
+
+    @property
+    def title(self):
+        return self.cq.title.format(**self.values)
+
+    @property
+    def text(self):
+        return self.cq.text
+
+    @property
+    def prepared(self):
+        return self.cq.prepared
+
+    def __reduce__(self):
+        return _rebind, (self.cq.name, self.values)
+
+    def __repr__(self):
+        return f"BoundCQ({self.cq.name!r}, {self.values!r})"
+
+
+def _rebind(name, values):
+    return REGISTRY[name].bind(**values)
+
+
+REGISTRY = {}
+
+
+def register(cq):
+    REGISTRY[cq.name] = cq
+    return cq
+
+
+def get_cq(name):
+    try:
+        return REGISTRY[name]
+    except KeyError:
+        raise KeyError(f"нет CQ {name!r}, есть: {', '.join(REGISTRY)}") from None
+
+
+def run_cq(graph, name, **params):
+    """Выполняет CQ из реестра с параметрами; результат rdflib (строки — по обходу)."""
+    bound = get_cq(name).bind(**params)
+    return graph.query(bound.prepared, initBindings=bound.bindings)
+
+
+# === Проверка структуры данных ===
+
+register(CQ("popular_genres", "Популярные жанры", """
+        SELECT DISTINCT ?genreLabel (COUNT(?movie) as ?movieCount)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:hasGenre ?genre .
+          ?genre fr:label ?genreLabel .
+        }
+        GROUP BY ?genreLabel
+        ORDER BY DESC(?movieCount)
+        LIMIT 10
+"""))
+
+register(CQ("movies_in_year", "Фильмы за {year} год", """
+        SELECT (COUNT(?movie) as ?movieCount)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:releaseDate ?date .
+          FILTER(YEAR(?date) = ?targetYear)
+        }
+""", year=Param("targetYear", integer, 2009)))
+
+
+# === CQ ===
+
+# 1. КАССОВЫЕ РЕЖИССЁРЫ
+register(CQ("top_directors", "1. Кассовые режиссёры ({year} год, {genre})", """
+        # 1. Кассовые режиссёры
+        SELECT ?director ?directorName ?genreLabel
+               (SUM(?revenue) AS ?totalRevenue)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:hasGenre ?genre ;
+                 fr:revenue ?revenue ;
+                 fr:releaseDate ?date ;
+                 fr:hasCrew ?role .
+
+          ?genre fr:label ?genreLabel .
+          FILTER(CONTAINS(LCASE(?genreLabel), ?genreKey))  # жанры с этими словами
+
+          BIND (YEAR(?date) AS ?year)
+          FILTER (?year = ?targetYear)
+
+          ?role a fr:CrewRole ;
+                fr:crewJob ?job ;
+                fr:creditsPerson ?director .
+
+          FILTER(CONTAINS(LCASE(?job), "director"))  # ищем любые director должности
+
+          ?director fr:label ?directorName .
+        }
+        GROUP BY ?director ?directorName ?genreLabel
+        ORDER BY DESC(?totalRevenue)
+        LIMIT 10
+""", genre=Param("genreKey", lowercase, "Action"), year=Param("targetYear", integer, 2009)))
+
+# 1а. Альтернатива: любой жанр за год
+register(CQ("top_directors_any_genre", "1а. Кассовые режиссёры ({year} год, любой жанр)", """
+        # 1а. Кассовые режиссёры за год (любой жанр)
+        SELECT ?director ?directorName
+               (SUM(?revenue) AS ?totalRevenue)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:revenue ?revenue ;
+                 fr:releaseDate ?date ;
+                 fr:hasCrew ?role .
+
+          BIND (YEAR(?date) AS ?year)
+          FILTER (?year = ?targetYear)
+
+          ?role a fr:CrewRole ;
+                fr:crewJob ?job ;
+                fr:creditsPerson ?director .
+
+          FILTER(CONTAINS(LCASE(?job), "director"))
+
+          ?director fr:label ?directorName .
+        }
+        GROUP BY ?director ?directorName
+        ORDER BY DESC(?totalRevenue)
+        LIMIT 10
+""", year=Param("targetYear", integer, 2009)))
+
+# 2. АКТЁРЫ В ВЫСОКООЦЕНЁННЫХ ФИЛЬМАХ
+register(CQ("top_actors",
+            "2. Актёры в жанре {genre} с высокими рейтингами ({year_from}-{year_to})", """
+        # 2. Актёры в высокооценённых фильмах
+        SELECT ?actor ?actorName ?genreLabel
+               (COUNT(DISTINCT ?movie) AS ?highRatedMovieCount)
+               (AVG(?rating) AS ?avgRating)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:hasGenre ?genre ;
+                 fr:voteAverage ?rating ;
+                 fr:releaseDate ?date ;
+                 fr:hasCast ?castRole .
+
+          ?genre fr:label ?genreLabel .
+          FILTER(CONTAINS(LCASE(?genreLabel), ?genreKey))
+
+          BIND (YEAR(?date) AS ?year)
+          FILTER (?year >= ?fromYear && ?year <= ?toYear)
+          FILTER (?rating >= ?minRating)
+
+          ?castRole a fr:CastRole ;
+                    fr:playedBy ?actor .
+
+          ?actor fr:label ?actorName .
+        }
+        GROUP BY ?actor ?actorName ?genreLabel
+        HAVING (COUNT(DISTINCT ?movie) >= 2)
+        ORDER BY DESC(?highRatedMovieCount) DESC(?avgRating)
+        LIMIT 10
+""", genre=Param("genreKey", lowercase, "Drama"),
+            year_from=Param("fromYear", integer, 2000), year_to=Param("toYear", integer, 2010),
+            min_rating=Param("minRating", decimal, "7.0")))
+
+# 3. КАССОВЫЕ КОМПАНИИ
+register(CQ("top_companies", "3. Самые кассовые кино-компании ({year_from}-{year_to})", """
+        # 3. Самые кассовые кино-компании
+        SELECT ?company ?companyName
+               (SUM(?revenue) AS ?totalRevenue)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:producedBy ?company ;
+                 fr:revenue ?revenue ;
+                 fr:releaseDate ?date .
+
+          FILTER (?date >= ?fromDate && ?date <= ?toDate)
+
+          ?company fr:label ?companyName .
+        }
+        GROUP BY ?company ?companyName
+        ORDER BY DESC(?totalRevenue)
+        LIMIT 10
+""", year_from=Param("fromDate", year_start, 2005), year_to=Param("toDate", year_end, 2010)))
+
+# 4. ЯЗЫКИ С ВЫСОКИМИ РЕЙТИНГАМИ
+register(CQ("languages_by_rating", "4. Языки с высокими рейтингами в {genre}", """
+        # 4. Языки озвучки с высокими рейтингами в жанре
+        SELECT ?lang ?langLabel
+               (AVG(?rating) AS ?avgRating)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:hasGenre ?genre ;
+                 fr:spokenLanguage ?lang ;
+                 fr:voteAverage ?rating .
+
+          ?genre fr:label ?genreLabel .
+          FILTER(CONTAINS(LCASE(?genreLabel), ?genreKey))
+
+          # Пытаемся получить метку языка, если есть
+          OPTIONAL { ?lang fr:label ?langLabel . }
+
+          # Если нет метки, используем сам URI
+          BIND(COALESCE(?langLabel, STR(?lang)) AS ?langLabel)
+        }
+        GROUP BY ?lang ?langLabel
+        HAVING (COUNT(DISTINCT ?movie) >= 3)
+        ORDER BY DESC(?avgRating)
+        LIMIT 10
+""", genre=Param("genreKey", lowercase, "Science Fiction")))
+
+# 5. РЕЖИССЁРЫ С ОЦЕНКАМИ ВЫШЕ СРЕДНЕГО
+register(CQ("directors_above_genre_avg", "5. Режиссёры с самыми высокими средними рейтингами", """
+        # 5. Режиссёры с оценками выше среднего по их жанрам (оптимизированный)
+        SELECT ?director ?directorName ?genreName
+               (AVG(?rating) AS ?directorAvgRating)
+               ?genreAvgRating
+               (COUNT(DISTINCT ?movie) AS ?directorMovieCount)
+        WHERE {
+          # Подзапрос: средний рейтинг по жанрам
+          {
+            SELECT ?genre (AVG(?r) AS ?genreAvgRating)
+            WHERE {
+              ?m a fr:Movie ;
+                 fr:hasGenre ?genre ;
+                 fr:voteAverage ?r .
+              FILTER(?r > 0)
+            }
+            GROUP BY ?genre
+            HAVING (COUNT(DISTINCT ?m) >= 10)
+          }
+
+          # Основной паттерн: фильмы × жанры × режиссёры
+          ?movie a fr:Movie ;
+                 fr:hasGenre ?genre ;
+                 fr:voteAverage ?rating ;
+                 fr:directedBy ?director .
+          FILTER(?rating > 0)
+
+          ?director fr:label ?directorName .
+          ?genre    fr:label ?genreName .
+        }
+        GROUP BY ?director ?directorName ?genre ?genreName ?genreAvgRating
+        HAVING (COUNT(DISTINCT ?movie) >= 2 &&
+                AVG(?rating) > ?genreAvgRating)
+        ORDER BY DESC(AVG(?rating) - ?genreAvgRating)
+        LIMIT 50
+"""))
+
+# 6. СОТРУДНИКИ НА ВЫСОКОПРИБЫЛЬНЫХ ФИЛЬМАХ
+register(CQ("profitable_crew", "6. Сотрудники на высокоприбыльных фильмах", """
+        # 6. Сотрудники на высокоприбыльных фильмах (через материализованный fr:profit)
+        SELECT ?person ?personName
+               (COUNT(DISTINCT ?movie) AS ?highProfitMovieCount)
+        WHERE {
+
+          # === (1) Один маленький подзапрос: средняя прибыль по фильмам ===
+          {
+            SELECT (AVG(?p) AS ?avgProfit)
+            WHERE {
+              ?m a fr:Movie ;
+                 fr:profit ?p .
+              FILTER(?p > 0)
+            }
+          }
+
+          # === (2) Фильмы с прибылью выше средней ===
+          ?movie a fr:Movie ;
+                 fr:profit ?profit ;
+                 fr:hasCrew ?crewRole .
+          FILTER(?profit > ?avgProfit)
+
+          # === (3) Участники съёмочной группы ===
+          ?crewRole fr:creditsPerson ?person .
+          ?person fr:label ?personName .
+        }
+        GROUP BY ?person ?personName
+        HAVING (COUNT(DISTINCT ?movie) >= 2)
+        ORDER BY DESC(?highProfitMovieCount)
+        LIMIT 10
+"""))
+
+# 7. ЖАНРЫ С ДЛИТЕЛЬНЫМИ ФИЛЬМАМИ
+register(CQ("long_genres", "7. Жанры с самой большой продолжительностью ({year})", """
+        # 7. Жанры с самой большой продолжительностью фильмов
+        SELECT ?genre ?genreName
+               (AVG(?runtime) AS ?avgRuntime)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+               (SUM(?revenue) AS ?totalRevenue)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:hasGenre ?genre ;
+                 fr:runtime ?runtime ;
+                 fr:revenue ?revenue ;
+                 fr:releaseDate ?date .
+
+          BIND (YEAR(?date) AS ?year)
+          FILTER (?year = ?targetYear)
+          FILTER (?revenue >= ?minRevenue)  # порог успешности
+          FILTER (?runtime > 0)  # исключаем нулевую продолжительность
+
+          ?genre fr:label ?genreName .
+        }
+        GROUP BY ?genre ?genreName
+        HAVING (COUNT(DISTINCT ?movie) >= 2)
+        ORDER BY DESC(?avgRuntime)
+        LIMIT 15
+""", year=Param("targetYear", integer, 2010), min_revenue=Param("minRevenue", integer, 50000000)))
+
+# 8. КЛЮЧЕВЫЕ СЛОВА ЛУЧШИХ ФИЛЬМОВ
+register(CQ("top_keywords", "8. Ключевые слова лучших фильмов ({year_from}-{year_to})", """
+        # 8. Ключевые слова лучших фильмов
+        SELECT ?keyword ?keywordLabel
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+               (AVG(?rating) AS ?avgRating)
+        WHERE {
+          ?movie a fr:Movie ;
+                 fr:hasKeyword ?keyword ;
+                 fr:voteAverage ?rating ;
+                 fr:releaseDate ?date .
+
+          FILTER (?date >= ?fromDate && ?date <= ?toDate)
+          FILTER (?rating >= ?minRating)
+
+          OPTIONAL { ?keyword fr:label ?keywordLabel . }
+          FILTER(BOUND(?keywordLabel))  # только ключевые слова с меткой
+        }
+        GROUP BY ?keyword ?keywordLabel
+        HAVING (COUNT(DISTINCT ?movie) >= 3)
+        ORDER BY DESC(?movieCount) DESC(?avgRating)
+        LIMIT 10
+""", year_from=Param("fromDate", year_start, 2000), year_to=Param("toDate", year_end, 2010),
+            min_rating=Param("minRating", decimal, "7.0")))
+
+
+# === Версии по производным фактам (main.py --derived) ===
+# *_derived возвращают те же строки, что исходные CQ
+
+register(CQ("movies_in_year_derived", "Фильмы за {year} год (fr:releaseYear)", """
+        SELECT (COUNT(?movie) as ?movieCount)
+        WHERE {
+          ?movie fr:releaseYear ?targetYear ;
+                 a fr:Movie .
+        }
+""", year=Param("targetYear", integer, 2009)))
+
+register(CQ("long_genres_derived",
+            "7. Жанры с самой большой продолжительностью ({year}; производные факты)", """
+        # 7. Жанры с самой большой продолжительностью фильмов
+        SELECT ?genre ?genreName
+               (AVG(?runtime) AS ?avgRuntime)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+               (SUM(?revenue) AS ?totalRevenue)
+        WHERE {
+          ?movie fr:releaseYear ?targetYear ;
+                 a fr:Movie ;
+                 fr:hasGenre ?genre ;
+                 fr:runtime ?runtime ;
+                 fr:revenue ?revenue .
+
+          FILTER (?revenue >= ?minRevenue)  # порог успешности
+          FILTER (?runtime > 0)  # исключаем нулевую продолжительность
+
+          ?genre fr:label ?genreName .
+        }
+        GROUP BY ?genre ?genreName
+        HAVING (COUNT(DISTINCT ?movie) >= 2)
+        ORDER BY DESC(?avgRuntime)
+        LIMIT 15
+""", year=Param("targetYear", integer, 2010), min_revenue=Param("minRevenue", integer, 50000000)))
+
+
+# === Другие запросы по производным фактам: точный жанр и fr:directedBy ===
+# жанр — точное совпадение ключа («action»), а не подстрока метки; в SUM
+# фильм входит один раз на режиссёра, а не на каждую его «director»-должность
+
+register(CQ("top_directors_exact",
+            "1. Кассовые режиссёры ({year} год, жанр ровно {genre}; fr:directedBy)", """
+        # 1. Кассовые режиссёры: год, жанр и режиссёр — по точным совпадениям
+        SELECT ?director ?directorName ?genreLabel
+               (SUM(?revenue) AS ?totalRevenue)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+        WHERE {
+          ?genre fr:labelKey ?genreKey ;
+                 fr:label ?genreLabel .
+
+          ?movie fr:releaseYear ?targetYear ;
+                 fr:hasGenre ?genre ;
+                 a fr:Movie ;
+                 fr:revenue ?revenue ;
+                 fr:directedBy ?director .
+
+          ?director fr:label ?directorName .
+        }
+        GROUP BY ?director ?directorName ?genreLabel
+        ORDER BY DESC(?totalRevenue)
+        LIMIT 10
+""", genre=Param("genreKey", key, "Action"), year=Param("targetYear", integer, 2009)))
+
+register(CQ("top_directors_any_genre_exact",
+            "1а. Кассовые режиссёры ({year} год, любой жанр; fr:directedBy)", """
+        # 1а. Кассовые режиссёры за год (любой жанр)
+        SELECT ?director ?directorName
+               (SUM(?revenue) AS ?totalRevenue)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+        WHERE {
+          ?movie fr:releaseYear ?targetYear ;
+                 a fr:Movie ;
+                 fr:revenue ?revenue ;
+                 fr:directedBy ?director .
+
+          ?director fr:label ?directorName .
+        }
+        GROUP BY ?director ?directorName
+        ORDER BY DESC(?totalRevenue)
+        LIMIT 10
+""", year=Param("targetYear", integer, 2009)))
+
+register(CQ("top_actors_exact",
+            "2. Актёры в жанре ровно {genre} с высокими рейтингами ({year_from}-{year_to})",
+            """
+        # 2. Актёры в высокооценённых фильмах
+        SELECT ?actor ?actorName ?genreLabel
+               (COUNT(DISTINCT ?movie) AS ?highRatedMovieCount)
+               (AVG(?rating) AS ?avgRating)
+        WHERE {
+          ?genre fr:labelKey ?genreKey ;
+                 fr:label ?genreLabel .
+
+          ?movie fr:hasGenre ?genre ;
+                 a fr:Movie ;
+                 fr:releaseYear ?year ;
+                 fr:voteAverage ?rating ;
+                 fr:hasCast ?castRole .
+
+          FILTER (?year >= ?fromYear && ?year <= ?toYear)
+          FILTER (?rating >= ?minRating)
+
+          ?castRole a fr:CastRole ;
+                    fr:playedBy ?actor .
+
+          ?actor fr:label ?actorName .
+        }
+        GROUP BY ?actor ?actorName ?genreLabel
+        HAVING (COUNT(DISTINCT ?movie) >= 2)
+        ORDER BY DESC(?highRatedMovieCount) DESC(?avgRating)
+        LIMIT 10
+""", genre=Param("genreKey", key, "Drama"),
+            year_from=Param("fromYear", integer, 2000), year_to=Param("toYear", integer, 2010),
+            min_rating=Param("minRating", decimal, "7.0")))
+
+register(CQ("languages_by_rating_exact",
+            "4. Языки с высокими рейтингами в жанре ровно {genre}", """
+        # 4. Языки озвучки с высокими рейтингами в жанре
+        SELECT ?lang ?langLabel
+               (AVG(?rating) AS ?avgRating)
+               (COUNT(DISTINCT ?movie) AS ?movieCount)
+        WHERE {
+          ?genre fr:labelKey ?genreKey .
+
+          ?movie fr:hasGenre ?genre ;
+                 a fr:Movie ;
+                 fr:spokenLanguage ?lang ;
+                 fr:voteAverage ?rating .
+
+          OPTIONAL { ?lang fr:label ?langLabel . }
+          BIND(COALESCE(?langLabel, STR(?lang)) AS ?langLabel)
+        }
+        GROUP BY ?lang ?langLabel
+        HAVING (COUNT(DISTINCT ?movie) >= 3)
+        ORDER BY DESC(?avgRating)
+        LIMIT 10
+""", genre=Param("genreKey", key, "Science Fiction")))
+
+# CQ -> её версия по производным фактам с теми же строками (sparql.py --derived)
+DERIVED_VERSIONS = {
+    "movies_in_year": "movies_in_year_derived",
+    "long_genres": "long_genres_derived",
+}
+# CQ -> другой запрос по производным фактам (sparql.py --exact)
+EXACT_VERSIONS = {
+    "top_directors": "top_directors_exact",
+    "top_directors_any_genre": "top_directors_any_genre_exact",
+    "top_actors": "top_actors_exact",
+    "languages_by_rating": "languages_by_rating_exact",
+}
+
+CHECK_QUERIES = ["popular_genres", "movies_in_year"]
+COMPETENCY_QUERIES = ["top_directors", "top_directors_any_genre", "top_actors", "top_companies",
+                      "languages_by_rating", "directors_above_genre_avg", "profitable_crew",
+                      "long_genres", "top_keywords"]
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Предагрегированный куб по фильмам для агрегатных CQ.
+
+CQ3, CQ4, CQ5 и CQ7 — это SUM/AVG/COUNT по одним и тем же фактам о
+фильмах, сгруппированные по компании, жанру, языку или режиссёру. Куб
+считает частичные агрегаты один раз (count / sum / min / max на ячейку):
+
+    company_year     (компания, метка, год)                 — CQ3
+    genre_language   (жанр, метка, язык, метка языка)       — CQ4
+    genre_rating     (жанр), только voteAverage > 0         — CQ5, подзапрос
+    director_genre   (режиссёр, метка, жанр, метка), > 0    — CQ5
+    genre_year       (жанр, метка, год, revenue >= 50M, runtime > 0) — CQ7
+
+и answer() собирает из ячеек ровно те строки, что вернул бы SPARQL, за
+миллисекунды. Порог CQ7 — фиксированная корзина SUCCESS_REVENUE; если
+параметры запроса не укладываются в куб (другой порог, подстрока жанра
+совпала с несколькими жанрами — тогда COUNT(DISTINCT) не складывается,
+у фильма несколько значений одного свойства), answer() возвращает None и
+sparql.py выполняет запрос как обычно.
+
+Куб строится по самому графу (а не по CSV), поэтому совпадает с тем, что
+видит SPARQL; билдеры пишут его рядом с TTL (<граф>.cube.pkl) вместе с
+версией содержимого, для остальных графов sparql.py строит его при
+первом запросе.
+"""
+import os
+import pickle
+from decimal import Decimal
+
+from rdflib import Literal, Namespace, Variable
+from rdflib.namespace import RDF, XSD
+from rdflib.plugins.sparql.operators import numeric
+from rdflib.plugins.sparql.sparql import SPARQLError
+
+FR = Namespace("http://example.org/film-rating#")
+
+CUBE_VERSION = 1
+# фиксированная корзина «успешных» фильмов для CQ7
+SUCCESS_REVENUE = 50_000_000
+
+MEASURES = {"revenue": FR.revenue, "rating": FR.voteAverage, "runtime": FR.runtime}
+
+
+def cube_path(graph_path):
+    return graph_path + ".cube.pkl"
+
+
+# === Ячейки ===
+
+class Cell:
+    """count + (sum, min, max) по каждой мере."""
+
+    __slots__ = ("movies", "measures")
+
+    def __init__(self):
+        self.movies = 0
+        self.measures = {}
+
+    def add(self, **values):
+        self.movies += 1
+        for name, value in values.items():
+            acc = self.measures.get(name)
+            if acc is None:
+                self.measures[name] = [value, value, value]
+            else:
+                acc[0] += value
+                acc[1] = min(acc[1], value)
+                acc[2] = max(acc[2], value)
+
+    def total(self, name):
+        return self.measures[name][0] if name in self.measures else 0
+
+    def __getstate__(self):
+        return self.movies, self.measures
+
+    def __setstate__(self, state):
+        self.movies, self.measures = state
+
+
+def _merge(cells):
+    merged = Cell()
+    for cell in cells:
+        merged.movies += cell.movies
+        for name, (total, low, high) in cell.measures.items():
+            acc = merged.measures.get(name)
+            if acc is None:
+                merged.measures[name] = [total, low, high]
+            else:
+                acc[0] += total
+                acc[1] = min(acc[1], low)
+                acc[2] = max(acc[2], high)
+    return merged
+
+
+# === Агрегаты так, как их отдаёт rdflib ===
+
+def sum_literal(total, datatype):
+    return Literal(total, datatype=datatype)
+
+
+def avg_literal(total, count, datatype):
+    if count == 0:
+        return Literal(0)
+    if datatype in (XSD.float, XSD.double):
+        return Literal(total / count)
+    return Literal(Decimal(total) / Decimal(count))
+
+
+def count_literal(n):
+    return Literal(n)
+
+
+# === Построение ===
+
+class MovieCube:
+    def __init__(self, version=None):
+        self.version = version
+        self.format = CUBE_VERSION
+        self.datatypes = {}
+        # факты, которые куб не может свести к ячейкам
+        self.inexact = set()
+        self.company_year = {}
+        self.genre_language = {}
+        self.genre_rating = {}
+        self.director_genre = {}
+        self.genre_year = {}
+
+    @classmethod
+    def build(cls, graph, version=None):
+        cube = cls(version)
+        movies = set(graph.subjects(RDF.type, FR.Movie))
+
+        def by_subject(predicate):
+            values = {}
+            for s, o in graph.subject_objects(predicate):
+                if s in movies or predicate == FR.label:
+                    values.setdefault(s, []).append(o)
+            return values
+
+        labels = by_subject(FR.label)
+        genres = by_subject(FR.hasGenre)
+        companies = by_subject(FR.producedBy)
+        languages = by_subject(FR.spokenLanguage)
+        directors = by_subject(FR.directedBy)
+        dates = by_subject(FR.releaseDate)
+
+        numbers = {}
+        for name, predicate in MEASURES.items():
+            numbers[name] = {}
+            for movie, values in by_subject(predicate).items():
+                if len(values) > 1:
+                    cube.inexact.add(name)
+                    continue
+                # из лексической формы, как после разбора TTL: у графа из
+                # билдера toPython() у xsd:decimal может быть float
+                literal = Literal(str(values[0]), datatype=values[0].datatype)
+                try:
+                    numbers[name][movie] = numeric(literal)
+                except SPARQLError:
+                    cube.inexact.add(name)
+                    continue
+                datatype = cube.datatypes.setdefault(name, literal.datatype)
+                if datatype != literal.datatype:
+                    cube.inexact.add(name)
+
+        years = {}
+        for movie, values in dates.items():
+            if len(values) > 1:
+                cube.inexact.add("date")
+                continue
+            value = values[0].toPython()
+            if values[0].datatype == XSD.date and hasattr(value, "year"):
+                years[movie] = value.year
+
+        revenue, rating, runtime = numbers["revenue"], numbers["rating"], numbers["runtime"]
+
+        def cell(table, key):
+            c = table.get(key)
+            if c is None:
+                c = table[key] = Cell()
+            return c
+
+        def labelled(nodes):
+            for node in nodes:
+                for label in labels.get(node, ()):
+                    yield node, label
+
+        for movie in movies:
+            movie_genres = list(labelled(genres.get(movie, ())))
+            year = years.get(movie)
+
+            # CQ3: компания × год
+            if movie in revenue and year is not None:
+                for company, name in labelled(companies.get(movie, ())):
+                    cell(cube.company_year, (company, name, year)).add(revenue=revenue[movie])
+
+            if movie in rating:
+                r = rating[movie]
+                # CQ4: жанр × язык (у языка без метки — его URI, как COALESCE)
+                for genre, genre_name in movie_genres:
+                    for lang in languages.get(movie, ()):
+                        for lang_name in labels.get(lang) or [Literal(str(lang))]:
+                            cell(cube.genre_language,
+                                 (genre, genre_name, lang, lang_name)).add(rating=r)
+                # CQ5: только оценённые фильмы
+                if r > 0:
+                    for genre in genres.get(movie, ()):
+                        cell(cube.genre_rating, genre).add(rating=r)
+                    for director, director_name in labelled(directors.get(movie, ())):
+                        for genre, genre_name in movie_genres:
+                            cell(cube.director_genre,
+                                 (director, director_name, genre, genre_name)).add(rating=r)
+
+            # CQ7: жанр × год × корзины порогов
+            if movie in revenue and movie in runtime and year is not None:
+                key_tail = (year, revenue[movie] >= SUCCESS_REVENUE, runtime[movie] > 0)
+                for genre, genre_name in movie_genres:
+                    cell(cube.genre_year, (genre, genre_name, *key_tail)).add(
+                        runtime=runtime[movie], revenue=revenue[movie])
+        return cube
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            cube = pickle.load(f)
+        if not isinstance(cube, cls) or cube.format != CUBE_VERSION:
+            raise ValueError(f"{path}: не куб версии {CUBE_VERSION}")
+        return cube
+
+    # === Ответы на CQ ===
+
+    def answer(self, name, values):
+        """(переменные, строки) для CQ name с параметрами values или None."""
+        method = getattr(self, f"_answer_{name}", None)
+        if method is None:
+            return None
+        return method(**values)
+
+    def _dt(self, name):
+        return self.datatypes.get(name, XSD.integer)
+
+    def _matching_genre(self, cells, key):
+        """Единственный (жанр, метка) с подстрокой key; иначе None."""
+        key = str(key).lower()
+        matches = {(k[0], k[1]) for k in cells if key in str(k[1]).lower()}
+        return matches.pop() if len(matches) == 1 else None
+
+    def _answer_top_companies(self, year_from, year_to):
+        if self.inexact & {"revenue", "date"}:
+            return None
+        groups = {}
+        for (company, name, year), c in self.company_year.items():
+            if int(year_from) <= year <= int(year_to):
+                groups.setdefault((company, name), []).append(c)
+        rows = []
+        for (company, name), cells in groups.items():
+            c = _merge(cells)
+            rows.append((company, name, sum_literal(c.total("revenue"), self._dt("revenue")),
+                         count_literal(c.movies)))
+        rows.sort(key=lambda row: row[2].toPython(), reverse=True)
+        return _vars("company companyName totalRevenue movieCount"), rows[:10]
+
+    def _answer_languages_by_rating(self, genre):
+        if "rating" in self.inexact:
+            return None
+        match = self._matching_genre(self.genre_language, genre)
+        if match is None:
+            return None
+        rows = []
+        for (g, g_name, lang, lang_name), c in self.genre_language.items():
+            if (g, g_name) == match and c.movies >= 3:
+                rows.append((lang, lang_name,
+                             avg_literal(c.total("rating"), c.movies, self._dt("rating")),
+                             count_literal(c.movies)))
+        rows.sort(key=lambda row: row[2].toPython(), reverse=True)
+        return _vars("lang langLabel avgRating movieCount"), rows[:10]
+
+    def _answer_directors_above_genre_avg(self):
+        if "rating" in self.inexact:
+            return None
+        dt = self._dt("rating")
+        genre_avg = {genre: avg_literal(c.total("rating"), c.movies, dt)
+                     for genre, c in self.genre_rating.items() if c.movies >= 10}
+        rows = []
+        for (director, d_name, genre, g_name), c in self.director_genre.items():
+            if genre not in genre_avg or c.movies < 2:
+                continue
+            avg = avg_literal(c.total("rating"), c.movies, dt)
+            if avg.toPython() > genre_avg[genre].toPython():
+                rows.append((director, d_name, g_name, avg, genre_avg[genre], count_literal(c.movies)))
+        rows.sort(key=lambda row: row[3].toPython() - row[4].toPython(), reverse=True)
+        return (_vars("director directorName genreName directorAvgRating genreAvgRating "
+                      "directorMovieCount"), rows[:50])
+
+    def _answer_long_genres(self, year, min_revenue):
+        if int(min_revenue) != SUCCESS_REVENUE or self.inexact & {"revenue", "runtime", "date"}:
+            return None
+        groups = {}
+        for (genre, name, y, success, timed), c in self.genre_year.items():
+            if y == int(year) and success and timed:
+                groups.setdefault((genre, name), []).append(c)
+        rows = []
+        for (genre, name), cells in groups.items():
+            c = _merge(cells)
+            if c.movies >= 2:
+                rows.append((genre, name,
+                             avg_literal(c.total("runtime"), c.movies, self._dt("runtime")),
+                             count_literal(c.movies),
+                             sum_literal(c.total("revenue"), self._dt("revenue"))))
+        rows.sort(key=lambda row: row[2].toPython(), reverse=True)
+        return _vars("genre genreName avgRuntime movieCount totalRevenue"), rows[:15]
+
+
+def _vars(names):
+    return [Variable(name) for name in names.split()]
+
+
+def write_cube(graph, graph_path, version):
+    """Куб для графа, только что записанного в graph_path (вызывают билдеры)."""
+    cube = MovieCube.build(graph, version)
+    cube.save(cube_path(graph_path))
+    return cube
+
+
+def graph_cube(graph):
+    """
+    Куб графа: уже привязанный, из <граф>.cube.pkl той же версии или
+    построенный заново (и сохранённый рядом с графом, если он из файла).
+    """
+    cube = getattr(graph, "cube", None)
+    version = getattr(graph, "content_version", None)
+    if cube is not None and cube.version == version:
+        return cube
+    path = getattr(graph, "source_path", None)
+    if path and version and os.path.exists(cube_path(path)):
+        try:
+            cube = MovieCube.load(cube_path(path))
+        except (OSError, ValueError, pickle.UnpicklingError) as e:
+            print(f"Куб {cube_path(path)} не прочитан ({e}), строим заново")
+            cube = None
+        if cube is not None and cube.version != version:
+            cube = None
+    if cube is None:
+        cube = MovieCube.build(graph, version)
+        if path and version:
+            cube.save(cube_path(path))
+    graph.cube = cube
+    return cube
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Компактный бинарный снимок графа для быстрой загрузки в sparql.py.
+
+Формат (.snap рядом с .ttl):
+    MAGIC
+    uint32 длина заголовка + заголовок в JSON
+        (версия, sha256 исходного TTL, crc32 данных, размеры, префиксы, языки)
+    uint8[n_terms]   вид терма: 0 — URI, 1 — литерал, 2 — blank node
+    int32[n_terms]   id терма-датадайпа литерала или -1
+    int16[n_terms]   номер языкового тега литерала или -1
+    uint32[n_triples * 3]  триплеты (s, p, o) как id термов
+    utf-8            лексические значения термов через "\\0"
+
+Термы словарно закодированы, поэтому загрузка — это один split строки
+и создание каждого терма один раз, без Turtle-парсера.
+"""
+import hashlib
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+from rdflib import BNode, Graph, Literal, URIRef
+
+MAGIC = b"TMDBSNP1"
+VERSION = 1
+
+URI, LITERAL, BNODE = 0, 1, 2
+
+
+def snapshot_path(ttl_path):
+    return os.path.splitext(ttl_path)[0] + ".snap"
+
+
+def file_sha256(path, block=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def encode_terms(g):
+    """Словарь термов + массив триплетов из id."""
+    ids = {}
+    terms = []
+
+    def term_id(term):
+        i = ids.get(term)
+        if i is None:
+            i = ids[term] = len(terms)
+            terms.append(term)
+        return i
+
+    triples = np.fromiter(
+        (term_id(t) for triple in g for t in triple),
+        dtype=np.uint32, count=len(g) * 3,
+    )
+
+    # дататайпы — тоже термы (URI), добавляем их до кодирования атрибутов
+    for term in list(terms):
+        if isinstance(term, Literal) and term.datatype is not None:
+            term_id(term.datatype)
+
+    langs = sorted({t.language for t in terms if isinstance(t, Literal) and t.language})
+    lang_ids = {lang: i for i, lang in enumerate(langs)}
+
+    n = len(terms)
+    kinds = np.empty(n, dtype=np.uint8)
+    datatypes = np.full(n, -1, dtype=np.int32)
+    languages = np.full(n, -1, dtype=np.int16)
+    values = []
+    for i, term in enumerate(terms):
+        if isinstance(term, Literal):
+            kinds[i] = LITERAL
+            if term.datatype is not None:
+                datatypes[i] = ids[term.datatype]
+            if term.language:
+                languages[i] = lang_ids[term.language]
+        elif isinstance(term, BNode):
+            kinds[i] = BNODE
+        else:
+            kinds[i] = URI
+        value = str(term)
+        if "\0" in value:
+            raise ValueError(f"Snapshot format can't store NUL in term: {value!r}")
+        values.append(value)
+
+    return kinds, datatypes, languages, triples, "\0".join(values).encode("utf-8"), langs
+
+
+def write_snapshot(g, path, source=None):
+    """
+    Пишет снимок графа g. source — TTL, из которого граф был сохранён:
+    его sha256 попадает в заголовок и служит проверкой на устаревание.
+    """
+    kinds, datatypes, languages, triples, blob, langs = encode_terms(g)
+    payload = [kinds.tobytes(), datatypes.tobytes(), languages.tobytes(), triples.tobytes(), blob]
+
+    crc = 0
+    for part in payload:
+        crc = zlib.crc32(part, crc)
+
+    header = json.dumps({
+        "version": VERSION,
+        "source_sha256": file_sha256(source) if source else None,
+        "n_terms": int(len(kinds)),
+        "n_triples": int(len(triples) // 3),
+        "blob_size": len(blob),
+        "crc32": crc,
+        "langs": langs,
+        "namespaces": {prefix: str(ns) for prefix, ns in g.namespaces()},
+    }).encode("utf-8")
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for part in payload:
+            f.write(part)
+    os.replace(tmp, path)
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None, 0
+        (size,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(size))
+    return header, len(MAGIC) + 4 + size
+
+
+def is_fresh(path, source):
+    """Снимок есть, новее исходного TTL и сделан именно из него."""
+    if not os.path.exists(path):
+        return False
+    header, _ = read_header(path)
+    if header is None or header.get("version") != VERSION:
+        return False
+    if source is None or not os.path.exists(source):
+        return True
+    if os.path.getmtime(path) < os.path.getmtime(source):
+        return False
+    return header.get("source_sha256") == file_sha256(source)
+
+
+def read_snapshot(path):
+    """Читает снимок: (header, kinds, datatypes, languages, triples, values)."""
+    header, offset = read_header(path)
+    if header is None:
+        raise ValueError(f"{path}: not a graph snapshot")
+    n, m = header["n_terms"], header["n_triples"]
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        raw = f.read()
+
+    sizes = [n, 4 * n, 2 * n, 12 * m, header["blob_size"]]
+    parts, pos = [], 0
+    for size in sizes:
+        parts.append(raw[pos:pos + size])
+        pos += size
+    crc = 0
+    for part in parts:
+        crc = zlib.crc32(part, crc)
+    if crc != header["crc32"]:
+        raise ValueError(f"{path}: checksum mismatch, snapshot is corrupted")
+
+    kinds = np.frombuffer(parts[0], dtype=np.uint8)
+    datatypes = np.frombuffer(parts[1], dtype=np.int32)
+    languages = np.frombuffer(parts[2], dtype=np.int16)
+    triples = np.frombuffer(parts[3], dtype=np.uint32).reshape(-1, 3)
+    values = parts[4].decode("utf-8").split("\0") if n else []
+    return header, kinds, datatypes, languages, triples, values
+
+
+def decode_terms(header, kinds, datatypes, languages, values):
+    """Массивы снимка -> список rdflib-термов по id."""
+    terms = [None] * len(values)
+    kinds_list = kinds.tolist()
+    # сначала URI и blank nodes: на них ссылаются дататайпы литералов
+    for i, (kind, value) in enumerate(zip(kinds_list, values)):
+        if kind == URI:
+            terms[i] = URIRef(value)
+        elif kind == BNODE:
+            terms[i] = BNode(value)
+    langs = header["langs"]
+    for i in np.flatnonzero(kinds == LITERAL).tolist():
+        dt, lang = int(datatypes[i]), int(languages[i])
+        terms[i] = Literal(values[i],
+                           datatype=terms[dt] if dt >= 0 else None,
+                           lang=langs[lang] if lang >= 0 else None)
+    return terms
+
+
+def load_snapshot(path):
+    """Восстанавливает rdflib.Graph из снимка."""
+    header, kinds, datatypes, languages, triples, values = read_snapshot(path)
+    terms = decode_terms(header, kinds, datatypes, languages, values)
+
+    g = Graph()
+    for prefix, ns in header["namespaces"].items():
+        g.bind(prefix, ns, override=True)
+    g.addN((terms[s], terms[p], terms[o], g) for s, p, o in triples.tolist())
+    return g
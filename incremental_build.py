@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Инкрементальная пересборка: к существующему графу применяется только
+дельта по изменившимся фильмам.
+
+После каждой сборки рядом с выходным файлом сохраняется состояние —
+хэш содержимого каждой строки merged movies/credits. При обновлении CSV
+хэши сравниваются, и для добавленных / изменённых / удалённых фильмов:
+- снимаются старые триплеты фильма и его CastRole/CrewRole узлов,
+  которых нет в новой версии;
+- добавляются новые триплеты, которых ещё нет в графе;
+- у переименованных общих сущностей старый fr:label (и fr:labelKey)
+  заменяется новым;
+- удаляются общие сущности (Person, Genre, ...), на которые больше
+  никто не ссылается.
+Вычисление дельты пропорционально числу изменённых фильмов, а не размеру
+корпуса. Поэтому main.py применяет её только к персистентному хранилищу
+(`--store PATH --incremental`): для TTL пришлось бы разобрать и заново
+сериализовать весь граф, и это дольше полной сборки.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from rdflib import Graph
+
+from main import FR, SHARED_ENTITY_PREFIXES, emit_movies, movie_uri, new_emitter
+
+# меняется вместе с логикой билдера и хэшей: старое состояние тогда недействительно
+BUILD_VERSION = 3
+# хэш пропущенного значения и множитель, которым колонки сводятся в хэш строки
+MISSING_HASH = np.uint64(0x9E3779B97F4A7C15)
+HASH_PRIME = np.uint64(1099511628211)
+
+ROLE_LINKS = (FR.hasCast, FR.hasCrew)
+# факты общей сущности, которые переписываются при её переименовании
+ENTITY_FACTS = (FR.label, FR.labelKey)
+
+
+def state_path(output_path):
+    return f"{output_path}.state.json"
+
+
+def movie_hashes(df):
+    """movie id -> хэш всей строки (фильм + его cast/crew), векторно."""
+    # хэш строки не должен зависеть от того, с какими соседями её читали:
+    # у пачки без пропусков числовая колонка выйдет int64, поэтому числа —
+    # как float64, а колонка, пустая во всей пачке, — float64 вместо строк,
+    # поэтому пропуск хэшируется одной константой в колонке любого типа
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for col in sorted(df.columns):
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values):
+            values = values.astype("float64")
+        h = pd.util.hash_pandas_object(values, index=False).to_numpy(copy=True)
+        h[values.isna().to_numpy()] = MISSING_HASH
+        hashes = hashes * HASH_PRIME ^ h
+    return dict(zip(df["id"].astype(str), (f"{h:016x}" for h in hashes.tolist())))
+
+
+def load_state(output_path, derived=False):
+    path = state_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != BUILD_VERSION:
+        return None
+    # граф собран с другим набором производных фактов — дельта по хэшам не поможет
+    if state.get("derived", False) != derived:
+        return None
+    return state["hashes"]
+
+
+def save_state(output_path, df, hashes=None, derived=False):
+    """
+    hashes — уже посчитанные movie_hashes (например, собранные по пачкам);
+    derived — граф собран с производными фактами (main.py --derived).
+    """
+    if hashes is None:
+        hashes = movie_hashes(df)
+    with open(state_path(output_path), "w", encoding="utf-8") as f:
+        json.dump({"version": BUILD_VERSION, "derived": derived,
+                   "hashes": hashes}, f)
+
+
+def diff_movies(old_hashes, new_hashes):
+    """Возвращает (added, changed, removed) — множества movie id (str)."""
+    old_ids, new_ids = set(old_hashes), set(new_hashes)
+    added = new_ids - old_ids
+    removed = old_ids - new_ids
+    changed = {mid for mid in old_ids & new_ids if old_hashes[mid] != new_hashes[mid]}
+    return added, changed, removed
+
+
+def movie_triples(g, m):
+    """Все триплеты фильма и его CastRole/CrewRole узлов."""
+    triples = list(g.triples((m, None, None)))
+    for link in ROLE_LINKS:
+        for role in g.objects(m, link):
+            triples.extend(g.triples((role, None, None)))
+    return triples
+
+
+def compute_delta(g, df, movie_ids, derived=False):
+    """
+    Дельта для перечисленных фильмов: (retractions, additions).
+    Фильмы, которых нет в df, считаются удалёнными.
+    """
+    ids = {str(mid) for mid in movie_ids}
+    new = Graph()
+    with new_emitter(new, derived) as em:
+        emit_movies(em, df[df["id"].astype(str).isin(ids)], derived=derived)
+
+    old = set()
+    for mid in ids:
+        old.update(movie_triples(g, movie_uri(mid)))
+    # переименованная общая сущность (Person, Keyword, ...): старый label снимается
+    for p in ENTITY_FACTS:
+        for s, o in new.subject_objects(p):
+            if _is_shared(s):
+                old.update((s, p, prev) for prev in g.objects(s, p) if prev != o)
+
+    retractions = [t for t in old if t not in new]
+    additions = [t for t in new if t not in g]
+    return retractions, additions
+
+
+def _is_shared(term):
+    return str(term).startswith(SHARED_ENTITY_PREFIXES)
+
+
+def apply_delta(g, retractions, additions):
+    """
+    Применяет дельту к графу (in-memory или любому rdflib Store) и
+    чистит общие сущности, на которые не осталось ссылок.
+    Возвращает число удалённых сиротских сущностей.
+    """
+    touched = {o for _, _, o in retractions if _is_shared(o)}
+
+    for t in retractions:
+        g.remove(t)
+    g.addN((s, p, o, g) for s, p, o in additions)
+
+    orphans = 0
+    for ent in touched:
+        if next(g.subjects(None, ent), None) is None:
+            g.remove((ent, None, None))
+            orphans += 1
+    return orphans
+
+
+def incremental_update(g, df, output_path, derived=False):
+    """
+    Обновляет граф g под новый df по сохранённому состоянию.
+    Возвращает статистику или None, если состояния нет (нужна полная сборка).
+    """
+    old_hashes = load_state(output_path, derived)
+    if old_hashes is None:
+        return None
+
+    new_hashes = movie_hashes(df)
+    added, changed, removed = diff_movies(old_hashes, new_hashes)
+    retractions, additions = compute_delta(g, df, added | changed | removed, derived)
+    orphans = apply_delta(g, retractions, additions)
+    save_state(output_path, df, derived=derived)
+    return {
+        "added": len(added),
+        "changed": len(changed),
+        "removed": len(removed),
+        "retracted": len(retractions),
+        "asserted": len(additions),
+        "orphans": orphans,
+    }
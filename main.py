@@ -1,8 +1,19 @@
+import argparse
+import os
+
 import pandas as pd
-import ast
-from rdflib import Graph, Namespace, URIRef, Literal
+from rdflib import Graph, Namespace
 from rdflib.namespace import RDF, RDFS, XSD
 
+from graph_cube import write_cube
+from graph_snapshot import snapshot_path, write_snapshot
+from query_cache import file_version
+from rdf_mapping import Field, Ref, Template, TriplesMap, compile_mapping
+from rdf_writers import NTriplesWriter, TurtleWriter
+from table_cache import load_nested_tables
+from tmdb_parsing import parse_nested_columns
+from triple_emitter import TripleEmitter
+
 # === 1. Настройки ===
 
 MOVIES_CSV = "tmdb_5000_movies.csv"
@@ -11,265 +22,364 @@ CREDITS_CSV = "tmdb_5000_credits.csv"
 # CREDITS_CSV = "tmdb_5000_credits_short.csv"
 SCHEMA_TTL = "tmdb_schema.ttl"       # input
 OUTPUT_TTL = "tmdb_data.ttl"         # сюда запишем индивиды
+OUTPUT_NT = "tmdb_data.nt"           # потоковый вывод в N-Triples
+STREAM_CHUNK = 200                   # фильмов в одном блоке потоковой записи
 
 BASE = "http://example.org/film-rating#"
 FR = Namespace(BASE)
 
 # === 2. Загружаем схему ===
 
-g = Graph()
-g.parse(SCHEMA_TTL, format="turtle")
-g.bind("fr", FR)
+def load_schema():
+    g = Graph()
+    g.parse(SCHEMA_TTL, format="turtle")
+    g.bind("fr", FR)
+    return g
 
 # === 3. Помощники для URI ===
 
+# общие сущности: их триплеты повторяются у многих фильмов
+SHARED_ENTITY_PREFIXES = tuple(
+    f"{BASE}{kind}/" for kind in ("person", "genre", "keyword", "company", "country", "lang")
+)
+
 def movie_uri(movie_id):
     return FR[f"movie/{int(movie_id)}"]
 
-def person_uri(person_id):
-    return FR[f"person/{int(person_id)}"]
-
-def genre_uri(genre_id):
-    return FR[f"genre/{int(genre_id)}"]
-
-def company_uri(comp_id):
-    return FR[f"company/{int(comp_id)}"]
-
-def country_uri(code):
-    return FR[f"country/{code}"]
-
-def language_uri(code):
-    return FR[f"lang/{code}"]
-
-def keyword_uri(kw_id):
-    return FR[f"keyword/{int(kw_id)}"]
-
-def cast_role_uri(movie_id, person_id, order):
-    return FR[f"cast/{int(movie_id)}_{int(person_id)}_{int(order)}"]
-
-def crew_role_uri(movie_id, person_id, job):
-    # job в URI лучше чуть почистить
-    job_clean = str(job).lower().replace(" ", "_").replace("/", "_")
-    return FR[f"crew/{int(movie_id)}_{int(person_id)}_{job_clean}"]
-
-def safe_literal(value, datatype=None):
-    if pd.isna(value):
-        return None
-    if datatype is None:
-        return Literal(value)
-    return Literal(value, datatype=datatype)
-
 # === 4. Читаем данные ===
 
-movies = pd.read_csv(MOVIES_CSV)
-credits = pd.read_csv(CREDITS_CSV)
-
-# переименуем title у movies, чтобы не конфликтовало с title у credits
-movies = movies.rename(columns={"title": "movie_title"})
-# credits.title нам не особо нужен — можно выкинуть
-credits = credits.drop(columns=["title"])
+def load_movies(movies_csv=MOVIES_CSV, credits_csv=CREDITS_CSV):
+    movies = pd.read_csv(movies_csv)
+    credits = pd.read_csv(credits_csv)
 
-# соединяем по id / movie_id
-df = movies.merge(credits, left_on="id", right_on="movie_id", how="inner")
+    # переименуем title у movies, чтобы не конфликтовало с title у credits
+    movies = movies.rename(columns={"title": "movie_title"})
+    # credits.title нам не особо нужен — можно выкинуть
+    credits = credits.drop(columns=["title"])
 
-# === 5. Основной цикл по фильмам ===
+    # соединяем по id / movie_id
+    return movies.merge(credits, left_on="id", right_on="movie_id", how="inner")
 
-for _, row in df.iterrows():
-    mid = row["id"]
-    m = movie_uri(mid)
+# === 5. Маппинг таблиц в триплеты ===
+# что во что превращается — декларативно (rdf_mapping), без цикла по строкам
 
-    # тип
-    g.add((m, RDF.type, FR.Movie))
+def movie_t(column="movie_id"):
+    return Template(BASE + f"movie/{{{column}}}")
 
-    # простые dataprop
-    if not pd.isna(row["movie_title"]):
-        g.add((m, FR.movieTitle, Literal(row["movie_title"], datatype=XSD.string)))
+PERSON = Template(BASE + "person/{person_id}")
+CAST_ROLE = Template(BASE + "cast/{movie_id}_{person_id}_{order}")
+CREW_ROLE = Template(BASE + "crew/{movie_id}_{person_id}_{job_slug}")
 
-    if not pd.isna(row["original_title"]):
-        g.add((m, FR.originalTitle, Literal(row["original_title"], datatype=XSD.string)))
 
-    if not pd.isna(row["budget"]):
-        g.add((m, FR.budget, Literal(int(row["budget"]), datatype=XSD.integer)))
+def profit_column(df):
+    # материализуем profit; отрицательную/нулевую прибыль не пишем
+    profit = df["revenue"].astype("Int64") - df["budget"].astype("Int64")
+    return profit.where(profit > 0)
 
-    if not pd.isna(row["revenue"]):
-        g.add((m, FR.revenue, Literal(int(row["revenue"]), datatype=XSD.integer)))
 
-    # материализуем profit
-    if not pd.isna(row["budget"]) and not pd.isna(row["revenue"]):
-        budget_val = int(row["budget"])
-        revenue_val = int(row["revenue"])
-        profit_val = revenue_val - budget_val
-        # можно игнорировать отрицательную/нулевую прибыль, если не надо
-        if profit_val > 0:
-            g.add((m, FR.profit, Literal(profit_val, datatype=XSD.integer)))
-    if not pd.isna(row["runtime"]):
-        g.add((m, FR.runtime, Literal(float(row["runtime"]), datatype=XSD.decimal)))
-
-    if not pd.isna(row["popularity"]):
-        g.add((m, FR.popularity, Literal(float(row["popularity"]), datatype=XSD.decimal)))
-
-    if not pd.isna(row["vote_average"]):
-        g.add((m, FR.voteAverage, Literal(float(row["vote_average"]), datatype=XSD.decimal)))
-
-    if not pd.isna(row["vote_count"]):
-        g.add((m, FR.voteCount, Literal(int(row["vote_count"]), datatype=XSD.integer)))
-
-    if not pd.isna(row["release_date"]):
-        # формат в CSV: YYYY-MM-DD
-        g.add((m, FR.releaseDate, Literal(row["release_date"], datatype=XSD.date)))
-
-    # === genres ===
-    if isinstance(row["genres"], str) and row["genres"].strip():
-        try:
-            genres_list = ast.literal_eval(row["genres"])
-        except Exception:
-            genres_list = []
-        for gobj in genres_list:
-            gid = gobj.get("id")
-            gname = gobj.get("name")
-            if gid is None:
-                continue
-            gen = genre_uri(gid)
-            g.add((gen, RDF.type, FR.Genre))
-            if gname:
-                g.add((gen, FR.label, Literal(gname, datatype=XSD.string)))
-            g.add((m, FR.hasGenre, gen))
-
-    # === keywords ===
-    if isinstance(row["keywords"], str) and row["keywords"].strip():
-        try:
-            kw_list = ast.literal_eval(row["keywords"])
-        except Exception:
-            kw_list = []
-        for k in kw_list:
-            kid = k.get("id")
-            kname = k.get("name")
-            if kid is None:
-                continue
-            kw = keyword_uri(kid)
-            g.add((kw, RDF.type, FR.Keyword))
-            if kname:
-                g.add((kw, FR.label, Literal(kname, datatype=XSD.string)))
-            g.add((m, FR.hasKeyword, kw))
-
-    # === production_companies ===
-    if isinstance(row["production_companies"], str) and row["production_companies"].strip():
-        try:
-            comps = ast.literal_eval(row["production_companies"])
-        except Exception:
-            comps = []
-        for c in comps:
-            cid = c.get("id")
-            cname = c.get("name")
-            if cid is None:
-                continue
-            comp = company_uri(cid)
-            g.add((comp, RDF.type, FR.Company))
-            if cname:
-                g.add((comp, FR.label, Literal(cname, datatype=XSD.string)))
-            g.add((m, FR.producedBy, comp))
-
-    # === production_countries ===
-    if isinstance(row["production_countries"], str) and row["production_countries"].strip():
-        try:
-            countries = ast.literal_eval(row["production_countries"])
-        except Exception:
-            countries = []
-        for c in countries:
-            code = c.get("iso_3166_1")
-            cname = c.get("name")
-            if not code:
-                continue
-            cou = country_uri(code)
-            g.add((cou, RDF.type, FR.Country))
-            if cname:
-                g.add((cou, FR.label, Literal(cname, datatype=XSD.string)))
-            g.add((m, FR.producedInCountry, cou))
-
-    # === spoken_languages ===
-    if isinstance(row["spoken_languages"], str) and row["spoken_languages"].strip():
-        try:
-            langs = ast.literal_eval(row["spoken_languages"])
-        except Exception:
-            langs = []
-        for l in langs:
-            code = l.get("iso_639_1")
-            lname = l.get("name")
-            if not code:
-                continue
-            lang = language_uri(code)
-            g.add((lang, RDF.type, FR.Language))
-            if lname:
-                g.add((lang, FR.label, Literal(lname, datatype=XSD.string)))
-            g.add((m, FR.spokenLanguage, lang))
-
-    # === cast ===
-    if isinstance(row["cast"], str) and row["cast"].strip():
-        try:
-            cast_list = ast.literal_eval(row["cast"])
-        except Exception:
-            cast_list = []
-        for c in cast_list:
-            pid = c.get("id")
-            pname = c.get("name")
-            character = c.get("character")
-            order = c.get("order", 0)
-
-            if pid is None:
-                continue
-
-            person = person_uri(pid)
-            g.add((person, RDF.type, FR.Person))
-            if pname:
-                g.add((person, FR.label, Literal(pname, datatype=XSD.string)))
-
-            role = cast_role_uri(mid, pid, order)
-            g.add((role, RDF.type, FR.CastRole))
-            g.add((m, FR.hasCast, role))
-            g.add((role, FR.playedBy, person))
-
-            if character:
-                g.add((role, FR.characterName,
-                       Literal(character, datatype=XSD.string)))
-            g.add((role, FR.castOrder,
-                   Literal(int(order), datatype=XSD.integer)))
-
-    # === crew ===
-    if isinstance(row["crew"], str) and row["crew"].strip():
-        try:
-            crew_list = ast.literal_eval(row["crew"])
-        except Exception:
-            crew_list = []
-        for c in crew_list:
-            pid = c.get("id")
-            pname = c.get("name")
-            job = c.get("job")
-            dept = c.get("department")
-
-            if pid is None:
-                continue
-
-            person = person_uri(pid)
-            g.add((person, RDF.type, FR.Person))
-            if pname:
-                g.add((person, FR.label, Literal(pname, datatype=XSD.string)))
-
-            role = crew_role_uri(mid, pid, job or "unknown")
-            g.add((role, RDF.type, FR.CrewRole))
-            g.add((m, FR.hasCrew, role))
-            g.add((role, FR.creditsPerson, person))
-            if job:
-                g.add((role, FR.crewJob,
-                       Literal(job, datatype=XSD.string)))
-            if dept:
-                g.add((role, FR.crewDepartment,
-                       Literal(dept, datatype=XSD.string)))
-
-            # director
-            if job and "director" in job.lower():
-                g.add((m, FR.directedBy, person))
+def job_slug(jobs):
+    # job в URI лучше чуть почистить
+    return (jobs.astype(object).where(jobs.notna() & jobs.astype(object).ne(""), "unknown")
+            .astype(str).str.lower().str.replace(" ", "_").str.replace("/", "_"))
+
+
+def is_director_job(crew):
+    return crew["job"].astype(object).str.lower().str.contains("director", regex=False)
+
+
+def release_year(movies):
+    # год из YYYY-MM-DD; пустая или битая дата — без года
+    dates = pd.to_datetime(movies["release_date"], format="%Y-%m-%d", errors="coerce")
+    return dates.dt.year.astype("Int64")
+
+
+MOVIE_MAP = TriplesMap("movies", movie_t("id"), cls=FR.Movie, fields=[
+    Field("movie_title", FR.movieTitle, XSD.string),
+    Field("original_title", FR.originalTitle, XSD.string),
+    Field("budget", FR.budget, XSD.integer),
+    Field("revenue", FR.revenue, XSD.integer),
+    Field("profit", FR.profit, XSD.integer),
+    Field("runtime", FR.runtime, XSD.decimal),
+    Field("popularity", FR.popularity, XSD.decimal),
+    Field("vote_average", FR.voteAverage, XSD.decimal),
+    Field("vote_count", FR.voteCount, XSD.integer),
+    # формат в CSV: YYYY-MM-DD
+    Field("release_date", FR.releaseDate, XSD.date),
+])
+
+# вложенная таблица -> (колонка-ключ, путь URI, класс, свойство фильма)
+ENTITY_TABLES = [
+    ("genres", "entity_id", "genre", FR.Genre, FR.hasGenre),
+    ("keywords", "entity_id", "keyword", FR.Keyword, FR.hasKeyword),
+    ("companies", "entity_id", "company", FR.Company, FR.producedBy),
+    ("countries", "code", "country", FR.Country, FR.producedInCountry),
+    ("languages", "code", "lang", FR.Language, FR.spokenLanguage),
+]
+
+
+def entity_maps(entity_tables):
+    """Общая сущность (тип + label один раз) и ссылка на неё от фильма."""
+    maps = []
+    for name, key, path, cls, link in entity_tables:
+        uri = Template(BASE + f"{path}/{{{key}}}")
+        maps.append(TriplesMap(name, uri, cls=cls, label=("name", XSD.string), entity=True))
+        maps.append(TriplesMap(name, movie_t(), refs=[Ref(link, uri)]))
+    return maps
+
+
+# === cast ===
+CAST_MAPS = [
+    TriplesMap("cast", PERSON, cls=FR.Person, label=("name", XSD.string), entity=True),
+    TriplesMap("cast", CAST_ROLE, cls=FR.CastRole, fields=[
+        Field("character", FR.characterName, XSD.string),
+        Field("order", FR.castOrder, XSD.integer),
+    ], refs=[
+        Ref(FR.hasCast, movie_t(), inverse=True),
+        Ref(FR.playedBy, PERSON),
+    ]),
+]
+
+# === crew ===
+CREW_MAPS = [
+    TriplesMap("crew", PERSON, cls=FR.Person, label=("name", XSD.string), entity=True),
+    TriplesMap("crew", CREW_ROLE, cls=FR.CrewRole, fields=[
+        Field("job", FR.crewJob, XSD.string),
+        Field("department", FR.crewDepartment, XSD.string),
+    ], refs=[
+        Ref(FR.hasCrew, movie_t(), inverse=True),
+        Ref(FR.creditsPerson, PERSON),
+    ]),
+    # director
+    TriplesMap("crew", movie_t(), refs=[Ref(FR.directedBy, PERSON)], where=is_director_job),
+]
+
+MAPPING = [MOVIE_MAP] + entity_maps(ENTITY_TABLES) + CAST_MAPS + CREW_MAPS
+
+DERIVED = {
+    "movies": {"profit": profit_column},
+    "cast": {"order": lambda t: t["order"].fillna(0)},
+    "crew": {"job_slug": lambda t: job_slug(t["job"])},
+}
+
+emit_mapping = compile_mapping(MAPPING, DERIVED)
+
+# === производные факты ===
+# то, что CQ иначе вычисляют в FILTER на каждой строке: год выпуска целым
+# числом вместо YEAR(?date) и fr:labelKey у меток (пишет эмиттер);
+# режиссёр — уже fr:directedBy выше
+DERIVED_MAPS = [
+    TriplesMap("movies", movie_t("id"), fields=[
+        Field("release_year", FR.releaseYear, XSD.integer),
+    ]),
+]
+
+emit_derived_mapping = compile_mapping(
+    MAPPING + DERIVED_MAPS,
+    {**DERIVED, "movies": {**DERIVED["movies"], "release_year": release_year}})
+
+
+# derived — писать производные факты (--derived): fr:releaseYear и fr:labelKey
+
+def new_emitter(store, derived=False):
+    key_predicate = FR.labelKey if derived else None
+    return TripleEmitter(store, FR.label, key_predicate=key_predicate)
+
+
+def emit_movies(em, df, tables=None, derived=False):
+    # все вложенные колонки разбираются разом, а не построчно
+    if tables is None:
+        tables = parse_nested_columns(df)
+    emit = emit_derived_mapping if derived else emit_mapping
+    emit(em, {"movies": df, **tables})
+
+
+def build_graph(df, derived=False):
+    g = load_schema()
+    with new_emitter(g, derived) as em:
+        emit_movies(em, df, derived=derived)
+    return g
+
+
+def stream_graph(df, writer, chunk_size=STREAM_CHUNK, derived=False):
+    """
+    Пишет схему и индивиды в потоковый writer пачками по chunk_size фильмов,
+    не собирая весь граф в памяти (сам df и множества дедупликации общих
+    сущностей в памяти остаются — см. rdf_writers). Turtle группируется по
+    субъекту в пределах пачки (chunk_size=1 — строго по одному фильму).
+    Возвращает эмиттер (в нём счётчики emitted/skipped).
+    """
+    for triple in load_schema():
+        writer.add(triple)
+    writer.flush()
+
+    em = new_emitter(writer, derived)
+    for start in range(0, len(df), chunk_size):
+        emit_movies(em, df.iloc[start:start + chunk_size], derived=derived)
+        em.flush()
+    return em
 
 # === 6. Сохраняем граф ===
 
-g.serialize(OUTPUT_TTL, format="turtle")
-print(f"Saved data ontology to {OUTPUT_TTL}")
+def main():
+    parser = argparse.ArgumentParser(
+        description="TMDB CSV -> RDF индивиды",
+        epilog=f"Бинарный снимок {snapshot_path(OUTPUT_TTL)} и куб <граф>.cube.pkl пишет только "
+               "обычная сборка: для них нужен граф в памяти. После --stream, --workers, "
+               "--chunked и --store их нет, и sparql.py при первом запуске разбирает граф "
+               "сам и строит куб рядом с ним. Инкрементальная пересборка — "
+               "--store PATH --incremental: дельта пишется прямо в хранилище.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="сколько процессов строят граф (0 = все ядра); "
+                             ">1 включает параллельную сборку по шардам "
+                             "(без снимка и куба)")
+    parser.add_argument("--stream", choices=["nt", "ttl"],
+                        help="писать триплеты сразу по мере генерации, "
+                             f"без графа в памяти ({OUTPUT_NT} или {OUTPUT_TTL}; "
+                             "без снимка и куба)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="применить к хранилищу --store только изменения по фильмам "
+                             "с прошлой сборки (без --store не работает: TTL пришлось бы "
+                             "разбирать и переписывать целиком)")
+    parser.add_argument("--store", metavar="PATH",
+                        help="писать в персистентное SQLite-хранилище (например, tmdb_data.sqlite) "
+                             "вместо TTL; sparql.py запрашивает его напрямую с --store PATH")
+    parser.add_argument("--chunked", action="store_true",
+                        help="читать CSV пачками фильмов с join к credits на диске "
+                             "(для корпусов, которые не помещаются в память); "
+                             "только с --stream или --store")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="фильмов в пачке для --chunked")
+    parser.add_argument("--max-rss", type=int, metavar="MB",
+                        help="мягкий лимит памяти процесса для --chunked: "
+                             "пачки уменьшаются, когда RSS к нему подходит")
+    parser.add_argument("--derived", action="store_true",
+                        help="писать производные факты для CQ из cq_registry (*_derived и *_exact): "
+                             "fr:releaseYear и fr:labelKey")
+    args = parser.parse_args()
+    if args.stream and args.workers != 1:
+        parser.error("--stream и --workers нельзя использовать вместе")
+    if args.incremental and not args.store:
+        parser.error("--incremental применяет дельту к персистентному хранилищу: укажите --store PATH")
+    if args.store and (args.stream or args.workers != 1):
+        parser.error("--store нельзя совмещать с --stream и --workers")
+    if args.chunked and not (args.stream or args.store):
+        parser.error("--chunked пишет только потоково: укажите --stream или --store")
+    if args.chunked and args.incremental:
+        parser.error("--chunked и --incremental нельзя использовать вместе")
+    derived = args.derived
+
+    # состояние (хэши фильмов) для следующей инкрементальной сборки
+    from incremental_build import incremental_update, save_state
+
+    if args.chunked:
+        from chunked_ingest import build_chunked
+
+        max_rss = args.max_rss * 2 ** 20 if args.max_rss else None
+        if args.store:
+            from sqlite_store import SQLiteStore, open_store_graph
+
+            SQLiteStore().destroy(args.store)
+            g = open_store_graph(args.store, create=True)
+            g.bind("fr", FR)
+
+            def on_batch():
+                g.commit()
+                g.store.clear_cache()
+
+            try:
+                em, hashes, peak = build_chunked(g, MOVIES_CSV, CREDITS_CSV, args.batch_size,
+                                                 max_rss, on_batch=on_batch, derived=derived)
+                g.commit()
+                written = len(g)
+            finally:
+                g.close()
+            output = args.store
+        else:
+            output = OUTPUT_NT if args.stream == "nt" else OUTPUT_TTL
+            if args.stream == "nt":
+                writer = NTriplesWriter(OUTPUT_NT, shared_prefixes=SHARED_ENTITY_PREFIXES)
+            else:
+                prefixes = {"fr": BASE, "rdf": str(RDF), "rdfs": str(RDFS), "xsd": str(XSD)}
+                writer = TurtleWriter(OUTPUT_TTL, prefixes=prefixes,
+                                      shared_prefixes=SHARED_ENTITY_PREFIXES)
+            with writer:
+                em, hashes, peak = build_chunked(writer, MOVIES_CSV, CREDITS_CSV,
+                                                 args.batch_size, max_rss, derived=derived)
+            written = writer.written
+        save_state(output, None, hashes=hashes, derived=derived)
+        print(f"Saved data ontology to {output} ({written:,} triples, "
+              f"{len(hashes):,} movies, peak RSS {peak / 2 ** 20:.0f} MB)")
+        return
+
+    df = load_movies()
+
+    if args.store:
+        from sqlite_store import SQLiteStore, open_store_graph
+
+        fresh = not (args.incremental and os.path.exists(args.store))
+        if fresh:
+            SQLiteStore().destroy(args.store)
+        g = open_store_graph(args.store, create=True)
+        try:
+            # дельта по изменённым фильмам применяется прямо к хранилищу
+            stats = None if fresh else incremental_update(g, df, args.store, derived)
+            if stats is not None:
+                g.commit()
+                print(f"Updated {args.store}: {stats['added']} added, {stats['changed']} changed, "
+                      f"{stats['removed']} removed movies; -{stats['retracted']:,} / "
+                      f"+{stats['asserted']:,} triples, {stats['orphans']} orphans dropped")
+                return
+            if not fresh:
+                print("Нет состояния прошлой сборки — собираю хранилище целиком")
+            g.remove((None, None, None))
+            g.bind("fr", FR)
+            with new_emitter(g, derived) as em:
+                for triple in load_schema():
+                    em.add(triple)
+                emit_movies(em, df, load_nested_tables(MOVIES_CSV, CREDITS_CSV), derived)
+            save_state(args.store, df, derived=derived)
+            g.commit()
+            print(f"Saved data ontology to {args.store} ({len(g):,} triples)")
+        finally:
+            g.close()
+        return
+
+    if args.stream == "nt":
+        with NTriplesWriter(OUTPUT_NT, shared_prefixes=SHARED_ENTITY_PREFIXES) as writer:
+            em = stream_graph(df, writer, derived=derived)
+        save_state(OUTPUT_NT, df, derived=derived)
+        print(f"Saved data ontology to {OUTPUT_NT} ({writer.written:,} triples, "
+              f"skipped {em.skipped:,} redundant adds)")
+        return
+    if args.stream == "ttl":
+        prefixes = {"fr": BASE, "rdf": str(RDF), "rdfs": str(RDFS), "xsd": str(XSD)}
+        with TurtleWriter(OUTPUT_TTL, prefixes=prefixes,
+                          shared_prefixes=SHARED_ENTITY_PREFIXES) as writer:
+            em = stream_graph(df, writer, derived=derived)
+        save_state(OUTPUT_TTL, df, derived=derived)
+        print(f"Saved data ontology to {OUTPUT_TTL} ({writer.written:,} triples, "
+              f"skipped {em.skipped:,} redundant adds)")
+        return
+
+    if args.workers != 1:
+        # шарды пишутся в N-Triples, а склеенный файл — валидный Turtle
+        from parallel_build import build_parallel
+        n = build_parallel(df, OUTPUT_TTL, workers=args.workers or None, derived=derived)
+        save_state(OUTPUT_TTL, df, derived=derived)
+        print(f"Saved data ontology to {OUTPUT_TTL} ({n:,} triples)")
+        return
+
+    g = load_schema()
+    with new_emitter(g, derived) as em:
+        # разобранные cast/crew/genres/... — из колоночного кэша tmdb_tables/
+        emit_movies(em, df, load_nested_tables(MOVIES_CSV, CREDITS_CSV), derived)
+    g.serialize(OUTPUT_TTL, format="turtle")
+    # бинарный снимок рядом с TTL: sparql.py грузит его вместо разбора Turtle
+    write_snapshot(g, snapshot_path(OUTPUT_TTL), source=OUTPUT_TTL)
+    write_cube(g, OUTPUT_TTL, file_version(OUTPUT_TTL))
+    save_state(OUTPUT_TTL, df, derived=derived)
+    print(f"Saved data ontology to {OUTPUT_TTL} (skipped {em.skipped:,} redundant adds)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Словарно закодированный индекс триплетов в memory-mapped массивах NumPy —
+rdflib Store только для чтения.
+
+Память rdflib Memory-хранилища на ~1.5M триплетов уходит на питоновские
+объекты: каждый URIRef/Literal плюс вложенные словари индексов. Здесь
+граф лежит на диске (<граф>.idx/) в виде плоских массивов и открывается
+через np.load(mmap_mode="r"): страницы читает ОС по мере обращения, а
+воркеры parallel_queries делят их без копий.
+
+    header.json            версия, sha256 исходного TTL, размеры, префиксы, языки
+    spo.npy pos.npy osp.npy  uint32[3, n] — триплеты из id термов, отсортированные
+                           в трёх перестановках (строка — позиция, столбец — триплет)
+    kinds.npy              uint8   URI / литерал / blank node
+    datatypes.npy          int32   id терма-дататайпа литерала или -1
+    languages.npy          int16   номер языкового тега или -1
+    offsets.npy, blob.npy  лексические значения: blob[offsets[i]:offsets[i+1] - 1]
+    hashes.npy, hash_ids.npy  отсортированные 64-битные хэши термов и их id
+
+Шаблон (s?, p?, o?) — это бинарный поиск префикса в подходящей
+перестановке (SPO, POS или OSP), терм -> id — бинарный поиск хэша,
+id -> терм — срез blob; оба направления кэшируются, как в SQLiteStore.
+Индекс строится из свежего снимка графа (graph_snapshot) или из TTL:
+
+    python mmap_store.py                   # tmdb_data.ttl -> tmdb_data.ttl.idx/
+    python sparql.py                       # откроет индекс, если он свежий
+    python sparql.py --no-mmap             # граф в память, как раньше
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.plugin import register
+from rdflib.store import NO_STORE, VALID_STORE, Store
+from rdflib.util import guess_format
+
+from graph_snapshot import (encode_terms, file_sha256, is_fresh as snapshot_is_fresh,
+                            read_snapshot, snapshot_path)
+
+INDEX_VERSION = 1
+
+URI, LITERAL, BNODE = 0, 1, 2
+
+# перестановка -> какая позиция триплета (s=0, p=1, o=2) в каждой её строке
+ORDERS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+# сколько триплетов декодируется за раз
+_CHUNK = 5000
+
+
+def index_path(graph_path):
+    return graph_path + ".idx"
+
+
+def term_key(kind, value, datatype, lang):
+    """Ключ терма, уникальный для (вид, значение, дататайп, язык)."""
+    return "\x1f".join((str(kind), value, datatype or "", lang or ""))
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _key_of(term):
+    if isinstance(term, Literal):
+        return term_key(LITERAL, str(term),
+                        str(term.datatype) if term.datatype is not None else None, term.language)
+    if isinstance(term, BNode):
+        return term_key(BNODE, str(term), None, None)
+    if isinstance(term, URIRef):
+        return term_key(URI, str(term), None, None)
+    return None
+
+
+# === Запись ===
+
+def write_index(path, kinds, datatypes, languages, triples, blob, langs, namespaces, source=None):
+    """Пишет индекс из словарно закодированного графа (как в graph_snapshot)."""
+    n = len(kinds)
+    values = blob.decode("utf-8").split("\0") if n else []
+    raw = np.frombuffer(blob, dtype=np.uint8)
+    offsets = np.empty(n + 1, dtype=np.int64)
+    offsets[0] = 0
+    offsets[1:n] = np.flatnonzero(raw == 0) + 1
+    offsets[n] = len(raw) + 1
+
+    hashes = np.empty(n, dtype=np.uint64)
+    for i in range(n):
+        dt, lang = int(datatypes[i]), int(languages[i])
+        hashes[i] = key_hash(term_key(int(kinds[i]), values[i],
+                                      values[dt] if dt >= 0 else None,
+                                      langs[lang] if lang >= 0 else None))
+    by_hash = np.argsort(hashes, kind="stable")
+
+    triples = np.asarray(triples, dtype=np.uint32).reshape(-1, 3)
+    arrays = {"kinds": np.asarray(kinds, dtype=np.uint8),
+              "datatypes": np.asarray(datatypes, dtype=np.int32),
+              "languages": np.asarray(languages, dtype=np.int16),
+              "offsets": offsets, "blob": raw,
+              "hashes": hashes[by_hash], "hash_ids": by_hash.astype(np.uint32)}
+    for name, order in ORDERS.items():
+        columns = triples[:, order]
+        sort = np.lexsort((columns[:, 2], columns[:, 1], columns[:, 0]))
+        arrays[name] = np.ascontiguousarray(columns[sort].T)
+
+    header = {"version": INDEX_VERSION,
+              "source_sha256": file_sha256(source) if source else None,
+              "n_terms": n, "n_triples": len(triples), "langs": list(langs),
+              "namespaces": {prefix: str(ns) for prefix, ns in namespaces.items()}}
+
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), array)
+    with open(os.path.join(tmp, "header.json"), "w", encoding="utf-8") as f:
+        json.dump(header, f, ensure_ascii=False)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def build_index(source, path=None):
+    """Индекс для TTL source: из свежего снимка (без разбора Turtle) или из самого TTL."""
+    path = path or index_path(source)
+    snap = snapshot_path(source)
+    if snapshot_is_fresh(snap, source):
+        header, kinds, datatypes, languages, triples, values = read_snapshot(snap)
+        write_index(path, kinds, datatypes, languages, triples, "\0".join(values).encode("utf-8"),
+                    header["langs"], header["namespaces"], source)
+    else:
+        g = Graph()
+        g.parse(source, format=guess_format(source) or "turtle")
+        kinds, datatypes, languages, triples, blob, langs = encode_terms(g)
+        write_index(path, kinds, datatypes, languages, triples, blob, langs,
+                    dict(g.namespaces()), source)
+    return path
+
+
+def read_index_header(path):
+    header_file = os.path.join(path, "header.json")
+    if not os.path.exists(header_file):
+        return None
+    with open(header_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_fresh(path, source):
+    """Индекс есть, новее исходного TTL и построен именно из него."""
+    header = read_index_header(path)
+    if header is None or header.get("version") != INDEX_VERSION:
+        return False
+    if source is None or not os.path.exists(source):
+        return True
+    if os.path.getmtime(os.path.join(path, "header.json")) < os.path.getmtime(source):
+        return False
+    return header.get("source_sha256") == file_sha256(source)
+
+
+# === Store ===
+
+class MappedStore(Store):
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        self.header = None
+        self._arrays = {}
+        self._namespaces = {}
+        # кэши id <-> терм: каждый терм декодируется не больше одного раза
+        self._ids = {}
+        self._terms = {}
+        super().__init__(configuration, identifier)
+
+    # === жизненный цикл ===
+
+    def open(self, configuration, create=False):
+        header = read_index_header(configuration)
+        if header is None:
+            return NO_STORE
+        if header.get("version") != INDEX_VERSION:
+            raise ValueError(f"{configuration}: индекс версии {header.get('version')}, "
+                             f"нужна {INDEX_VERSION}")
+        self.header = header
+        for name in ("kinds", "datatypes", "languages", "offsets", "blob", "hashes", "hash_ids",
+                     *ORDERS):
+            # ndarray-вид на те же страницы: срезы np.memmap заметно дороже
+            self._arrays[name] = np.asarray(
+                np.load(os.path.join(configuration, name + ".npy"), mmap_mode="r"))
+        self._namespaces = dict(header["namespaces"])
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        self._arrays = {}
+        self.clear_cache()
+
+    def clear_cache(self):
+        self._ids.clear()
+        self._terms.clear()
+
+    # === словарь термов ===
+
+    def _term(self, i):
+        term = self._terms.get(i)
+        if term is None:
+            arrays = self._arrays
+            start, end = int(arrays["offsets"][i]), int(arrays["offsets"][i + 1]) - 1
+            value = arrays["blob"][start:end].tobytes().decode("utf-8")
+            kind = arrays["kinds"][i]
+            if kind == URI:
+                term = URIRef(value)
+            elif kind == BNODE:
+                term = BNode(value)
+            else:
+                dt, lang = int(arrays["datatypes"][i]), int(arrays["languages"][i])
+                term = Literal(value, datatype=self._term(dt) if dt >= 0 else None,
+                               lang=self.header["langs"][lang] if lang >= 0 else None)
+            self._terms[i] = term
+            self._ids[term] = i
+        return term
+
+    def _id(self, term):
+        """id терма или None, если его нет в графе."""
+        if term in self._ids:
+            return self._ids[term]
+        key = _key_of(term)
+        found = None
+        if key is not None:
+            hashes = self._arrays["hashes"]
+            h = np.uint64(key_hash(key))
+            lo, hi = np.searchsorted(hashes, h, "left"), np.searchsorted(hashes, h, "right")
+            for j in range(lo, hi):
+                candidate = int(self._arrays["hash_ids"][j])
+                if _key_of(self._term(candidate)) == key:
+                    found = candidate
+                    break
+        self._ids[term] = found
+        return found
+
+    # === триплеты ===
+
+    def add(self, triple, context=None, quoted=False):
+        raise TypeError("MappedStore только для чтения: пересоберите индекс (python mmap_store.py)")
+
+    def addN(self, quads):
+        raise TypeError("MappedStore только для чтения: пересоберите индекс (python mmap_store.py)")
+
+    def remove(self, triple_pattern, context=None):
+        raise TypeError("MappedStore только для чтения: пересоберите индекс (python mmap_store.py)")
+
+    def _range(self, triple_pattern):
+        """(перестановка, lo, hi) для шаблона или None, если связанного терма нет."""
+        ids = []
+        for term in triple_pattern:
+            if term is None:
+                ids.append(None)
+                continue
+            i = self._id(term)
+            if i is None:
+                return None
+            ids.append(i)
+        s, p, o = ids
+        if s is not None:
+            if p is None and o is not None:
+                name, prefix = "osp", (o, s)
+            else:
+                name, prefix = "spo", (s,) if p is None else (s, p) if o is None else (s, p, o)
+        elif p is not None:
+            name, prefix = "pos", (p,) if o is None else (p, o)
+        elif o is not None:
+            name, prefix = "osp", (o,)
+        else:
+            name, prefix = "spo", ()
+
+        columns = self._arrays[name]
+        lo, hi = 0, columns.shape[1]
+        for depth, value in enumerate(prefix):
+            column = columns[depth, lo:hi]
+            # питоновский int заставил бы numpy привести к int64 весь столбец
+            value = np.uint32(value)
+            lo, hi = (lo + int(column.searchsorted(value, "left")),
+                      lo + int(column.searchsorted(value, "right")))
+            if lo == hi:
+                break
+        return name, lo, hi
+
+    def triples(self, triple_pattern, context=None):
+        found = self._range(triple_pattern)
+        if found is None:
+            return
+        name, lo, hi = found
+        columns = self._arrays[name]
+        order = ORDERS[name]
+        rows = [order.index(position) for position in range(3)]
+        terms, term = self._terms, self._term
+        for start in range(lo, hi, _CHUNK):
+            block = columns[:, start:min(start + _CHUNK, hi)]
+            for s, p, o in zip(*(block[row].tolist() for row in rows)):
+                yield ((terms.get(s) or term(s), terms.get(p) or term(p), terms.get(o) or term(o)),
+                       iter(()))
+
+    def __len__(self, context=None):
+        return self.header["n_triples"]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # === префиксы (привязки после открытия живут только в памяти) ===
+
+    def bind(self, prefix, namespace, override=True):
+        if not override and prefix in self._namespaces:
+            return
+        for bound_prefix, uri in list(self._namespaces.items()):
+            if uri == str(namespace):
+                del self._namespaces[bound_prefix]
+        self._namespaces[prefix] = str(namespace)
+
+    def namespace(self, prefix):
+        uri = self._namespaces.get(prefix)
+        return URIRef(uri) if uri is not None else None
+
+    def prefix(self, namespace):
+        for prefix, uri in self._namespaces.items():
+            if uri == str(namespace):
+                return prefix
+        return None
+
+    def namespaces(self):
+        for prefix, uri in list(self._namespaces.items()):
+            yield prefix, URIRef(uri)
+
+
+register("TMDBMapped", Store, "mmap_store", "MappedStore")
+
+
+def open_index_graph(path):
+    """rdflib.Graph поверх индекса <граф>.idx/ (только чтение)."""
+    g = Graph(store=MappedStore())
+    if g.open(path) != VALID_STORE:
+        raise FileNotFoundError(path)
+    return g
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Строит memory-mapped индекс триплетов для sparql.py")
+    parser.add_argument("--graph", default="tmdb_data.ttl", help="исходный TTL (или .nt)")
+    parser.add_argument("--out", help="каталог индекса (по умолчанию <граф>.idx)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    out = build_index(args.graph, args.out)
+    size = sum(os.path.getsize(os.path.join(out, name)) for name in os.listdir(out))
+    header = read_index_header(out)
+    print(f"Индекс {out}: {header['n_triples']:,} триплетов, {header['n_terms']:,} термов, "
+          f"{size / 2 ** 20:.1f} МБ, {time.perf_counter() - start:.2f} сек")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Параллельная сборка графа: фильмы делятся на шарды по movie id,
+каждый шард строится в отдельном процессе и пишется в свой .nt файл,
+а затем шарды склеиваются в один файл.
+
+Триплеты фильма и его CastRole/CrewRole попадают ровно в один шард,
+а общие сущности (Person, Genre, Keyword, Company, Country, Language)
+встречаются в нескольких шардах — при склейке их триплеты дедуплицируются.
+
+Результат — N-Triples, а N-Triples является подмножеством Turtle,
+поэтому файл можно сразу отдавать sparql.py как tmdb_data.ttl.
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from rdflib import Graph
+
+from main import SHARED_ENTITY_PREFIXES, emit_movies, load_schema, new_emitter
+
+# строки N-Triples общих сущностей: они повторяются между шардами
+SHARED_PREFIXES = tuple(f"<{prefix}" for prefix in SHARED_ENTITY_PREFIXES)
+
+# шардов больше, чем процессов, чтобы тяжёлые фильмы не тормозили один воркер
+SHARDS_PER_WORKER = 4
+
+
+def split_by_movie(df, n_shards):
+    """Делим merged movies/credits по movie id: один фильм — один шард."""
+    shard_no = df["id"] % n_shards
+    return [df[shard_no == k] for k in range(n_shards)]
+
+
+def build_shard(args):
+    """Воркер: строит триплеты своего шарда и пишет их в N-Triples."""
+    chunk, shard_path, derived = args
+    g = Graph()
+    with new_emitter(g, derived) as em:
+        emit_movies(em, chunk, derived=derived)
+    g.serialize(shard_path, format="nt", encoding="utf-8")
+    return shard_path, len(g)
+
+
+def merge_shards(shard_paths, output_path, schema=None):
+    """
+    Склеивает шарды в один файл. Строки общих сущностей пишутся один раз,
+    остальные (фильмы и роли) уникальны по построению и идут как есть.
+    """
+    seen = set()
+    written = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        if schema is not None:
+            for line in schema.serialize(format="nt").splitlines(keepends=True):
+                if line.strip():
+                    out.write(line)
+                    written += 1
+        for path in shard_paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    if line.startswith(SHARED_PREFIXES):
+                        if line in seen:
+                            continue
+                        seen.add(line)
+                    out.write(line)
+                    written += 1
+    return written
+
+
+def build_parallel(df, output_path, workers=None, shard_dir=None, keep_shards=False,
+                   derived=False):
+    """
+    Строит граф в пуле процессов и склеивает шарды в output_path
+    (derived — с производными фактами, как main.py --derived).
+    Возвращает число записанных триплетов.
+    """
+    workers = workers or os.cpu_count() or 1
+    n_shards = max(1, workers * SHARDS_PER_WORKER)
+
+    own_dir = shard_dir is None
+    if own_dir:
+        shard_dir = tempfile.mkdtemp(prefix="tmdb_shards_",
+                                     dir=os.path.dirname(os.path.abspath(output_path)))
+    os.makedirs(shard_dir, exist_ok=True)
+
+    jobs = [
+        (chunk, os.path.join(shard_dir, f"shard_{k:04d}.nt"), derived)
+        for k, chunk in enumerate(split_by_movie(df, n_shards))
+        if len(chunk)
+    ]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shard_paths = [path for path, _ in pool.map(build_shard, jobs)]
+        return merge_shards(shard_paths, output_path, schema=load_schema())
+    finally:
+        if own_dir and not keep_shards:
+            shutil.rmtree(shard_dir, ignore_errors=True)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Параллельное выполнение независимых SPARQL-запросов.
+
+Граф загружается один раз в родительском процессе, а пул процессов
+создаётся через fork: воркеры получают уже загруженный граф как
+copy-on-write память, без повторного разбора TTL и без пиклинга графа.
+Каждый воркер выполняет запрос целиком (через execute_query из
+sparql.py), его вывод собирается в буфер и возвращается родителю
+вместе с записью о таймингах; родитель печатает результаты строго в
+исходном порядке запросов, по мере готовности. Перед fork объекты
+графа замораживаются (gc.freeze), чтобы сборщик мусора в воркерах не
+трогал их страницы и не копировал граф в каждый процесс.
+
+Соединения SQLite (кэш результатов, SQLiteStore) через fork
+переиспользовать нельзя, поэтому вызывающий передаёт setup — функцию,
+которую воркер вызывает при старте, чтобы открыть свои соединения.
+
+    python sparql.py --workers 4    # 0 — все ядра
+"""
+import gc
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+# граф и функция выполнения — глобали, которые воркеры наследуют через fork
+_GRAPH = None
+_EXECUTE = None
+
+
+def can_fork():
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _init_worker(setup):
+    global _GRAPH
+    if setup is not None:
+        graph = setup()
+        if graph is not None:
+            _GRAPH = graph
+
+
+def _run(item):
+    """Воркер: (вывод запроса, запись о таймингах)."""
+    name, query = item
+    out = io.StringIO()
+    with redirect_stdout(out):
+        record = _EXECUTE(_GRAPH, query, name)
+    return out.getvalue(), record
+
+
+def run_parallel(graph, queries, execute, workers=None, setup=None):
+    """
+    Выполняет [(название, запрос), ...] в пуле из workers процессов.
+    execute(graph, query, name) -> запись о запросе (как execute_query);
+    setup() вызывается в каждом воркере и может вернуть свой граф.
+    Генератор (вывод, запись) — в порядке queries.
+    """
+    global _GRAPH, _EXECUTE
+    queries = list(queries)
+    workers = min(workers or os.cpu_count() or 1, len(queries)) or 1
+    _GRAPH, _EXECUTE = graph, execute
+    gc.freeze()
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("fork"),
+                                 initializer=_init_worker, initargs=(setup,)) as pool:
+            # map отдаёт результаты в порядке запросов, даже если
+            # следующие уже посчитаны
+            yield from pool.map(_run, queries)
+    finally:
+        gc.unfreeze()
+        _GRAPH = _EXECUTE = None
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Единая точка входа: CSV -> вложенные таблицы -> граф -> TTL -> CQ.
+
+Каждая стадия кладёт результат в кэш (.pipeline_cache/<стадия>/<fp>.*),
+где fp — отпечаток её входов (отпечатки предыдущих стадий, sha256 CSV)
+и версии кода (исходники функций/модулей, от которых она зависит).
+Поэтому, например, правка SPARQL-запроса перезапускает только стадию
+query, а правка CANONICAL_ROLE_MAP — build и всё, что после неё.
+
+    python pipeline.py                  # main.py-граф + все CQ
+    python pipeline.py --builder roles  # граф с каноническими ролями
+    python pipeline.py --until serialize --force build
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib
+import inspect
+import io
+import os
+import pickle
+import shutil
+import time
+
+import columnar_engine
+import cq_registry
+import graph_cube
+import query_planner
+import range_index
+import rdf_mapping
+import sparql
+import text_index
+import tmdb_parsing
+import triple_emitter
+from graph_snapshot import file_sha256, load_snapshot, snapshot_path, write_snapshot
+
+PIPELINE_VERSION = 1
+CACHE_DIR = ".pipeline_cache"
+
+STAGES = ["load", "parse", "build", "serialize", "query"]
+
+BUILDERS = {
+    "main": "main",
+    "roles": "build_tmdb_ontology_with_roles",
+}
+
+
+# === Отпечатки ===
+
+def code_fingerprint(*objs):
+    """Исходники модулей/функций и repr данных, от которых зависит стадия."""
+    h = hashlib.sha256()
+    for obj in objs:
+        if inspect.ismodule(obj) or inspect.isroutine(obj) or inspect.isclass(obj):
+            h.update(inspect.getsource(obj).encode("utf-8"))
+        else:
+            h.update(repr(obj).encode("utf-8"))
+    return h.hexdigest()
+
+
+def fingerprint(*parts):
+    h = hashlib.sha256(f"pipeline-v{PIPELINE_VERSION}".encode())
+    for part in parts:
+        h.update(b"\0")
+        h.update(str(part).encode("utf-8"))
+    return h.hexdigest()[:20]
+
+
+# === Сериализация артефактов ===
+
+def _save_pickle(value, path):
+    with open(path, "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _save_text(value, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(value)
+
+
+def _load_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class Pipeline:
+    def __init__(self, builder="main", cache_dir=CACHE_DIR, force=(), output=None):
+        self.builder = importlib.import_module(BUILDERS[builder])
+        self.cache_dir = cache_dir
+        self.force = set(force)
+        self.output = output or self.builder.OUTPUT_TTL
+        self.fingerprints = {}
+
+    def _artifact(self, stage, fp, ext):
+        return os.path.join(self.cache_dir, stage, f"{fp}.{ext}")
+
+    def _cached(self, stage, fp, ext, compute, save, load):
+        """Берёт артефакт стадии из кэша по отпечатку или считает и кладёт его туда."""
+        self.fingerprints[stage] = fp
+        path = self._artifact(stage, fp, ext)
+        start = time.time()
+        if os.path.exists(path) and stage not in self.force:
+            value = load(path)
+            print(f"[{stage:9s}] cached {fp} ({time.time() - start:.2f} s)")
+            return value
+
+        value = compute()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        save(value, tmp)
+        os.replace(tmp, path)
+        print(f"[{stage:9s}] ran    {fp} ({time.time() - start:.2f} s)")
+        return value
+
+    # === Стадии ===
+
+    def load(self):
+        b = self.builder
+        fp = fingerprint(file_sha256(b.MOVIES_CSV), file_sha256(b.CREDITS_CSV),
+                         code_fingerprint(b.load_movies))
+        return self._cached("load", fp, "pkl", b.load_movies, _save_pickle, _load_pickle)
+
+    def parse(self, df):
+        fp = fingerprint(self.fingerprints["load"], code_fingerprint(tmdb_parsing))
+        return self._cached("parse", fp, "pkl",
+                            lambda: tmdb_parsing.parse_nested_columns(df),
+                            _save_pickle, _load_pickle)
+
+    def build(self, df, tables):
+        b = self.builder
+
+        def compute():
+            g = b.load_schema()
+            with triple_emitter.TripleEmitter(g, b.FR.label) as em:
+                b.emit_movies(em, df, tables)
+            return g
+
+        # roles-билдер берёт части маппинга из main.py, поэтому в отпечатке оба
+        builders = [importlib.import_module(name) for name in BUILDERS.values()]
+        fp = fingerprint(self.fingerprints["load"], self.fingerprints["parse"],
+                         code_fingerprint(*builders, rdf_mapping, triple_emitter))
+        return self._cached("build", fp, "snap", compute,
+                            lambda g, path: write_snapshot(g, path), load_snapshot)
+
+    def serialize(self, g):
+        fp = fingerprint(self.fingerprints["build"], "turtle")
+        # из кэша TTL не читаем, а сразу копируем на место
+        self._cached("serialize", fp, "ttl", lambda: g,
+                     lambda graph, path: graph.serialize(path, format="turtle"),
+                     lambda path: None)
+        shutil.copyfile(self._artifact("serialize", fp, "ttl"), self.output)
+        write_snapshot(g, snapshot_path(self.output), source=self.output)
+        return self.output
+
+    def query(self, g):
+        def compute():
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                fr = sparql.setup_namespace(g)
+                sparql.check_data_structure(g, fr)
+                sparql.sparql_queries(g, fr)
+            return out.getvalue()
+
+        # ответы CQ зависят и от модулей, которые их вычисляют или ускоряют:
+        # планировщика, индексов, куба и колоночного движка
+        fp = fingerprint(self.fingerprints["build"],
+                         code_fingerprint(sparql.execute_query, sparql.print_rows,
+                                          sparql.run_queries, sparql.registry_queries,
+                                          sparql.check_queries, sparql.check_data_structure,
+                                          sparql.competency_queries, sparql.sparql_queries,
+                                          cq_registry, query_planner, range_index, graph_cube,
+                                          columnar_engine, text_index))
+        return self._cached("query", fp, "txt", compute, _save_text, _load_text)
+
+    def run(self, until="query"):
+        last = STAGES.index(until)
+        df = self.load()
+        if last < 1:
+            return df
+        tables = self.parse(df)
+        if last < 2:
+            return tables
+        g = self.build(df, tables)
+        if last < 3:
+            return g
+        self.serialize(g)
+        if last < 4:
+            return g
+        return self.query(g)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TMDB: CSV -> граф -> CQ с кэшем стадий")
+    parser.add_argument("--builder", choices=sorted(BUILDERS), default="main")
+    parser.add_argument("--until", choices=STAGES, default="query",
+                        help="последняя стадия, которую нужно выполнить")
+    parser.add_argument("--force", action="append", choices=STAGES, default=[],
+                        help="перезапустить стадию, даже если она есть в кэше")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    pipeline = Pipeline(builder=args.builder, cache_dir=args.cache_dir, force=args.force)
+    result = pipeline.run(until=args.until)
+    if args.until == "query":
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Персистентный кэш результатов SPARQL-запросов.
+
+Ключ — sha256 от нормализованного текста запроса, связанных переменных
+(initBindings) и версии графа. Версия — это отпечаток содержимого:
+sha256 исходного файла, из которого граф загружен (load_graph в
+sparql.py кладёт его в graph.content_version), версия сборки из
+SQLite-хранилища (sqlite_store), а для графа, собранного в памяти, —
+хэш по всем триплетам. Пересобрали tmdb_data.ttl — версия
+другая, старые записи просто перестают совпадать и со временем
+вытесняются.
+
+Кэш лежит в SQLite-файле рядом с графом (<граф>.cache.sqlite, а не в
+текущем каталоге) и ограничен по размеру:
+при переполнении удаляются записи, к которым дольше всего не обращались
+(LRU).
+"""
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import time
+
+MAX_BYTES = 256 * 2 ** 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key       TEXT PRIMARY KEY,
+    version   TEXT NOT NULL,
+    value     BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_lru ON results (last_used);
+"""
+
+# строковые литералы не трогаем, остальные пробелы схлопываем
+_TOKENS = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')|\s+')
+
+
+def normalize_query(query):
+    """Текст запроса без разницы в отступах и переводах строк."""
+    return _TOKENS.sub(lambda m: m.group(1) or " ", query).strip()
+
+
+def graph_version(graph):
+    """
+    Отпечаток содержимого графа. Если граф загружен из файла, версия уже
+    посчитана при загрузке (graph.content_version); иначе — сумма
+    blake2b-хэшей триплетов (не зависит от порядка обхода).
+    """
+    version = getattr(graph, "content_version", None)
+    if version is None:
+        total = 0
+        for triple in graph:
+            digest = hashlib.blake2b(" ".join(t.n3() for t in triple).encode("utf-8"),
+                                     digest_size=8).digest()
+            total = (total + int.from_bytes(digest, "little")) % 2 ** 64
+        version = f"triples:{len(graph)}:{total:016x}"
+        graph.content_version = version
+    return version
+
+
+def file_version(*paths):
+    """Версия графа из файлов, из которых он прочитан (sha256 содержимого)."""
+    h = hashlib.sha256()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(query, bindings, version):
+    h = hashlib.sha256(normalize_query(query).encode("utf-8"))
+    for name, value in sorted((str(k), v) for k, v in (bindings or {}).items()):
+        h.update(b"\0")
+        h.update(f"{name}={value.n3() if hasattr(value, 'n3') else value!r}".encode("utf-8"))
+    h.update(b"\0")
+    h.update(version.encode("utf-8"))
+    return h.hexdigest()
+
+
+def cache_path(graph_path):
+    return graph_path + ".cache.sqlite"
+
+
+class ResultCache:
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, graph, query, bindings=None):
+        """(vars, rows) или None, если результата в кэше нет."""
+        key = cache_key(query, bindings, graph_version(graph))
+        row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return pickle.loads(row[0])
+
+    def put(self, graph, query, variables, rows, bindings=None):
+        version = graph_version(graph)
+        key = cache_key(query, bindings, version)
+        value = pickle.dumps((list(variables), [tuple(r) for r in rows]),
+                             protocol=pickle.HIGHEST_PROTOCOL)
+        if len(value) > self.max_bytes:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, version, value, size, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, version, value, len(value), time.time()))
+        self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM results ORDER BY last_used").fetchall():
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        self._conn.execute("DELETE FROM results")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Статистика графа и перестановка триплет-паттернов по селективности.
+
+rdflib выполняет BGP вложенными циклами в порядке, который почти не
+зависит от данных: паттерны сортируются только по числу уже связанных
+переменных, а FILTER применяется после всей группы. В CQ1 это значит,
+что fr:hasCrew (сотни тысяч рёбер) раскрывается для каждого фильма до
+того, как отброшены фильмы не того жанра и года.
+
+Здесь:
+- GraphStatistics — число триплетов, уникальных субъектов и объектов
+  по каждому предикату и число экземпляров по каждому классу; считается
+  одним проходом по графу и кэшируется в <граф>.stats.json (с версией
+  содержимого графа, как в query_cache);
+- хук в CUSTOM_EVALS берёт группу из BGP, BIND (Extend) и Join с
+  FILTER над ней и выполняет её сам: паттерны выбираются жадно — каждый
+  следующий тот, у которого меньше всего ожидаемых строк на уже связанные
+  переменные (по статистике), BIND вычисляется, как только связаны его
+  входы, а каждое условие FILTER (конъюнкты &&) проверяется сразу после
+  паттерна, который связал его последнюю переменную. Паттерн, после
+  которого срабатывает фильтр, считается в FILTER_SELECTIVITY раз
+  селективнее — поэтому жанр и год идут раньше, чем hasCrew;
+- если к графу привязан range_index (graph.range_index), паттерн
+  ?movie fr:voteAverage ?rating с условием FILTER(?rating >= ...) на
+  связанную до группы границу выполняется как бинарный поиск по
+  отсортированному индексу, а его оценка — число значений в диапазоне.
+Формы, которые хук не разбирает (OPTIONAL, UNION, подзапросы, EXISTS),
+отдаются обычному вычислению rdflib; BGP внутри них всё равно
+переставляются.
+
+    python sparql.py               # планировщик включён
+    python sparql.py --no-planner  # порядок rdflib
+"""
+import json
+import os
+
+from rdflib import BNode, URIRef, Variable
+from rdflib.namespace import RDF
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql.evalutils import _ebv, _eval
+from rdflib.plugins.sparql.sparql import AlreadyBound, SPARQLError
+
+HOOK = "stats_reorder"
+STATS_VERSION = 1
+# во сколько раз фильтр, который можно проверить после паттерна, сокращает строки
+FILTER_SELECTIVITY = 0.1
+# планы кэшируются по (часть алгебры, связанные переменные)
+MAX_PLANS = 1000
+
+_TRIPLE, _EXTEND, _FILTER, _RANGE = "triple", "extend", "filter", "range"
+
+# магические предикаты других хуков (text_index): таких триплетов в графе
+# нет, поэтому группы с ними планировщик оставляет rdflib и их хукам
+MAGIC_PREDICATES = set()
+
+
+# === Статистика ===
+
+class GraphStatistics:
+    """
+    predicates: предикат -> (триплетов, уникальных субъектов, уникальных объектов);
+    classes: класс -> число экземпляров (rdf:type).
+    """
+
+    def __init__(self, triples, subjects, objects, predicates, classes, version=None):
+        self.triples = triples
+        self.subjects = subjects
+        self.objects = objects
+        self.predicates = predicates
+        self.classes = classes
+        self.version = version
+
+    @classmethod
+    def collect(cls, graph, version=None):
+        """Один проход по графу."""
+        per_predicate = {}
+        classes = {}
+        subjects, objects = set(), set()
+        triples = 0
+        for s, p, o in graph:
+            triples += 1
+            subjects.add(s)
+            objects.add(o)
+            entry = per_predicate.get(p)
+            if entry is None:
+                entry = per_predicate[p] = [0, set(), set()]
+            entry[0] += 1
+            entry[1].add(s)
+            entry[2].add(o)
+            if p == RDF.type:
+                classes[o] = classes.get(o, 0) + 1
+        predicates = {p: (count, len(ss), len(oo)) for p, (count, ss, oo) in per_predicate.items()}
+        return cls(triples, len(subjects), len(objects), predicates, classes, version)
+
+    def predicate(self, p):
+        return self.predicates.get(p, (0, 0, 0))
+
+    def save(self, path):
+        data = {"format": STATS_VERSION, "version": self.version, "triples": self.triples,
+                "subjects": self.subjects, "objects": self.objects,
+                "predicates": {str(p): list(v) for p, v in self.predicates.items()},
+                "classes": {str(c): n for c, n in self.classes.items()}}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != STATS_VERSION:
+            raise ValueError(f"формат статистики {data.get('format')}, нужен {STATS_VERSION}")
+        return cls(data["triples"], data["subjects"], data["objects"],
+                   {URIRef(p): tuple(v) for p, v in data["predicates"].items()},
+                   {URIRef(c): n for c, n in data["classes"].items()}, data["version"])
+
+
+def stats_path(graph_path):
+    return graph_path + ".stats.json"
+
+
+def graph_statistics(graph, path=None):
+    """
+    Статистика графа: из path, если она посчитана для той же версии
+    содержимого (graph.content_version), иначе — новый проход и запись в path.
+    """
+    version = getattr(graph, "content_version", None)
+    if path and version and os.path.exists(path):
+        try:
+            stats = GraphStatistics.load(path)
+            if stats.version == version:
+                return stats
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Статистика {path} не прочитана ({e}), считаем заново")
+    stats = GraphStatistics.collect(graph, version)
+    if path and version:
+        stats.save(path)
+    return stats
+
+
+def enable(graph, path=None):
+    """Привязывает статистику к графу и включает хук (для графов без статистики он не срабатывает)."""
+    graph.statistics = graph_statistics(graph, path)
+    CUSTOM_EVALS[HOOK] = evaluate
+    return graph.statistics
+
+
+def disable():
+    CUSTOM_EVALS.pop(HOOK, None)
+
+
+# === Разбор алгебры ===
+
+def _is_var(term):
+    return isinstance(term, (Variable, BNode))
+
+
+def _triple_vars(triple):
+    return {t for t in triple if _is_var(t)}
+
+
+def expr_vars(expr):
+    """Переменные выражения; EXISTS внутри — не наша форма."""
+    if isinstance(expr, Variable):
+        return {expr}
+    if isinstance(expr, dict):
+        if getattr(expr, "name", None) in ("Builtin_EXISTS", "Builtin_NOTEXISTS"):
+            raise NotImplementedError
+        return set().union(*(expr_vars(v) for k, v in expr.items() if not k.startswith("_")))
+    if isinstance(expr, (list, tuple)):
+        return set().union(*(expr_vars(v) for v in expr))
+    return set()
+
+
+def _conjuncts(expr):
+    """FILTER(a && b && c) -> [a, b, c]."""
+    if getattr(expr, "name", None) == "ConditionalAndExpression":
+        return [c for e in [expr.expr, *(expr.other or [])] for c in _conjuncts(e)]
+    return [expr]
+
+
+def _flatten(part, triples, extends):
+    """BGP/Extend/Join -> паттерны и BIND; возвращает переменные части."""
+    if part.name == "BGP":
+        if any(p in MAGIC_PREDICATES for _, p, _ in part.triples):
+            raise NotImplementedError
+        triples.extend(part.triples)
+        return set().union(*(_triple_vars(t) for t in part.triples))
+    if part.name == "Extend":
+        inner = _flatten(part.p, triples, extends)
+        needs = expr_vars(part.expr)
+        # BIND видит только переменные своей части — иначе порядок важен
+        if not needs <= inner:
+            raise NotImplementedError
+        extends.append((part.var, part.expr, needs))
+        return inner | {part.var}
+    if part.name == "Join":
+        return _flatten(part.p1, triples, extends) | _flatten(part.p2, triples, extends)
+    raise NotImplementedError
+
+
+# === Оценка и план ===
+
+def estimate(stats, triple, bound):
+    """Ожидаемое число строк паттерна на одну строку с переменными bound."""
+    s, p, o = triple
+    s_bound = not _is_var(s) or s in bound
+    o_bound = not _is_var(o) or o in bound
+    if _is_var(p):
+        count, subjects, objects = stats.triples, stats.subjects, stats.objects
+    else:
+        count, subjects, objects = stats.predicate(p)
+        if p == RDF.type and not _is_var(o):
+            count = subjects = stats.classes.get(o, 0)
+            objects = 1
+    if s_bound and o_bound:
+        return min(1.0, count / max(subjects * objects, 1))
+    if s_bound:
+        return count / max(subjects, 1)
+    if o_bound:
+        return count / max(objects, 1)
+    return float(count)
+
+
+def _closure(bound, extends):
+    """bound + переменные BIND, которые из них вычисляются."""
+    bound = set(bound)
+    changed = True
+    while changed:
+        changed = False
+        for var, _, needs in extends:
+            if var not in bound and needs <= bound:
+                bound.add(var)
+                changed = True
+    return bound
+
+
+def plan(stats, triples, extends, filters, bound, scans=None):
+    """
+    Жадный порядок шагов: (_TRIPLE, паттерн) / (_RANGE, (паттерн, RangeScan)) /
+    (_EXTEND, (var, expr)) / (_FILTER, expr). bound — переменные, связанные
+    до группы; scans — {паттерн: RangeScan} из range_index.
+    """
+    scans = scans or {}
+    bound = set(bound)
+    remaining = list(triples)
+    extends = list(extends)
+    filters = [(expr, expr_vars(expr)) for expr in filters]
+    steps = []
+
+    def settle():
+        changed = True
+        while changed:
+            changed = False
+            for ext in list(extends):
+                var, expr, needs = ext
+                if needs <= bound:
+                    steps.append((_EXTEND, (var, expr)))
+                    bound.add(var)
+                    extends.remove(ext)
+                    changed = True
+        for flt in list(filters):
+            if flt[1] <= bound:
+                steps.append((_FILTER, flt[0]))
+                filters.remove(flt)
+
+    def range_scan(triple):
+        scan = scans.get(triple)
+        return scan if scan is not None and not _triple_vars(triple) & bound else None
+
+    def score(triple):
+        after = _closure(bound | _triple_vars(triple), extends)
+        scan = range_scan(triple)
+        if scan is None:
+            rows, covered = estimate(stats, triple, bound), ()
+        else:
+            # условия диапазона уже учтены в числе строк скана
+            rows, covered = scan.estimate, scan.exprs
+        unlocked = sum(1 for expr, needs in filters
+                       if needs <= after and not any(expr is e for e in covered))
+        return rows * FILTER_SELECTIVITY ** unlocked
+
+    settle()
+    while remaining:
+        # без декартовых произведений: сначала паттерны, связанные с уже известным
+        connected = [t for t in remaining if not _triple_vars(t) or _triple_vars(t) & bound]
+        candidates = connected or remaining
+        best = min(candidates, key=lambda t: (score(t), remaining.index(t)))
+        remaining.remove(best)
+        scan = range_scan(best)
+        steps.append((_TRIPLE, best) if scan is None else (_RANGE, (best, scan)))
+        bound |= _triple_vars(best)
+        settle()
+    # переменные, которые так и не связались: ошибка/ложь, как и у rdflib
+    steps.extend((_EXTEND, (var, expr)) for var, expr, _ in extends)
+    steps.extend((_FILTER, expr) for expr, _ in filters)
+    return steps
+
+
+# === Выполнение ===
+
+def _run(ctx, steps, i=0):
+    if i == len(steps):
+        yield ctx.solution()
+        return
+    kind, arg = steps[i]
+    if kind == _TRIPLE:
+        s, p, o = arg
+        _s, _p, _o = ctx[s], ctx[p], ctx[o]
+        for ss, sp, so in ctx.graph.triples((_s, _p, _o)):
+            c = ctx.push() if None in (_s, _p, _o) else ctx
+            try:
+                if _s is None:
+                    c[s] = ss
+                if _p is None:
+                    c[p] = sp
+                if _o is None:
+                    c[o] = so
+            except AlreadyBound:
+                continue
+            yield from _run(c, steps, i + 1)
+    elif kind == _RANGE:
+        (s, _, o), scan = arg
+        for ss, so in scan.rows(ctx):
+            c = ctx.push()
+            c[s] = ss
+            c[o] = so
+            yield from _run(c, steps, i + 1)
+    elif kind == _EXTEND:
+        var, expr = arg
+        c = ctx
+        try:
+            value = _eval(expr, ctx.solution())
+            if isinstance(value, SPARQLError):
+                raise value
+            c = ctx.push()
+            c[var] = value
+        except SPARQLError:
+            pass
+        yield from _run(c, steps, i + 1)
+    elif _ebv(arg, ctx.solution()):
+        yield from _run(ctx, steps, i + 1)
+
+
+_PLANS = {}
+
+
+def evaluate(ctx, part):
+    """Хук CUSTOM_EVALS: BGP / BIND / Join (под FILTER или без) по статистике."""
+    stats = getattr(ctx.graph, "statistics", None)
+    if stats is None or part.name not in ("BGP", "Extend", "Join", "Filter"):
+        raise NotImplementedError
+
+    root, filters = part, []
+    if part.name == "Filter":
+        filters = _conjuncts(part.expr)
+        root = part.p
+    triples, extends = [], []
+    group_vars = _flatten(root, triples, extends)
+    if extends and {var for var, _, _ in extends} & set().union(*map(_triple_vars, triples)):
+        raise NotImplementedError
+    bound = {v for v in group_vars | set().union(*map(expr_vars, filters)) if ctx[v] is not None}
+    outer = bound - group_vars - set(part._vars or ()) - set(ctx.initBindings or ())
+    if filters and not part.no_isolated_scope and outer:
+        # rdflib скрыл бы от фильтра внешние привязки — оставляем это ему
+        raise NotImplementedError
+
+    ranges = getattr(ctx.graph, "range_index", None)
+    key = (id(part), frozenset(bound), ranges is not None)
+    cached = _PLANS.get(key)
+    if cached is None or cached[0] is not part:
+        if len(_PLANS) >= MAX_PLANS:
+            _PLANS.clear()
+        scans = ranges.scans(triples, filters, bound, ctx.solution()) if ranges and filters else {}
+        cached = _PLANS[key] = (part, plan(stats, triples, extends, filters, bound, scans))
+    return _run(ctx, cached[1])
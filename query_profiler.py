@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Тайминг SPARQL-запроса по фазам и профилирование.
+
+rdflib вычисляет SELECT лениво: graph.query(...) возвращает почти сразу,
+а вся работа идёт при обходе результата. Поэтому execute_query в
+sparql.py меряет фазы отдельно:
+    parse        — parseQuery (текст -> дерево разбора);
+    algebra      — translateQuery (дерево -> алгебра SPARQL);
+    evaluate     — graph.query и первая строка результата: здесь
+                   выполняются все блокирующие шаги (GROUP BY, ORDER BY);
+    materialize  — остальные строки в список;
+    format       — печать таблицы;
+    cache        — поиск в кэше результатов (если он включён).
+Если задан JSONL-файл (sparql.py --timings PATH), по каждому запросу в
+него дописывается запись с фазами, числом строк и ошибкой, если она была. С профилированием evaluate и
+materialize идут под cProfile, статистика пишется в <dir>/<запрос>.prof
+(смотреть: python -m pstats file.prof или snakeviz).
+"""
+import cProfile
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self, *names):
+        """Сумма фаз (всех, если имена не указаны)."""
+        return sum(t for name, t in self.phases.items() if not names or name in names)
+
+
+def profile_path(profile_dir, query_name):
+    slug = re.sub(r"\W+", "_", query_name, flags=re.UNICODE).strip("_")[:60] or "query"
+    return os.path.join(profile_dir, f"{slug}.prof")
+
+
+@contextmanager
+def profiled(path):
+    """cProfile вокруг блока; path=None — без профилирования."""
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        profiler.dump_stats(path)
+
+
+def write_record(path, record):
+    """Дописывает запись о запросе одной JSON-строкой."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Отсортированные индексы по числовым свойствам и дате фильма для
+диапазонных FILTER.
+
+CQ3 и CQ8 берут фильмы с ?date между двумя xsd:date, CQ2 и CQ8 —
+с ?rating >= 7.0, CQ7 — с ?revenue >= 50000000. rdflib (и планировщик из
+query_planner) для этого перебирает значение свойства у каждого фильма и
+только потом проверяет FILTER. Здесь для fr:releaseDate, fr:voteAverage,
+fr:revenue, fr:budget, fr:profit, fr:runtime и fr:popularity один раз
+строятся столбцы (ключ, субъект, литерал), отсортированные по ключу —
+отдельно для чисел и для xsd:date; литералы, которые нельзя сравнить
+(не число, битая дата, NaN), лежат в others и отдаются любому диапазону.
+Сужается только столбец того же рода, что и граница: значения другого
+рода (дата при границе-числе) отдаются целиком, решает FILTER.
+
+Планировщик (query_planner.evaluate) спрашивает RangeIndex.scans(), какие
+паттерны группы вида ?movie fr:voteAverage ?rating ограничены условиями
+FILTER (?rating >= ?minRating, ?date <= "2010-12-31"^^xsd:date, ...), где
+вторая сторона — константа или переменная, связанная до группы. Такой
+паттерн выполняется как RangeScan: границы вычисляются на каждом
+выполнении, а строки — срез между двумя bisect. Сам FILTER остаётся в
+плане и проверяется как раньше, поэтому результат совпадает с rdflib;
+индекс только не даёт перебирать заведомо лишние значения. Число строк
+в диапазоне — оценка паттерна для жадного порядка.
+
+Индекс кэшируется в <граф>.ranges.pkl по версии содержимого графа.
+
+    python sparql.py               # диапазонные индексы включены
+    python sparql.py --no-ranges   # FILTER по перебору значений
+"""
+import os
+import pickle
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+
+from rdflib import Literal, Namespace, Variable
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql.evalutils import _eval
+from rdflib.plugins.sparql.operators import numeric
+from rdflib.plugins.sparql.sparql import SPARQLError
+
+from query_planner import expr_vars
+
+FR = Namespace("http://example.org/film-rating#")
+
+RANGE_INDEX_VERSION = 1
+
+# fr:releaseYear — только в графах из `main.py --derived`
+RANGE_PREDICATES = [FR.releaseDate, FR.voteAverage, FR.revenue, FR.budget, FR.profit,
+                    FR.runtime, FR.popularity, FR.releaseYear]
+
+# ?var OP expr; для expr OP ?var оператор отражается
+OPS = {"<", "<=", ">", ">=", "="}
+FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "=": "="}
+
+
+def range_index_path(graph_path):
+    return graph_path + ".ranges.pkl"
+
+
+def sort_key(term):
+    """("number", n) / ("date", d) для литерала или None, если его так не сравнить."""
+    if not isinstance(term, Literal):
+        return None
+    if term.datatype == XSD.date:
+        value = term.toPython()
+        if isinstance(value, date) and not isinstance(value, datetime):
+            return "date", value
+        return None
+    try:
+        value = numeric(term)
+    except SPARQLError:
+        return None
+    if value != value:  # NaN ни с чем не сравнивается
+        return None
+    return "number", value
+
+
+def _slice(keys, low, high):
+    """[lo, hi) ключей в границах; граница — (значение, включительно) или None."""
+    lo = 0
+    if low is not None:
+        lo = (bisect_left if low[1] else bisect_right)(keys, low[0])
+    hi = len(keys)
+    if high is not None:
+        hi = (bisect_right if high[1] else bisect_left)(keys, high[0])
+    return lo, max(lo, hi)
+
+
+# === Индекс ===
+
+class Column:
+    """Литералы одного рода, отсортированные по ключу."""
+
+    def __init__(self, rows):
+        rows.sort(key=lambda row: row[0])
+        self.keys = [key for key, _, _ in rows]
+        self.subjects = [s for _, s, _ in rows]
+        self.objects = [o for _, _, o in rows]
+
+
+class PredicateRange:
+    def __init__(self, columns, others):
+        self.columns = columns
+        self.others = others
+        self.size = sum(len(c.keys) for c in columns.values()) + len(others)
+
+
+class RangeIndex:
+    def __init__(self, version=None):
+        self.version = version
+        self.format = RANGE_INDEX_VERSION
+        self.predicates = {}
+
+    @classmethod
+    def build(cls, graph, version=None):
+        index = cls(version)
+        for predicate in RANGE_PREDICATES:
+            rows, others = {}, []
+            for s, o in graph.subject_objects(predicate):
+                key = sort_key(o)
+                if key is None:
+                    others.append((s, o))
+                else:
+                    rows.setdefault(key[0], []).append((key[1], s, o))
+            if rows or others:
+                columns = {kind: Column(kind_rows) for kind, kind_rows in rows.items()}
+                index.predicates[predicate] = PredicateRange(columns, others)
+        return index
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if not isinstance(index, cls) or index.format != RANGE_INDEX_VERSION:
+            raise ValueError(f"{path}: не диапазонный индекс версии {RANGE_INDEX_VERSION}")
+        return index
+
+    def count(self, predicate, bounds):
+        """Сколько строк отдаст rows(): bounds — (род, low, high)."""
+        entry = self.predicates[predicate]
+        kind, low, high = bounds
+        total = len(entry.others)
+        for column_kind, column in entry.columns.items():
+            if column_kind == kind:
+                lo, hi = _slice(column.keys, low, high)
+                total += hi - lo
+            else:
+                total += len(column.keys)
+        return total
+
+    def rows(self, predicate, bounds):
+        """
+        (субъект, литерал): из столбца рода границ — только ключи в границах,
+        столбцы других родов и несравнимые литералы — целиком. Как rdflib
+        сравнивает дату с числом, решает FILTER, который остаётся в плане.
+        """
+        entry = self.predicates[predicate]
+        kind, low, high = bounds
+        for column_kind, column in entry.columns.items():
+            lo, hi = 0, len(column.keys)
+            if column_kind == kind:
+                lo, hi = _slice(column.keys, low, high)
+            yield from zip(column.subjects[lo:hi], column.objects[lo:hi])
+        yield from entry.others
+
+    # === Для планировщика ===
+
+    def scans(self, triples, filters, bound, solution):
+        """
+        {паттерн: RangeScan} для паттернов (?s, свойство с индексом, ?v),
+        у ?v которых есть диапазонные условия среди конъюнктов filters.
+        """
+        conditions = {}
+        for expr in filters:
+            condition = _condition(expr, bound)
+            if condition is not None:
+                conditions.setdefault(condition[0], []).append(condition[1:])
+        scans = {}
+        for triple in triples:
+            s, p, o = triple
+            if (p in self.predicates and isinstance(s, Variable) and s not in bound
+                    and o in conditions and o not in bound and o != s):
+                scan = RangeScan(p, conditions[o])
+                bounds = scan.bounds(solution)
+                scan.estimate = (self.predicates[p].size if bounds is None
+                                 else self.count(p, bounds))
+                scans[triple] = scan
+        return scans
+
+
+def _condition(expr, bound):
+    """
+    FILTER-конъюнкт ?v OP expr, где expr — константа или связано до группы
+    -> (?v, OP, expr, сам конъюнкт); иначе None.
+    """
+    if getattr(expr, "name", None) != "RelationalExpression" or expr.op not in OPS:
+        return None
+    left, right = expr.expr, expr.other
+    try:
+        if isinstance(left, Variable) and left not in bound and expr_vars(right) <= bound:
+            return left, expr.op, right, expr
+        if isinstance(right, Variable) and right not in bound and expr_vars(left) <= bound:
+            return right, FLIPPED[expr.op], left, expr
+    except NotImplementedError:
+        pass
+    return None
+
+
+class RangeScan:
+    """Паттерн (?s, predicate, ?v) с условиями [(OP, выражение, исходный конъюнкт)] на ?v."""
+
+    def __init__(self, predicate, conditions):
+        self.predicate = predicate
+        self.conditions = conditions
+        self.exprs = [source for _, _, source in conditions]
+        self.estimate = 0
+
+    def bounds(self, solution):
+        """(род, low, high) по текущим значениям выражений или None — тогда полный перебор."""
+        kind, low, high = None, None, None
+        for op, expr, _ in self.conditions:
+            try:
+                value = _eval(expr, solution)
+            except SPARQLError:
+                return None
+            key = sort_key(value)
+            if key is None or kind not in (None, key[0]):
+                return None
+            kind = key[0]
+            if op in (">", ">=", "="):
+                edge = (key[1], op != ">")
+                if low is None or edge[0] > low[0] or (edge[0] == low[0] and not edge[1]):
+                    low = edge
+            if op in ("<", "<=", "="):
+                edge = (key[1], op != "<")
+                if high is None or edge[0] < high[0] or (edge[0] == high[0] and not edge[1]):
+                    high = edge
+        return kind, low, high
+
+    def rows(self, ctx):
+        index = getattr(ctx.graph, "range_index", None)
+        bounds = self.bounds(ctx.solution()) if index is not None else None
+        if bounds is None or self.predicate not in index.predicates:
+            for s, _, o in ctx.graph.triples((None, self.predicate, None)):
+                yield s, o
+            return
+        yield from index.rows(self.predicate, bounds)
+
+
+def graph_range_index(graph):
+    """
+    Индекс графа: уже привязанный, из <граф>.ranges.pkl той же версии или
+    построенный заново (и сохранённый рядом с графом, если он из файла).
+    """
+    index = getattr(graph, "range_index", None)
+    version = getattr(graph, "content_version", None)
+    if index is not None and index.version == version:
+        return index
+    path = getattr(graph, "source_path", None)
+    index = None
+    if path and version and os.path.exists(range_index_path(path)):
+        try:
+            index = RangeIndex.load(range_index_path(path))
+        except (OSError, ValueError, AttributeError, pickle.UnpicklingError) as e:
+            print(f"Диапазонный индекс {range_index_path(path)} не прочитан ({e}), строим заново")
+        if index is not None and index.version != version:
+            index = None
+    if index is None:
+        index = RangeIndex.build(graph, version)
+        if path and version:
+            index.save(range_index_path(path))
+    graph.range_index = index
+    return index
+
+
+def enable(graph):
+    """Привязывает индекс к графу: планировщик query_planner берёт его оттуда."""
+    return graph_range_index(graph)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Потоковая запись триплетов в N-Triples и Turtle без rdflib.Graph в памяти.
+
+Писатели повторяют интерфейс графа, нужный билдерам (add), поэтому
+emit_movies пишет в них так же, как в Graph.
+Граф в памяти не собирается, но память и не постоянна:
+- буфер текущего блока (Turtle) и множество его триплетов растут с
+  размером пачки и сбрасываются на flush();
+- множество уже записанных триплетов общих сущностей (Person, Genre,
+  Keyword, ...) живёт весь поток и растёт с числом различных сущностей
+  (для TMDB — в основном людей), но не с числом фильмов и ролей;
+- у TripleEmitter, который пишет в писатель, такого же порядка
+  множества typed/labelled и кэши интернированных URI и литералов.
+Дедупликация не ограничена: вытеснение давало бы повторы в файле.
+main.stream_graph к тому же получает весь DataFrame фильмов; с чтением
+CSV пачками (`main.py --chunked`) из растущего остаются только эти
+множества.
+
+IRI пишутся как <...>; символы, запрещённые в IRIREF N-Triples и Turtle
+(управляющие, пробел, <>"{}|^`\\), экранируются как \\uXXXX.
+"""
+import re
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import RDF
+
+# локальное имя, которое можно писать как prefix:name без экранирования
+_PN_LOCAL = re.compile(r"^[A-Za-z_][A-Za-z0-9_\-]*$")
+# символы, которых не может быть в IRIREF: управляющие, пробел и <>"{}|^`\
+_IRI_UNSAFE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+
+def _escape(value):
+    return (value.replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _escape_iri(value):
+    return _IRI_UNSAFE.sub(lambda m: f"\\u{ord(m.group()):04X}", value)
+
+
+def nt_term(term):
+    """Терм в синтаксисе N-Triples (он же валиден в Turtle)."""
+    if isinstance(term, URIRef):
+        return f"<{_escape_iri(term)}>"
+    if isinstance(term, Literal):
+        text = f'"{_escape(str(term))}"'
+        if term.language:
+            return f"{text}@{term.language}"
+        if term.datatype:
+            return f"{text}^^<{_escape_iri(term.datatype)}>"
+        return text
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    raise TypeError(f"Unsupported RDF term: {term!r}")
+
+
+class _StreamWriter:
+    """Общее для писателей: файл, дедупликация общих сущностей, счётчики."""
+
+    def __init__(self, path, shared_prefixes=()):
+        self.path = path
+        self.shared_prefixes = tuple(shared_prefixes)
+        self.written = 0
+        self._seen_shared = set()
+        self._seen_block = set()
+        self._out = open(path, "w", encoding="utf-8")
+
+    def _is_new(self, triple):
+        # триплеты общих сущностей пишем один раз на весь поток,
+        # остальные — один раз в пределах блока (до flush)
+        if self.shared_prefixes and str(triple[0]).startswith(self.shared_prefixes):
+            seen = self._seen_shared
+        else:
+            seen = self._seen_block
+        if triple in seen:
+            return False
+        seen.add(triple)
+        return True
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.add((s, p, o))
+
+    def flush(self):
+        self._seen_block.clear()
+        self._out.flush()
+
+    def close(self):
+        if not self._out.closed:
+            self.flush()
+            self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NTriplesWriter(_StreamWriter):
+    """Пишет каждый триплет сразу строкой N-Triples."""
+
+    def add(self, triple):
+        if not self._is_new(triple):
+            return
+        s, p, o = triple
+        self._out.write(f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n")
+        self.written += 1
+
+
+class TurtleWriter(_StreamWriter):
+    """
+    Копит триплеты текущего блока (например, пачки фильмов) и на flush()
+    пишет их сгруппированными по субъекту: s p1 o1 ; p2 o2 , o3 .
+    """
+
+    def __init__(self, path, prefixes=None, shared_prefixes=()):
+        super().__init__(path, shared_prefixes)
+        self.prefixes = dict(prefixes or {})
+        self._block = {}
+        for prefix, ns in self.prefixes.items():
+            self._out.write(f"@prefix {prefix}: <{ns}> .\n")
+        self._out.write("\n")
+
+    def _term(self, term):
+        if isinstance(term, URIRef):
+            for prefix, ns in self.prefixes.items():
+                if term.startswith(ns) and _PN_LOCAL.match(term[len(ns):]):
+                    return f"{prefix}:{term[len(ns):]}"
+        if isinstance(term, Literal) and term.datatype and not term.language:
+            return f'"{_escape(str(term))}"^^{self._term(term.datatype)}'
+        return nt_term(term)
+
+    def add(self, triple):
+        if not self._is_new(triple):
+            return
+        s, p, o = triple
+        self._block.setdefault(s, {}).setdefault(p, []).append(o)
+        self.written += 1
+
+    def flush(self):
+        for s, props in self._block.items():
+            lines = [
+                ("a " if p == RDF.type else f"{self._term(p)} ") + " , ".join(self._term(o) for o in objs)
+                for p, objs in props.items() if objs
+            ]
+            if lines:
+                self._out.write(f"{self._term(s)} " + " ;\n    ".join(lines) + " .\n\n")
+        self._block = {}
+        super().flush()
@@ -1,15 +1,93 @@
 from rdflib import Graph, Namespace
 import time
-from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.algebra import translateQuery
+from rdflib.plugins.sparql.parser import parseQuery
+from rdflib.util import guess_format
+
+from columnar_engine import graph_columns
+from cq_registry import CHECK_QUERIES, COMPETENCY_QUERIES, DERIVED_VERSIONS, EXACT_VERSIONS, get_cq
+from graph_cube import graph_cube
+from graph_snapshot import is_fresh, load_snapshot, snapshot_path
+from mmap_store import index_path, is_fresh as index_is_fresh, open_index_graph
+from parallel_queries import can_fork, run_parallel
+from query_cache import ResultCache, cache_path, file_version
+import query_planner
+import range_index
+from query_profiler import PhaseTimer, profile_path, profiled, write_record
+from sqlite_store import open_store_graph
+import text_index
 
 # Параметры
 RDF_FILE = 'tmdb_data.ttl'
+# персистентное хранилище от `python main.py --store tmdb_data.sqlite` запрашивается
+# напрямую, без загрузки графа в память, только если указано явно: `--store PATH`
+
+
+# кэш результатов запросов (query_cache.ResultCache); None — без кэша
+RESULT_CACHE = None
+# куда писать JSON-записи о запросах (None — никуда) и .prof-файлы cProfile
+TIMINGS_LOG = None
+PROFILE_DIR = None
+# сколько процессов выполняют запросы (1 — по очереди, 0 — все ядра)
+WORKERS = 1
+# перестановка паттернов по статистике графа (query_planner)
+PLANNER = True
+# диапазонные FILTER через отсортированные индексы (range_index), только с планировщиком
+RANGES = True
+# отвечать на агрегатные CQ из предагрегированного куба (graph_cube)
+CUBE = True
+# чем вычислять CQ из реестра: "rdflib" или "numpy" (columnar_engine)
+ENGINE = "rdflib"
+# открывать memory-mapped индекс <граф>.idx (mmap_store), если он свежий
+MMAP = True
+# брать версии CQ по производным фактам (граф из `main.py --derived`)
+DERIVED = False
+# заменять CQ другими запросами *_exact: точный жанр, режиссёр по fr:directedBy
+EXACT = False
 
 
 # Загрузка RDF графа
 def load_graph(file_path):
+    g = _load_graph(file_path)
+    # версия содержимого — часть ключа кэша результатов; SQLite-хранилище
+    # хранит версию сборки само, иначе — sha256 файла
+    build_version = getattr(g.store, 'build_version', None)
+    version = build_version() if build_version else None
+    g.content_version = f"sqlite:{version}" if version else file_version(file_path, file_path + '-wal')
+    g.source_path = file_path
+    if PLANNER:
+        query_planner.enable(g, query_planner.stats_path(file_path))
+        if RANGES:
+            range_index.enable(g)
+    # магические fr:textMatch / fr:labelMatch / ...; индекс строится при первом поиске
+    text_index.enable()
+    return g
+
+
+def _load_graph(file_path):
+    if file_path.endswith(('.sqlite', '.db')):
+        return open_store_graph(file_path, read_only=True)
+
+    # индекс от `python mmap_store.py` открывается без загрузки графа в память
+    index = index_path(file_path)
+    if MMAP and index_is_fresh(index, file_path):
+        try:
+            return open_index_graph(index)
+        except ValueError as e:
+            print(f"Индекс {index} не открыт ({e}), загружаем граф")
+
+    # бинарный снимок от билдера грузится за секунды; берём его, если он
+    # свежий (новее TTL и sha256 совпадает), иначе честно парсим файл
+    snap = snapshot_path(file_path)
+    if is_fresh(snap, file_path):
+        try:
+            return load_snapshot(snap)
+        except ValueError as e:
+            print(f"Снимок {snap} не прочитан ({e}), разбираем {file_path}")
+
     g = Graph()
-    g.parse(file_path, format='turtle')  # используем turtle, так как схема в TTL
+    # turtle по умолчанию; .nt из потоковой сборки (main.py --stream nt) тоже читается
+    g.parse(file_path, format=guess_format(file_path) or 'turtle')
     return g
 
 
@@ -24,387 +102,272 @@ def setup_namespace(graph):
     return fr
 
 
-# Выполнение SPARQL-запроса с таймингом
-def execute_query(graph, query, query_name, timeout=60):
+# Ответ на запрос: куб, колоночный движок, кэш результатов или rdflib — без
+# печати (его же меряет benchmark.py). query — текст или BoundCQ из
+# cq_registry: он уже скомпилирован, поэтому разбор и алгебра пропускаются,
+# а параметры идут в initBindings. Возвращает (переменные, строки, источник):
+# "cube", "numpy", "cache" или "sparql"; время фаз копится в timer
+def answer_query(graph, query, bindings=None, timer=None, profile=None):
+    timer = timer or PhaseTimer()
+    prepared_query = cq = None
+    if not isinstance(query, str):
+        cq = query
+        bindings = {**query.bindings, **(bindings or {})}
+        prepared_query = query.prepared
+        query = query.text
+
+    if CUBE and cq is not None:
+        with timer.phase("cube"):
+            answered = graph_cube(graph).answer(cq.name, cq.values)
+        if answered is not None:
+            return (*answered, "cube")
+    if ENGINE == "numpy" and cq is not None:
+        with timer.phase("numpy"):
+            answered = graph_columns(graph).answer(cq.name, cq.values)
+        if answered is not None:
+            return (*answered, "numpy")
+    if RESULT_CACHE is not None:
+        with timer.phase("cache"):
+            cached = RESULT_CACHE.get(graph, query, bindings)
+        if cached is not None:
+            return (*cached, "cache")
+
+    if prepared_query is None:
+        with timer.phase("parse"):
+            parsed = parseQuery(query)
+        with timer.phase("algebra"):
+            prepared_query = translateQuery(parsed)
+    with profiled(profile):
+        # вычисление ленивое: реальная работа — при получении строк
+        with timer.phase("evaluate"):
+            results = graph.query(prepared_query, initBindings=bindings)
+            rows_iter = iter(results)
+            first = next(rows_iter, None)
+        with timer.phase("materialize"):
+            rows = [] if first is None else [first, *rows_iter]
+    if RESULT_CACHE is not None and results.type == "SELECT":
+        RESULT_CACHE.put(graph, query, results.vars, rows, bindings)
+    return results.vars, rows, "sparql"
+
+
+# Выполнение SPARQL-запроса с таймингом по фазам (см. query_profiler)
+def execute_query(graph, query, query_name, timeout=60, bindings=None):
+    # параметры CQ вместе с переданными — для записи о запросе
+    bound = bindings if isinstance(query, str) else {**query.bindings, **(bindings or {})}
+
     print(f"\n{'=' * 60}")
     print(f"Запрос: {query_name}")
     print(f"{'=' * 60}")
 
-    start_time = time.time()
+    timer = PhaseTimer()
+    record = {"query": query_name, "started_at": time.time(), "cached": False,
+              "bindings": {str(k): str(v) for k, v in (bound or {}).items()}}
+    sources = {"cube": "из куба", "numpy": "колоночный движок", "cache": "из кэша"}
 
     try:
-        # Используем prepareQuery для оптимизации
-        prepared_query = prepareQuery(query)
-        results = graph.query(prepared_query)
-
-        elapsed_time = time.time() - start_time
-        print(f"Время выполнения: {elapsed_time:.2f} сек")
-
-        if len(results) == 0:
-            print("Результатов не найдено")
-            return
-
-        # Выводим заголовки
-        print("\nРезультаты:")
-        print("-" * 80)
-
-        # Преобразуем результаты в список для лучшего форматирования
-        rows = []
-        for row in results:
-            rows.append(row)
-
-        # Определяем ширину колонок
-        if len(rows) > 0:
-            col_widths = [0] * len(rows[0])
-            for row in rows:
-                for i, val in enumerate(row):
-                    col_widths[i] = max(col_widths[i], len(str(val)))
-
-            # Выводим заголовки
-            for i, var in enumerate(results.vars):
-                print(f"{var:<{col_widths[i]}}", end="  ")
-            print()
-            print("-" * sum(col_widths) + "--" * len(col_widths))
-
-            # Выводим данные
-            for row in rows:
-                for i, val in enumerate(row):
-                    print(f"{val:<{col_widths[i]}}", end="  ")
-                print()
-
-        print(f"\nНайдено записей: {len(rows)}")
+        profile = profile_path(PROFILE_DIR, query_name) if PROFILE_DIR else None
+        variables, rows, source = answer_query(graph, query, bindings, timer, profile)
+        if source == "cache":
+            record["cached"] = True
+        elif source != "sparql":
+            record[source] = True
+        if source != "sparql":
+            print(f"Время выполнения: {timer.total():.2f} сек ({sources[source]})")
+        else:
+            if profile:
+                record["profile"] = profile
+            phases = timer.phases
+            compiled = (f"разбор {phases['parse']:.2f}, алгебра {phases['algebra']:.2f}"
+                        if "parse" in phases else "скомпилирован заранее")
+            print(f"Время выполнения: {timer.total():.2f} сек "
+                  f"({compiled}, "
+                  f"вычисление {phases['evaluate']:.2f}, "
+                  f"материализация {phases['materialize']:.2f})")
+
+        record["rows"] = len(rows)
+        with timer.phase("format"):
+            print_rows(variables, rows)
 
     except Exception as e:
-        elapsed_time = time.time() - start_time
-        print(f"Ошибка при выполнении запроса (время: {elapsed_time:.2f} сек): {e}")
+        record["error"] = f"{type(e).__name__}: {e}"
+        print(f"Ошибка при выполнении запроса (время: {timer.total():.2f} сек): {e}")
+
+    record["phases"] = {name: round(t, 6) for name, t in timer.phases.items()}
+    record["total"] = round(timer.total(), 6)
+    if TIMINGS_LOG:
+        write_record(TIMINGS_LOG, record)
+    return record
+
+
+def after_fork(graph):
+    """
+    Старт воркера parallel_queries: свои соединения SQLite вместо
+    унаследованных через fork. Возвращает граф, если его нужно переоткрыть.
+    """
+    global RESULT_CACHE, TIMINGS_LOG
+    if RESULT_CACHE is not None:
+        RESULT_CACHE = ResultCache(RESULT_CACHE.path, RESULT_CACHE.max_bytes)
+    # записи о таймингах пишет родитель, в порядке запросов
+    TIMINGS_LOG = None
+    path = getattr(graph, 'source_path', '')
+    if path.endswith(('.sqlite', '.db')):
+        reopened = load_graph(path)
+        reopened.content_version = graph.content_version
+        return reopened
+    return None
+
+
+def run_queries(graph, queries):
+    """Выполняет [(название, запрос), ...]: по очереди или в пуле процессов (WORKERS)."""
+    if WORKERS == 1 or len(queries) < 2 or not can_fork():
+        return [execute_query(graph, query, name) for name, query in queries]
+
+    # компилируем CQ и строим куб и столбцы до fork, чтобы воркеры получили их готовыми
+    for _, query in queries:
+        if not isinstance(query, str):
+            query.prepared
+    if CUBE:
+        graph_cube(graph)
+    if ENGINE == "numpy":
+        graph_columns(graph)
+
+    records = []
+    for output, record in run_parallel(graph, queries, execute_query, WORKERS or None,
+                                       setup=lambda: after_fork(graph)):
+        print(output, end="")
+        if TIMINGS_LOG:
+            write_record(TIMINGS_LOG, record)
+        records.append(record)
+    return records
+
+
+def print_rows(variables, rows):
+    if len(rows) == 0:
+        print("Результатов не найдено")
+        return
+
+    # Выводим заголовки
+    print("\nРезультаты:")
+    print("-" * 80)
+
+    # Определяем ширину колонок
+    col_widths = [0] * len(rows[0])
+    for row in rows:
+        for i, val in enumerate(row):
+            col_widths[i] = max(col_widths[i], len(str(val)))
+
+    # Выводим заголовки
+    for i, var in enumerate(variables):
+        print(f"{var:<{col_widths[i]}}", end="  ")
+    print()
+    print("-" * sum(col_widths) + "--" * len(col_widths))
+
+    # Выводим данные
+    for row in rows:
+        for i, val in enumerate(row):
+            print(f"{val:<{col_widths[i]}}", end="  ")
+        print()
+
+    print(f"\nНайдено записей: {len(rows)}")
+
+
+def registry_queries(names):
+    """
+    (название, запрос) для CQ из реестра; с DERIVED — их *_derived версии
+    (те же строки), с EXACT — другие запросы *_exact
+    """
+    if DERIVED:
+        names = [DERIVED_VERSIONS.get(name, name) for name in names]
+    if EXACT:
+        names = [EXACT_VERSIONS.get(name, name) for name in names]
+    return [(bound.title, bound) for bound in (get_cq(name).bind() for name in names)]
 
 
 # Проверка существующих данных
+def check_queries():
+    """(название, запрос) для проверки структуры данных"""
+    return registry_queries(CHECK_QUERIES)
+
+
 def check_data_structure(graph, fr):
     """Проверка структуры данных для отладки"""
     print("\n" + "=" * 60)
     print("ПРОВЕРКА СТРУКТУРЫ ДАННЫХ")
     print("=" * 60)
 
-    # Проверяем какие жанры существуют
-    check_genres = f"""
-        PREFIX fr: <{fr}>
-        SELECT DISTINCT ?genreLabel (COUNT(?movie) as ?movieCount)
-        WHERE {{
-          ?movie a fr:Movie ;
-                 fr:hasGenre ?genre .
-          ?genre fr:label ?genreLabel .
-        }}
-        GROUP BY ?genreLabel
-        ORDER BY DESC(?movieCount)
-        LIMIT 10
-    """
-    execute_query(graph, check_genres, "Популярные жанры")
-
-    # Проверяем данные за 2009 год
-    check_2009 = f"""
-        PREFIX fr: <{fr}>
-        SELECT (COUNT(?movie) as ?movieCount)
-        WHERE {{
-          ?movie a fr:Movie ;
-                 fr:releaseDate ?date .
-          FILTER(YEAR(?date) = 2009)
-        }}
-    """
-    execute_query(graph, check_2009, "Фильмы за 2009 год")
+    run_queries(graph, check_queries())
 
 
-# Исправленные SPARQL-запросы
-def sparql_queries(graph, fr):
-    # Добавляем префиксы к запросам
-    prefixes = f"""
-        PREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX fr:   <{fr}>
-        PREFIX xsd:  <http://www.w3.org/2001/XMLSchema#>
-    """
+# CQ из реестра (cq_registry) с параметрами по умолчанию
+def competency_queries():
+    """(название, запрос) для всех CQ по порядку"""
+    return registry_queries(COMPETENCY_QUERIES)
 
-    # 1. КАССОВЫЕ РЕЖИССЁРЫ
-    query_1 = prefixes + """
-        # 1. Кассовые режиссёры
-        SELECT ?director ?directorName ?genreLabel
-               (SUM(?revenue) AS ?totalRevenue)
-               (COUNT(DISTINCT ?movie) AS ?movieCount)
-        WHERE {
-          ?movie a fr:Movie ;
-                 fr:hasGenre ?genre ;
-                 fr:revenue ?revenue ;
-                 fr:releaseDate ?date ;
-                 fr:hasCrew ?role .
-
-          ?genre fr:label ?genreLabel .
-          FILTER(CONTAINS(LCASE(?genreLabel), "action"))  # ищем жанры с этими словами
-
-          BIND (YEAR(?date) AS ?year)
-          FILTER (?year = 2009)
-
-          ?role a fr:CrewRole ;
-                fr:crewJob ?job ;
-                fr:creditsPerson ?director .
-
-          FILTER(CONTAINS(LCASE(?job), "director"))  # ищем любые director должности
-
-          ?director fr:label ?directorName .
-        }
-        GROUP BY ?director ?directorName ?genreLabel
-        ORDER BY DESC(?totalRevenue)
-        LIMIT 10
-    """
-    execute_query(graph, query_1, "1. Кассовые режиссёры (2009 год, Action)")
-
-    # 1а. Альтернатива: любой жанр за 2009 год
-    query_1a = prefixes + """
-        # 1а. Кассовые режиссёры за 2009 год (любой жанр)
-        SELECT ?director ?directorName
-               (SUM(?revenue) AS ?totalRevenue)
-               (COUNT(DISTINCT ?movie) AS ?movieCount)
-        WHERE {
-          ?movie a fr:Movie ;
-                 fr:revenue ?revenue ;
-                 fr:releaseDate ?date ;
-                 fr:hasCrew ?role .
-
-          BIND (YEAR(?date) AS ?year)
-          FILTER (?year = 2009)
-
-          ?role a fr:CrewRole ;
-                fr:crewJob ?job ;
-                fr:creditsPerson ?director .
-
-          FILTER(CONTAINS(LCASE(?job), "director"))
-
-          ?director fr:label ?directorName .
-        }
-        GROUP BY ?director ?directorName
-        ORDER BY DESC(?totalRevenue)
-        LIMIT 10
-    """
-    execute_query(graph, query_1a, "1а. Кассовые режиссёры (2009 год, любой жанр)")
-
-    # 2. АКТЁРЫ В ВЫСОКООЦЕНЁННЫХ ФИЛЬМАХ
-    # Проблема: возможно, фильтры слишком строгие
-    query_2 = prefixes + """
-        # 2. Актёры в высокооценённых фильмах (более гибкие критерии)
-        SELECT ?actor ?actorName ?genreLabel
-               (COUNT(DISTINCT ?movie) AS ?highRatedMovieCount)
-               (AVG(?rating) AS ?avgRating)
-        WHERE {
-          ?movie a fr:Movie ;
-                 fr:hasGenre ?genre ;
-                 fr:voteAverage ?rating ;
-                 fr:releaseDate ?date ;
-                 fr:hasCast ?castRole .
-
-          ?genre fr:label ?genreLabel .
-          FILTER(CONTAINS(LCASE(?genreLabel), "drama"))
-
-          BIND (YEAR(?date) AS ?year)
-          FILTER (?year >= 2000 && ?year <= 2010)
-          FILTER (?rating >= 7.0)  # снизим порог
-
-          ?castRole a fr:CastRole ;
-                    fr:playedBy ?actor .
-
-          ?actor fr:label ?actorName .
-        }
-        GROUP BY ?actor ?actorName ?genreLabel
-        HAVING (COUNT(DISTINCT ?movie) >= 2)  # снизим до 2 фильмов
-        ORDER BY DESC(?highRatedMovieCount) DESC(?avgRating)
-        LIMIT 10
-    """
-    execute_query(graph, query_2, "2. Актёры в жанре Drama с высокими рейтингами (2000-2010)")
-
-    # 3. КАССОВЫЕ КОМПАНИИ
-    query_3 = prefixes + """
-        # 3. Самые кассовые кино-компании
-        SELECT ?company ?companyName
-               (SUM(?revenue) AS ?totalRevenue)
-               (COUNT(DISTINCT ?movie) AS ?movieCount)
-        WHERE {
-          ?movie a fr:Movie ;
-                 fr:producedBy ?company ;
-                 fr:revenue ?revenue ;
-                 fr:releaseDate ?date .
-
-          FILTER (?date >= "2005-01-01"^^xsd:date &&
-                  ?date <= "2010-12-31"^^xsd:date)
-
-          ?company fr:label ?companyName .
-        }
-        GROUP BY ?company ?companyName
-        ORDER BY DESC(?totalRevenue)
-        LIMIT 10
-    """
-    execute_query(graph, query_3, "3. Самые кассовые кино-компании (2005-2010)")
-
-    # 4. ЯЗЫКИ С ВЫСОКИМИ РЕЙТИНГАМИ
-    query_4 = prefixes + """
-        # 4. Языки озвучки с высокими рейтингами в Sci-Fi
-        SELECT ?lang ?langLabel
-               (AVG(?rating) AS ?avgRating)
-               (COUNT(DISTINCT ?movie) AS ?movieCount)
-        WHERE {
-          ?movie a fr:Movie ;
-                 fr:hasGenre ?genre ;
-                 fr:spokenLanguage ?lang ;
-                 fr:voteAverage ?rating .
-                 
-          ?genre fr:label ?genreLabel .
-          FILTER(CONTAINS(LCASE(?genreLabel), "science fiction"))
-          
-          # Пытаемся получить метку языка, если есть
-          OPTIONAL { ?lang fr:label ?langLabel . }
-          
-          # Если нет метки, используем сам URI
-          BIND(COALESCE(?langLabel, STR(?lang)) AS ?langLabel)
-        }
-        GROUP BY ?lang ?langLabel
-        HAVING (COUNT(DISTINCT ?movie) >= 3)
-        ORDER BY DESC(?avgRating)
-        LIMIT 10
-    """
-    execute_query(graph, query_4, "4. Языки с высокими рейтингами в Sci-Fi")
-
-    # 5. РЕЖИССЁРЫ С ОЦЕНКАМИ ВЫШЕ СРЕДНЕГО
-    query_5_optimized = prefixes + """
-        # 5. Режиссёры с оценками выше среднего по их жанрам (оптимизированный)
-        SELECT ?director ?directorName ?genreName
-               (AVG(?rating) AS ?directorAvgRating)
-               ?genreAvgRating
-               (COUNT(DISTINCT ?movie) AS ?directorMovieCount)
-        WHERE {
-          # Подзапрос: средний рейтинг по жанрам
-          {
-            SELECT ?genre (AVG(?r) AS ?genreAvgRating)
-            WHERE {
-              ?m a fr:Movie ;
-                 fr:hasGenre ?genre ;
-                 fr:voteAverage ?r .
-              FILTER(?r > 0)
-            }
-            GROUP BY ?genre
-            HAVING (COUNT(DISTINCT ?m) >= 10)
-          }
-
-          # Основной паттерн: фильмы × жанры × режиссёры
-          ?movie a fr:Movie ;
-                 fr:hasGenre ?genre ;
-                 fr:voteAverage ?rating ;
-                 fr:directedBy ?director .
-          FILTER(?rating > 0)
-
-          ?director fr:label ?directorName .
-          ?genre    fr:label ?genreName .
-        }
-        GROUP BY ?director ?directorName ?genre ?genreName ?genreAvgRating
-        HAVING (COUNT(DISTINCT ?movie) >= 2 &&
-                AVG(?rating) > ?genreAvgRating)
-        ORDER BY DESC(AVG(?rating) - ?genreAvgRating)
-        LIMIT 50
-    """
 
-    execute_query(graph, query_5_optimized, "5. Режиссёры с самыми высокими средними рейтингами")
-
-    # 6. СОТРУДНИКИ НА ВЫСОКОПРИБЫЛЬНЫХ ФИЛЬМАХ (оптимизированный)
-    query_6 = prefixes + """
-        # 6. Сотрудники на высокоприбыльных фильмах (через материализованный fr:profit)
-        SELECT ?person ?personName
-               (COUNT(DISTINCT ?movie) AS ?highProfitMovieCount)
-        WHERE {
-
-          # === (1) Один маленький подзапрос: средняя прибыль по фильмам ===
-          {
-            SELECT (AVG(?p) AS ?avgProfit)
-            WHERE {
-              ?m a fr:Movie ;
-                 fr:profit ?p .
-              FILTER(?p > 0)
-            }
-          }
-
-          # === (2) Фильмы с прибылью выше средней ===
-          ?movie a fr:Movie ;
-                 fr:profit ?profit ;
-                 fr:hasCrew ?crewRole .
-          FILTER(?profit > ?avgProfit)
-
-          # === (3) Участники съёмочной группы ===
-          ?crewRole fr:creditsPerson ?person .
-          ?person fr:label ?personName .
-        }
-        GROUP BY ?person ?personName
-        HAVING (COUNT(DISTINCT ?movie) >= 2)
-        ORDER BY DESC(?highProfitMovieCount)
-        LIMIT 10
-    """
-    execute_query(graph, query_6, "6. Сотрудники на высокоприбыльных фильмах")
-
-    # 7. ЖАНРЫ С ДЛИТЕЛЬНЫМИ ФИЛЬМАМИ
-    query_7 = prefixes + """
-        # 7. Жанры с самой большой продолжительностью фильмов
-        SELECT ?genre ?genreName
-               (AVG(?runtime) AS ?avgRuntime)
-               (COUNT(DISTINCT ?movie) AS ?movieCount)
-               (SUM(?revenue) AS ?totalRevenue)
-        WHERE {
-          ?movie a fr:Movie ;
-                 fr:hasGenre ?genre ;
-                 fr:runtime ?runtime ;
-                 fr:revenue ?revenue ;
-                 fr:releaseDate ?date .
-
-          BIND (YEAR(?date) AS ?year)
-          FILTER (?year = 2010)
-          FILTER (?revenue >= 50000000)  # снизим порог успешности
-          FILTER (?runtime > 0)  # исключаем нулевую продолжительность
-
-          ?genre fr:label ?genreName .
-        }
-        GROUP BY ?genre ?genreName
-        HAVING (COUNT(DISTINCT ?movie) >= 2)
-        ORDER BY DESC(?avgRuntime)
-        LIMIT 15
-    """
-    execute_query(graph, query_7, "7. Жанры с самой большой продолжительностью (2010)")
-
-    # 8. КЛЮЧЕВЫЕ СЛОВА ЛУЧШИХ ФИЛЬМОВ
-    query_8 = prefixes + """
-        # 8. Ключевые слова лучших фильмов
-        SELECT ?keyword ?keywordLabel
-               (COUNT(DISTINCT ?movie) AS ?movieCount)
-               (AVG(?rating) AS ?avgRating)
-        WHERE {
-          ?movie a fr:Movie ;
-                 fr:hasKeyword ?keyword ;
-                 fr:voteAverage ?rating ;
-                 fr:releaseDate ?date .
-
-          FILTER (?date >= "2000-01-01"^^xsd:date &&
-                  ?date <= "2010-12-31"^^xsd:date)
-          FILTER (?rating >= 7.0)  # снизим порог
-
-          OPTIONAL { ?keyword fr:label ?keywordLabel . }
-          FILTER(BOUND(?keywordLabel))  # только ключевые слова с меткой
-        }
-        GROUP BY ?keyword ?keywordLabel
-        HAVING (COUNT(DISTINCT ?movie) >= 3)  # снизим порог
-        ORDER BY DESC(?movieCount) DESC(?avgRating)
-        LIMIT 10
-    """
-    execute_query(graph, query_8, "8. Ключевые слова лучших фильмов (2000-2010)")
+def sparql_queries(graph, fr):
+    run_queries(graph, competency_queries())
 
 
 # Главный скрипт
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CQ на SPARQL по графу TMDB")
+    parser.add_argument("--store", metavar="PATH",
+                        help="запрашивать SQLite-хранилище от `python main.py --store PATH` "
+                             f"вместо {RDF_FILE}")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="не брать результаты из кэша и не сохранять их")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="SQLite-файл кэша результатов (по умолчанию <граф>.cache.sqlite "
+                             "рядом с графом)")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB",
+                        help="предел размера кэша результатов (LRU)")
+    parser.add_argument("--timings", metavar="PATH",
+                        help="дописывать время фаз каждого запроса в JSONL "
+                             "(например, query_timings.jsonl); по умолчанию не пишется")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="профилировать вычисление запросов cProfile, .prof-файлы в DIR")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="сколько процессов выполняют запросы (0 = все ядра); граф "
+                             "загружается один раз и достаётся воркерам через fork")
+    parser.add_argument("--no-planner", action="store_true",
+                        help="не переставлять паттерны по статистике графа (порядок rdflib)")
+    parser.add_argument("--no-ranges", action="store_true",
+                        help="не сужать диапазонные FILTER по отсортированным индексам <граф>.ranges.pkl")
+    parser.add_argument("--no-cube", action="store_true",
+                        help="не отвечать на CQ из предагрегированного куба, всегда SPARQL")
+    parser.add_argument("--engine", choices=["rdflib", "numpy"], default="rdflib",
+                        help="чем вычислять CQ из реестра: rdflib или колоночный движок на NumPy "
+                             "(сверка с rdflib — python columnar_engine.py)")
+    parser.add_argument("--no-mmap", action="store_true",
+                        help="не открывать memory-mapped индекс <граф>.idx, грузить граф в память")
+    parser.add_argument("--derived", action="store_true",
+                        help="выполнять версии CQ по производным фактам fr:releaseYear/fr:labelKey "
+                             "с теми же строками (граф из `python main.py --derived`)")
+    parser.add_argument("--exact", action="store_true",
+                        help="вместо CQ 1, 1а, 2 и 4 выполнять другие запросы *_exact: жанр — "
+                             "точный fr:labelKey, а не подстрока, режиссёр — fr:directedBy "
+                             "(фильм в SUM один раз); граф из `python main.py --derived`")
+    args = parser.parse_args()
+    DERIVED = args.derived
+    EXACT = args.exact
+    MMAP = not args.no_mmap
+    ENGINE = args.engine
+    WORKERS = args.workers
+    CUBE = not args.no_cube
+    PLANNER = not args.no_planner
+    RANGES = not args.no_ranges
+    TIMINGS_LOG = args.timings
+    PROFILE_DIR = args.profile
+    graph_file = args.store or RDF_FILE
+    if not args.no_cache:
+        RESULT_CACHE = ResultCache(args.cache or cache_path(graph_file),
+                                   max_bytes=args.cache_size * 2 ** 20)
 
     try:
         print("Загрузка RDF графа...")
-        graph = load_graph(RDF_FILE)
+        graph = load_graph(graph_file)
 
         # Настройка пространства имен
         fr = setup_namespace(graph)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Персистентное хранилище триплетов на SQLite — rdflib Store без внешних сервисов.
+
+Термы словарно закодированы (таблица terms), триплеты — тройки id
+с индексами SPO (первичный ключ), POS и OSP, так что любой шаблон
+(s?, p?, o?) отвечает индексный поиск. Билдер пишет в файл один раз,
+а sparql.py открывает его и выполняет запросы без загрузки графа в
+память; несколько процессов могут читать одну сборку одновременно (WAL).
+
+Каждый commit после изменений записывает в таблицу meta новую версию
+сборки (uuid): по ней sparql.py узнаёт, что содержимое поменялось, не
+хэшируя весь файл.
+
+    g = Graph(store=SQLiteStore())
+    g.open("tmdb_data.sqlite", create=True)
+"""
+import os
+import sqlite3
+import uuid
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.plugin import register
+from rdflib.store import NO_STORE, VALID_STORE, Store
+
+URI, LITERAL, BNODE = 0, 1, 2
+
+# сколько параметров отдаём в один IN (...)
+_IN_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id       INTEGER PRIMARY KEY,
+    key      TEXT NOT NULL UNIQUE,
+    kind     INTEGER NOT NULL,
+    value    TEXT NOT NULL,
+    datatype TEXT,
+    lang     TEXT
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _term_row(term):
+    """Терм -> (key, kind, value, datatype, lang); key уникален для терма."""
+    if isinstance(term, Literal):
+        datatype = str(term.datatype) if term.datatype is not None else None
+        lang = term.language
+        kind = LITERAL
+    elif isinstance(term, BNode):
+        datatype = lang = None
+        kind = BNODE
+    elif isinstance(term, URIRef):
+        datatype = lang = None
+        kind = URI
+    else:
+        raise TypeError(f"Unsupported RDF term: {term!r}")
+    value = str(term)
+    key = "\x1f".join((str(kind), value, datatype or "", lang or ""))
+    return key, kind, value, datatype, lang
+
+
+def _make_term(kind, value, datatype, lang):
+    if kind == URI:
+        return URIRef(value)
+    if kind == BNODE:
+        return BNode(value)
+    return Literal(value, datatype=URIRef(datatype) if datatype else None, lang=lang or None)
+
+
+class SQLiteStore(Store):
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None, read_only=False):
+        self._conn = None
+        self.read_only = read_only
+        # кэши id <-> терм: каждый терм декодируется не больше одного раза
+        self._ids = {}
+        self._terms = {}
+        # были ли изменения триплетов после последнего commit
+        self._dirty = False
+        super().__init__(configuration, identifier)
+
+    # === жизненный цикл ===
+
+    def open(self, configuration, create=False):
+        path = configuration
+        exists = os.path.exists(path)
+        if not exists and not create:
+            return NO_STORE
+        if self.read_only:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        if self._conn is not None:
+            if commit_pending_transaction or not self.read_only:
+                self.commit()
+            self._conn.close()
+            self._conn = None
+
+    def destroy(self, configuration):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(configuration + suffix):
+                os.remove(configuration + suffix)
+
+    def commit(self):
+        if self._dirty:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                               (uuid.uuid4().hex,))
+            self._dirty = False
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+        self._dirty = False
+
+    def build_version(self):
+        """
+        Версия содержимого, которую пишет commit; None у хранилища без
+        неё (собрано до появления таблицы meta).
+        """
+        try:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    # === словарь термов ===
+
+    def _lookup_ids(self, terms):
+        """Заполняет кэш id для уже известных базе термов."""
+        missing = {}
+        for term in terms:
+            if term not in self._ids:
+                missing[_term_row(term)[0]] = term
+        keys = list(missing)
+        for i in range(0, len(keys), _IN_CHUNK):
+            chunk = keys[i:i + _IN_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for term_id, key in self._conn.execute(
+                    f"SELECT id, key FROM terms WHERE key IN ({marks})", chunk):
+                term = missing[key]
+                self._ids[term] = term_id
+                self._terms[term_id] = term
+
+    def _ensure_ids(self, terms):
+        """id для термов; новые термы записываются в словарь."""
+        self._lookup_ids(terms)
+        new = {t for t in terms if t not in self._ids}
+        if new:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO terms (key, kind, value, datatype, lang) VALUES (?, ?, ?, ?, ?)",
+                (_term_row(t) for t in new),
+            )
+            self._lookup_ids(new)
+
+    def _decode(self, ids):
+        """Подтягивает из базы термы для id, которых ещё нет в кэше."""
+        missing = [i for i in set(ids) if i not in self._terms]
+        for i in range(0, len(missing), _IN_CHUNK):
+            chunk = missing[i:i + _IN_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for term_id, kind, value, datatype, lang in self._conn.execute(
+                    f"SELECT id, kind, value, datatype, lang FROM terms WHERE id IN ({marks})", chunk):
+                term = _make_term(kind, value, datatype, lang)
+                self._terms[term_id] = term
+                self._ids[term] = term_id
+
+    def clear_cache(self):
+        """Сбрасывает кэш id <-> терм, чтобы при долгой записи он не рос без предела."""
+        self._ids.clear()
+        self._terms.clear()
+
+    # === триплеты ===
+
+    def add(self, triple, context=None, quoted=False):
+        self.addN([(*triple, context)])
+
+    def addN(self, quads):
+        rows = [(s, p, o) for s, p, o, _ in quads]
+        if not rows:
+            return
+        self._ensure_ids({t for row in rows for t in row})
+        self._dirty = True
+        ids = self._ids
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)",
+            ((ids[s], ids[p], ids[o]) for s, p, o in rows),
+        )
+
+    def _where(self, triple_pattern):
+        """WHERE по шаблону; None, если связанного терма нет в базе."""
+        bound = [t for t in triple_pattern if t is not None]
+        self._lookup_ids(bound)
+        clauses, params = [], []
+        for column, term in zip("spo", triple_pattern):
+            if term is None:
+                continue
+            term_id = self._ids.get(term)
+            if term_id is None:
+                return None
+            clauses.append(f"{column} = ?")
+            params.append(term_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def remove(self, triple_pattern, context=None):
+        where = self._where(triple_pattern)
+        if where is not None:
+            self._conn.execute("DELETE FROM triples" + where[0], where[1])
+            self._dirty = True
+
+    def triples(self, triple_pattern, context=None):
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        cursor = self._conn.execute("SELECT s, p, o FROM triples" + where[0], where[1])
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            self._decode([i for row in rows for i in row])
+            terms = self._terms
+            for s, p, o in rows:
+                yield (terms[s], terms[p], terms[o]), iter(())
+
+    def __len__(self, context=None):
+        return self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # === префиксы ===
+
+    def bind(self, prefix, namespace, override=True):
+        if self.read_only:
+            return
+        if not override:
+            row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+            if row is not None:
+                return
+        self._conn.execute("DELETE FROM namespaces WHERE uri = ?", (str(namespace),))
+        self._conn.execute("INSERT OR REPLACE INTO namespaces (prefix, uri) VALUES (?, ?)",
+                           (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+        row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        row = self._conn.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        for prefix, uri in self._conn.execute("SELECT prefix, uri FROM namespaces").fetchall():
+            yield prefix, URIRef(uri)
+
+
+register("TMDBSQLite", Store, "sqlite_store", "SQLiteStore")
+
+
+def open_store_graph(path, create=False, read_only=False):
+    """rdflib.Graph поверх SQLite-файла (для запросов — read_only=True)."""
+    g = Graph(store=SQLiteStore(read_only=read_only))
+    if g.open(path, create=create) != VALID_STORE:
+        raise FileNotFoundError(path)
+    return g
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Синтетические данные в формате TMDB для проверки масштабирования.
+
+По настоящим tmdb_5000_movies.csv / tmdb_5000_credits.csv генератор
+пишет в --out-dir те же два файла (та же раскладка колонок, те же
+JSON-строки во вложенных колонках, тот же порядок ключей), но в
+--factor раз больше фильмов. Распределения берутся из исходных файлов:
+
+- каждый синтетический фильм копирует «шаблонный» настоящий фильм:
+  числовые поля (с небольшим шумом), год выхода, число жанров,
+  ключевых слов, компаний, актёров и членов съёмочной группы —
+  так сохраняются и распределения, и связи между полями;
+- жанры, страны, языки и пары (job, department) выбираются по частотам
+  в исходных данных;
+- люди, ключевые слова и компании переиспользуются по схеме
+  preferential attachment (Yule–Simon): с вероятностью p_new появляется
+  новый, иначе берётся уже встречавшийся пропорционально числу его
+  упоминаний. p_new = (уникальных) / (упоминаний) в исходных данных,
+  поэтому хвост популярности — степенной, как у настоящих людей.
+
+    python synthetic_data.py --factor 10 --out-dir synthetic_x10
+    cd synthetic_x10 && python ../main.py && python ../sparql.py
+
+Рядом кладётся копия tmdb_schema.ttl, чтобы билдеры запускались прямо
+из --out-dir.
+"""
+import argparse
+import json
+import os
+import shutil
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from tmdb_parsing import (CREDIT_COLUMNS, MOVIE_COLUMNS, NESTED_COLUMNS, parse_json_column,
+                          parse_nested_columns)
+
+MOVIES_CSV = "tmdb_5000_movies.csv"
+CREDITS_CSV = "tmdb_5000_credits.csv"
+SCHEMA_TTL = "tmdb_schema.ttl"
+CHUNK = 1000   # фильмов на одну запись в CSV
+
+# логнормальный шум для денежных/счётных полей и абсолютный для рейтинга
+MONEY_COLUMNS = ["budget", "revenue"]
+NOISE_SIGMA = 0.1
+# колонки с небольшим фиксированным словарём: выбираем по частотам
+VOCAB_COLUMNS = {
+    "genres": ("genres", ["entity_id", "name"]),
+    "production_countries": ("countries", ["code", "name"]),
+    "spoken_languages": ("languages", ["code", "name"]),
+}
+# колонки с длинным хвостом: preferential attachment
+POOL_COLUMNS = {
+    "keywords": "keywords",
+    "production_companies": "companies",
+}
+
+
+# === Обучение на настоящих файлах ===
+
+def _key_order(cells):
+    """Порядок ключей объекта во вложенной колонке (как в исходном JSON)."""
+    for items in parse_json_column(cells):
+        if items and isinstance(items[0], dict):
+            return list(items[0])
+    return []
+
+
+def learn(movies_csv=MOVIES_CSV, credits_csv=CREDITS_CSV):
+    movies = pd.read_csv(movies_csv)
+    credits = pd.read_csv(credits_csv)
+    # шаблоны — фильмы, у которых есть credits (как после merge в билдерах)
+    movies = movies[movies["id"].isin(credits["movie_id"])].reset_index(drop=True)
+    credits = credits.set_index("movie_id").loc[movies["id"]].reset_index()
+
+    tables = parse_nested_columns(movies)
+    tables.update(parse_nested_columns(credits, id_column="movie_id"))
+
+    def counts(table):
+        return table.groupby("movie_id").size().reindex(movies["id"], fill_value=0).to_numpy()
+
+    def frequencies(table, columns):
+        freq = table.groupby(columns, dropna=False).size().sort_values(ascending=False)
+        return list(freq.index), (freq / freq.sum()).to_numpy()
+
+    def pool(table, key):
+        return {"p_new": table[key].nunique() / max(len(table), 1),
+                "names": table.drop_duplicates(key)["name"].dropna().tolist() or ["Unknown"]}
+
+    cast, crew = tables["cast"], tables["crew"]
+    people = pd.concat([cast[["person_id", "name", "gender"]], crew[["person_id", "name", "gender"]]])
+    people = people.drop_duplicates("person_id")
+
+    model = {
+        "movies": movies,
+        "records": movies.to_dict("records"),
+        "movie_columns": list(movies.columns),
+        "credit_columns": list(credits.columns),
+        "key_order": {column: _key_order(frame[column].tolist())
+                      for frame, columns in ((movies, MOVIE_COLUMNS), (credits, CREDIT_COLUMNS))
+                      for column in columns},
+        "counts": {column: counts(tables[table]) for column, table in
+                   {**{c: t for c, (t, _) in VOCAB_COLUMNS.items()}, **POOL_COLUMNS,
+                    "cast": "cast", "crew": "crew"}.items()},
+        "vocab": {column: frequencies(tables[table], fields)
+                  for column, (table, fields) in VOCAB_COLUMNS.items()},
+        "pools": {column: pool(tables[table], "entity_id") for column, table in POOL_COLUMNS.items()},
+        "cast_pool": {"p_new": cast["person_id"].nunique() / max(len(cast), 1)},
+        "crew_pool": {"p_new": crew["person_id"].nunique() / max(len(crew), 1)},
+        "person_names": people["name"].dropna().tolist() or ["Unknown"],
+        "genders": frequencies(people, ["gender"]),
+        "jobs": frequencies(crew, ["job", "department"]),
+        "characters": cast["character"].fillna("").tolist() or [""],
+    }
+    return model
+
+
+# === Генерация ===
+
+class EntityPool:
+    """
+    Preferential attachment: новая сущность с вероятностью p_new, иначе —
+    уже встречавшаяся, пропорционально числу её упоминаний.
+    """
+
+    def __init__(self, rng, p_new, make):
+        self.rng = rng
+        self.p_new = p_new
+        self.make = make
+        self.entities = []
+        self.mentions = array("l")
+
+    def draw(self):
+        if not self.mentions or self.rng.random() < self.p_new:
+            index = len(self.entities)
+            self.entities.append(self.make(index))
+        else:
+            index = self.mentions[int(self.rng.integers(len(self.mentions)))]
+        self.mentions.append(index)
+        return self.entities[index]
+
+    def draw_distinct(self, k):
+        seen, result = set(), []
+        # повтор внутри фильма не нужен: тянем заново (ограниченно)
+        for _ in range(k * 4):
+            if len(result) == k:
+                break
+            entity = self.draw()
+            if entity[0] not in seen:
+                seen.add(entity[0])
+                result.append(entity)
+        return result
+
+
+def _name(names, index):
+    """Имена берутся из настоящих; когда они кончаются — с номером поколения."""
+    base = names[index % len(names)]
+    generation = index // len(names)
+    return base if generation == 0 else f"{base} {generation + 1}"
+
+
+def _dumps(objects, keys):
+    return json.dumps([{key: obj[key] for key in keys} for obj in objects], ensure_ascii=False)
+
+
+class Generator:
+    def __init__(self, model, seed=0):
+        self.model = model
+        self.rng = rng = np.random.default_rng(seed)
+        self.pools = {
+            column: EntityPool(rng, spec["p_new"],
+                               lambda i, names=spec["names"]: (i + 1, _name(names, i)))
+            for column, spec in model["pools"].items()
+        }
+        genders, p = model["genders"]
+        names = model["person_names"]
+
+        def person(i):
+            return i + 1, _name(names, i), int(genders[rng.choice(len(genders), p=p)])
+
+        # у актёров и съёмочной группы своя статистика переиспользования,
+        # но люди общие: один id-пространство и одни имена
+        self.people = []
+        self.cast_pool = EntityPool(rng, model["cast_pool"]["p_new"], self._new_person(person))
+        self.crew_pool = EntityPool(rng, model["crew_pool"]["p_new"], self._new_person(person))
+
+    def _new_person(self, person):
+        def make(_):
+            entity = person(len(self.people))
+            self.people.append(entity)
+            return entity
+        return make
+
+    def _vocab(self, column, k):
+        values, p = self.model["vocab"][column]
+        k = min(k, len(values))
+        return [values[i] for i in self.rng.choice(len(values), size=k, replace=False, p=p)]
+
+    def movie(self, movie_id):
+        model, rng = self.model, self.rng
+        counts = model["counts"]
+        t = int(rng.integers(len(model["records"])))
+        row = dict(model["records"][t])
+        order = model["key_order"]
+
+        row["id"] = movie_id
+        for column in ("title", "original_title"):
+            if isinstance(row.get(column), str):
+                row[column] = f"{row[column]} {movie_id}"
+        for column in MONEY_COLUMNS:
+            if pd.notna(row.get(column)) and row[column]:
+                row[column] = int(row[column] * rng.lognormal(0, NOISE_SIGMA))
+        if pd.notna(row.get("popularity")):
+            row["popularity"] = round(row["popularity"] * rng.lognormal(0, NOISE_SIGMA), 6)
+        if pd.notna(row.get("vote_average")):
+            row["vote_average"] = round(float(np.clip(row["vote_average"] + rng.normal(0, 0.3), 0, 10)), 1)
+        if isinstance(row.get("release_date"), str) and row["release_date"][:4].isdigit():
+            month, day = rng.integers(1, 13), rng.integers(1, 29)
+            row["release_date"] = f"{row['release_date'][:4]}-{month:02d}-{day:02d}"
+
+        # === вложенные колонки фильма ===
+        for column, (_, fields) in VOCAB_COLUMNS.items():
+            # имена полей таблицы -> ключи JSON (entity_id -> id, code -> iso_...)
+            json_keys = {field: (key, kind) for key, field, kind in NESTED_COLUMNS[column][1]}
+            items = [{json_keys[f][0]: int(v) if json_keys[f][1] == "int" else v
+                      for f, v in zip(fields, value)}
+                     for value in self._vocab(column, counts[column][t])]
+            row[column] = _dumps(items, order[column])
+        for column in POOL_COLUMNS:
+            items = [{"id": eid, "name": name}
+                     for eid, name in self.pools[column].draw_distinct(counts[column][t])]
+            row[column] = _dumps(items, order[column])
+
+        # === credits ===
+        cast = []
+        for i, (pid, name, gender) in enumerate(self.cast_pool.draw_distinct(counts["cast"][t])):
+            character = model["characters"][int(rng.integers(len(model["characters"])))]
+            cast.append({"cast_id": i, "character": character, "credit_id": self._credit_id(),
+                         "gender": gender, "id": pid, "name": name, "order": i})
+        jobs, p = model["jobs"]
+        crew = []
+        for _ in range(counts["crew"][t]):
+            pid, name, gender = self.crew_pool.draw()
+            job, department = jobs[rng.choice(len(jobs), p=p)]
+            crew.append({"credit_id": self._credit_id(), "department": department,
+                         "gender": gender, "id": pid, "job": job, "name": name})
+        credit = {"movie_id": movie_id, "title": row.get("title"),
+                  "cast": _dumps(cast, order["cast"]), "crew": _dumps(crew, order["crew"])}
+        return row, credit
+
+    def _credit_id(self):
+        # credit_id в TMDB — 24 hex-символа
+        return self.rng.bytes(12).hex()
+
+
+def generate(model, factor, out_dir, seed=0, chunk=CHUNK):
+    os.makedirs(out_dir, exist_ok=True)
+    n = int(round(len(model["movies"]) * factor))
+    gen = Generator(model, seed)
+    movies_path = os.path.join(out_dir, MOVIES_CSV)
+    credits_path = os.path.join(out_dir, CREDITS_CSV)
+
+    for start in range(0, n, chunk):
+        pairs = [gen.movie(movie_id) for movie_id in range(start + 1, min(start + chunk, n) + 1)]
+        movies = pd.DataFrame([m for m, _ in pairs], columns=model["movie_columns"])
+        credits = pd.DataFrame([c for _, c in pairs], columns=model["credit_columns"])
+        first = start == 0
+        movies.to_csv(movies_path, mode="w" if first else "a", header=first, index=False)
+        credits.to_csv(credits_path, mode="w" if first else "a", header=first, index=False)
+        print(f"\r{min(start + chunk, n):,} / {n:,} фильмов", end="", flush=True)
+    print()
+    return n, len(gen.people)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетические TMDB CSV в заданном масштабе")
+    parser.add_argument("--factor", type=float, default=10, help="во сколько раз больше фильмов")
+    parser.add_argument("--out-dir", default=None, help="куда писать (по умолчанию synthetic_x<factor>)")
+    parser.add_argument("--movies", default=MOVIES_CSV)
+    parser.add_argument("--credits", default=CREDITS_CSV)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    out_dir = args.out_dir or f"synthetic_x{args.factor:g}"
+
+    model = learn(args.movies, args.credits)
+    n, people = generate(model, args.factor, out_dir, seed=args.seed)
+    if os.path.exists(SCHEMA_TTL):
+        shutil.copy(SCHEMA_TTL, out_dir)
+    print(f"{out_dir}: {n:,} фильмов, {people:,} людей")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Колоночный кэш разобранных вложенных таблиц (cast, crew, genres, ...).
+
+Таблицы из tmdb_parsing пишутся в Arrow IPC / Feather v2 без сжатия:
+числа — типизированными колонками с пропусками, строки — словарно
+закодированными (имя человека, job, department хранятся один раз).
+Повторные запуски читают файлы через memory map, не трогая CSV и
+JSON-парсер. Рядом лежит manifest.json с sha256 исходных CSV:
+если CSV поменялись, кэш пересобирается.
+
+    tables = load_nested_tables()            # {"cast": df, "crew": df, ...}
+
+Нужен pyarrow; без него таблицы просто разбираются из CSV каждый раз.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from graph_snapshot import file_sha256
+from tmdb_parsing import CREDIT_COLUMNS, MOVIE_COLUMNS, NESTED_COLUMNS, parse_nested_columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+MOVIES_CSV = "tmdb_5000_movies.csv"
+CREDITS_CSV = "tmdb_5000_credits.csv"
+TABLES_DIR = "tmdb_tables"
+MANIFEST = "manifest.json"
+
+# меняется вместе с форматом файлов или логикой разбора
+VERSION = 1
+
+
+def table_path(name, tables_dir=TABLES_DIR):
+    return os.path.join(tables_dir, f"{name}.feather")
+
+
+def _sources(movies_csv, credits_csv):
+    return {"movies": file_sha256(movies_csv), "credits": file_sha256(credits_csv)}
+
+
+def _spec():
+    # разбор описан в NESTED_COLUMNS: поменялась схема таблиц — кэш устарел
+    return repr(sorted(NESTED_COLUMNS.items()))
+
+
+def is_fresh(tables_dir, movies_csv, credits_csv):
+    """Кэш есть, все таблицы на месте и сделаны из этих же CSV."""
+    path = os.path.join(tables_dir, MANIFEST)
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != VERSION or manifest.get("spec") != _spec():
+        return False
+    if not all(os.path.exists(table_path(name, tables_dir)) for name in manifest["tables"]):
+        return False
+    return manifest.get("sources") == _sources(movies_csv, credits_csv)
+
+
+# === Разбор из CSV ===
+
+def parse_tables(movies_csv=MOVIES_CSV, credits_csv=CREDITS_CSV):
+    """
+    Все вложенные таблицы из двух CSV — те же, что parse_nested_columns
+    даёт на merged-таблице билдеров (фильмы из обоих файлов, порядок
+    фильмов как в movies CSV), но без merge.
+    """
+    movies = pd.read_csv(movies_csv, usecols=["id"] + MOVIE_COLUMNS)
+    credits = pd.read_csv(credits_csv, usecols=["movie_id"] + CREDIT_COLUMNS)
+    movies = movies[movies["id"].isin(credits["movie_id"])]
+    credits = credits[credits["movie_id"].isin(movies["id"])]
+
+    tables = parse_nested_columns(movies, id_column="id")
+    # cast/crew — в порядке фильмов из movies CSV, как после merge
+    position = pd.Series(np.arange(len(movies)), index=movies["id"].to_numpy())
+    credits = credits.iloc[np.argsort(position[credits["movie_id"]].to_numpy(), kind="stable")]
+    tables.update(parse_nested_columns(credits, id_column="movie_id"))
+    return tables
+
+
+# === Arrow ===
+
+def write_tables(tables, tables_dir=TABLES_DIR, sources=None):
+    """Пишет таблицы в tables_dir: строки — dictionary, без сжатия (для mmap)."""
+    os.makedirs(tables_dir, exist_ok=True)
+    for name, df in tables.items():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for i, field in enumerate(table.schema):
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+        path = table_path(name, tables_dir)
+        feather.write_feather(table, f"{path}.tmp", compression="uncompressed")
+        os.replace(f"{path}.tmp", path)
+
+    with open(os.path.join(tables_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION, "spec": _spec(), "sources": sources,
+                   "tables": sorted(tables)}, f)
+
+
+def read_table(name, tables_dir=TABLES_DIR, categorical=False):
+    """
+    Одна таблица через memory map. Словарные колонки приходят как
+    pandas Categorical (categorical=True, удобно для value_counts/groupby)
+    или как object-колонки str/None — в том же виде, что из tmdb_parsing.
+    """
+    with pa.memory_map(table_path(name, tables_dir)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    df = table.to_pandas()
+    if not categorical:
+        for field in table.schema:
+            if pa.types.is_dictionary(field.type):
+                col = df[field.name].astype(object)
+                df[field.name] = col.where(col.notna(), None)
+    return df
+
+
+def load_nested_tables(movies_csv=MOVIES_CSV, credits_csv=CREDITS_CSV,
+                       tables_dir=TABLES_DIR, names=None, categorical=False):
+    """
+    Вложенные таблицы из кэша, а если он устарел — разбор CSV и запись кэша.
+    names — только эти таблицы (по умолчанию все).
+    """
+    if pa is None:
+        tables = parse_tables(movies_csv, credits_csv)
+    elif is_fresh(tables_dir, movies_csv, credits_csv):
+        wanted = names or [name for name, _ in NESTED_COLUMNS.values()]
+        return {name: read_table(name, tables_dir, categorical) for name in wanted}
+    else:
+        tables = parse_tables(movies_csv, credits_csv)
+        write_tables(tables, tables_dir, sources=_sources(movies_csv, credits_csv))
+        if categorical:
+            tables = {name: read_table(name, tables_dir, categorical) for name in tables}
+
+    if names is not None:
+        tables = {name: tables[name] for name in names}
+    return tables
@@ -0,0 +1,105 @@
+"""
+Общие фикстуры: небольшой детерминированный корпус в раскладке TMDB
+(movies, смёрдженные с credits, вложенные колонки — JSON-строки), он же
+двумя CSV, как у TMDB, и графы из него, собранные main.build_graph:
+обычный и с производными фактами (`main.py --derived`).
+"""
+import json
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+GENRES = [(28, "Action"), (18, "Drama"), (878, "Science Fiction"), (35, "Comedy"),
+          (53, "Thriller"), (10749, "Romance")]
+LANGUAGES = [("en", "English"), ("fr", "Français"), ("es", "Español"), ("xx", "")]
+COUNTRIES = [("US", "United States of America"), ("GB", "United Kingdom"), ("FR", "France")]
+JOBS = [("Director", "Directing"), ("Co-Director", "Directing"),
+        ("Director of Photography", "Camera"), ("Producer", "Production"),
+        ("Screenplay", "Writing"), ("Editor", "Editing"), ("", "Crew")]
+KEYWORDS = ["love", "new york", "space", "robot", "revenge", "friendship", "war", "lovers"]
+
+
+def make_movies(n=60, seed=0):
+    """Фильмы + credits одной таблицей, как main.load_movies."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        movie_id = 100 + i
+        budget = rng.choice([0, 1_000_000, 20_000_000, 60_000_000, 150_000_000])
+        revenue = rng.choice([0, 5_000_000, 50_000_000, 80_000_000, 300_000_000, 900_000_000])
+        genres = rng.sample(GENRES, rng.randint(1, 3))
+        keywords = rng.sample(list(enumerate(KEYWORDS)), rng.randint(0, 3))
+        cast = [{"cast_id": k, "character": rng.choice(["Hero", "Villain", "Love Interest", ""]),
+                 "credit_id": f"c{movie_id}_{k}", "gender": rng.randint(0, 2),
+                 "id": rng.randint(1, 40), "name": "", "order": k}
+                for k in range(rng.randint(1, 5))]
+        crew = []
+        for k in range(rng.randint(1, 5)):
+            job, department = rng.choice(JOBS)
+            crew.append({"credit_id": f"r{movie_id}_{k}", "department": department,
+                         "gender": 0, "id": rng.randint(30, 60), "job": job, "name": ""})
+        for person in cast + crew:
+            person["name"] = f"Person {person['id']}"
+        date = "" if i % 17 == 5 else f"{rng.randint(1998, 2012)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        rows.append({
+            "id": movie_id,
+            "movie_title": f"Movie {movie_id}" + (" Love Story" if i % 7 == 0 else ""),
+            "original_title": f"Movie {movie_id}",
+            "budget": budget,
+            "revenue": revenue,
+            "runtime": rng.choice([None, 0.0, 88.0, 104.0, 131.0, 162.0]),
+            "popularity": round(rng.uniform(0, 150), 6),
+            "vote_average": rng.choice([0.0, 5.5, 6.1, 7.0, 7.2, 8.4]),
+            "vote_count": rng.randint(0, 5000),
+            "release_date": date or None,
+            "genres": json.dumps([{"id": g, "name": name} for g, name in genres]),
+            "keywords": json.dumps([{"id": k, "name": name} for k, name in keywords]),
+            "production_companies": json.dumps(
+                [{"name": f"Company {c}", "id": c} for c in rng.sample(range(1, 8), rng.randint(0, 2))]),
+            "production_countries": json.dumps(
+                [{"iso_3166_1": c, "name": name} for c, name in rng.sample(COUNTRIES, 1)]),
+            "spoken_languages": json.dumps(
+                [{"iso_639_1": c, "name": name} for c, name in rng.sample(LANGUAGES, rng.randint(1, 2))]),
+            "movie_id": movie_id,
+            "cast": json.dumps(cast),
+            "crew": json.dumps(crew),
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(scope="session")
+def movies():
+    return make_movies()
+
+
+@pytest.fixture(scope="session")
+def graph(movies):
+    import main
+
+    return main.build_graph(movies)
+
+
+@pytest.fixture(scope="session")
+def derived_graph(movies):
+    import main
+
+    return main.build_graph(movies, derived=True)
+
+
+@pytest.fixture(scope="session")
+def tmdb_csv(movies, tmp_path_factory):
+    """(movies CSV, credits CSV) — корпус в раскладке tmdb_5000_*.csv."""
+    root = tmp_path_factory.mktemp("tmdb")
+    movies_csv, credits_csv = str(root / "movies.csv"), str(root / "credits.csv")
+    movies.drop(columns=["movie_id", "cast", "crew"]).rename(
+        columns={"movie_title": "title"}).to_csv(movies_csv, index=False)
+    movies[["movie_id", "movie_title", "cast", "crew"]].rename(
+        columns={"movie_title": "title"}).to_csv(credits_csv, index=False)
+    return movies_csv, credits_csv
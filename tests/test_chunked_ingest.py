@@ -0,0 +1,35 @@
+import pytest
+from rdflib import Graph
+
+import main
+from chunked_ingest import build_chunked, iter_movie_batches
+from incremental_build import movie_hashes
+
+
+@pytest.fixture(scope="module")
+def expected(tmdb_csv):
+    """Граф и хэши фильмов из CSV, прочитанных целиком (main.load_movies)."""
+    df = main.load_movies(*tmdb_csv)
+    return main.build_graph(df), movie_hashes(df)
+
+
+def test_batches_cover_all_movies(tmdb_csv):
+    batches = list(iter_movie_batches(*tmdb_csv, batch_size=7))
+    assert [len(b) for b in batches[:-1]] == [7] * (len(batches) - 1)
+    ids = [mid for b in batches for mid in b["id"]]
+    assert ids == list(main.load_movies(*tmdb_csv)["id"])
+
+
+@pytest.mark.parametrize("batch_size, max_rss", [
+    (7, None),
+    # RSS всегда выше лимита: пачки сжимаются до одного фильма, и в пачке
+    # бывают колонки, пустые целиком (pandas читает их как float64)
+    (16, 1),
+])
+def test_chunked_graph_equals_in_memory(tmdb_csv, expected, batch_size, max_rss):
+    graph, hashes = expected
+    g = Graph()
+    _, chunked_hashes, _ = build_chunked(g, *tmdb_csv, batch_size=batch_size, max_rss=max_rss)
+    assert len(g) == len(graph)
+    assert set(g) == set(graph)
+    assert chunked_hashes == hashes
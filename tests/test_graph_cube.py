@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import pytest
+from rdflib import Literal
+from rdflib.plugins.sparql import CUSTOM_EVALS
+
+from columnar_engine import compare, order_key
+from cq_registry import get_cq
+from graph_cube import MovieCube
+
+
+@pytest.fixture(scope="module")
+def cube(graph):
+    return MovieCube.build(graph)
+
+
+def normalize(rows):
+    """
+    Числа — до 9 знаков: граф из build_graph держит float, и rdflib
+    копит AVG через Decimal(float), а куб — по лексической форме.
+    """
+    return [tuple(Literal(round(float(term.toPython()), 9))
+                  if isinstance(term, Literal) and isinstance(term.toPython(), (int, Decimal, float))
+                  else term
+                  for term in row)
+            for row in rows]
+
+
+def rdflib_rows(graph, bound):
+    """Строки CQ от чистого rdflib, без хуков из CUSTOM_EVALS."""
+    saved = dict(CUSTOM_EVALS)
+    CUSTOM_EVALS.clear()
+    try:
+        return list(graph.query(bound.prepared, initBindings=bound.bindings))
+    finally:
+        CUSTOM_EVALS.update(saved)
+
+
+@pytest.mark.parametrize("name, params", [
+    ("top_companies", {}),
+    ("top_companies", {"year_from": 1990, "year_to": 2020}),
+    ("languages_by_rating", {}),
+    ("languages_by_rating", {"genre": "Drama"}),
+    ("directors_above_genre_avg", {}),
+    ("long_genres", {"year": 2004}),
+    ("long_genres", {"year": 2012}),
+])
+def test_cube_matches_rdflib(graph, cube, name, params):
+    bound = get_cq(name).bind(**params)
+    expected = rdflib_rows(graph, bound)
+    answered = cube.answer(name, bound.values)
+    assert expected, "пустой результат ничего не проверяет"
+    assert answered is not None
+    variables, rows = answered
+    problem = compare(normalize(expected), normalize(rows), order_key(name, bound.text, variables))
+    assert problem is None, problem
+
+
+@pytest.mark.parametrize("name, params", [
+    # порог не совпадает с корзиной куба
+    ("long_genres", {"year": 2012, "min_revenue": 0}),
+    # подстрока совпала с несколькими жанрами: Action, Comedy, Romance, ...
+    ("languages_by_rating", {"genre": "c"}),
+    # CQ не агрегатный
+    ("movies_in_year", {}),
+])
+def test_cube_declines(cube, name, params):
+    bound = get_cq(name).bind(**params)
+    assert cube.answer(name, bound.values) is None
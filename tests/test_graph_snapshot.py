@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from graph_snapshot import is_fresh, load_snapshot, read_header, write_snapshot
+
+
+@pytest.fixture
+def saved(graph, tmp_path):
+    """TTL графа и снимок, записанный из него."""
+    ttl = str(tmp_path / "graph.ttl")
+    snap = str(tmp_path / "graph.snap")
+    graph.serialize(ttl, format="turtle")
+    write_snapshot(graph, snap, source=ttl)
+    return ttl, snap
+
+
+def test_round_trip_keeps_triples(graph, saved):
+    _, snap = saved
+    loaded = load_snapshot(snap)
+    assert len(loaded) == len(graph)
+    assert set(loaded) == set(graph)
+    assert dict(loaded.namespaces())["fr"] == dict(graph.namespaces())["fr"]
+
+
+def test_fresh_snapshot_is_accepted(saved):
+    ttl, snap = saved
+    assert is_fresh(snap, ttl)
+
+
+def test_snapshot_of_changed_source_is_rejected(saved):
+    ttl, snap = saved
+    with open(ttl, "a", encoding="utf-8") as f:
+        f.write("\n# изменено\n")
+    # снимок по-прежнему новее TTL: отвергнуть его должен хэш, а не mtime
+    stamp = os.path.getmtime(ttl)
+    os.utime(snap, (stamp + 10, stamp + 10))
+    assert read_header(snap)[0]["source_sha256"] is not None
+    assert not is_fresh(snap, ttl)
+
+
+def test_snapshot_older_than_source_is_rejected(saved):
+    ttl, snap = saved
+    stamp = os.path.getmtime(snap)
+    os.utime(ttl, (stamp + 10, stamp + 10))
+    assert not is_fresh(snap, ttl)
@@ -0,0 +1,48 @@
+import pandas as pd
+
+import main
+from incremental_build import incremental_update, save_state
+
+
+def rename(df, old, new):
+    """Переименовывает человека / ключевое слово во всех JSON-колонках."""
+    df = df.copy()
+    for column in ("cast", "crew", "keywords"):
+        df[column] = df[column].str.replace(f'"{old}"', f'"{new}"', regex=False)
+    return df
+
+
+def build(df):
+    g = main.build_graph(df)
+    return set(g)
+
+
+def incremental(old_df, new_df, tmp_path):
+    g = main.build_graph(old_df)
+    output = str(tmp_path / "graph.ttl")
+    save_state(output, old_df)
+    stats = incremental_update(g, new_df, output)
+    assert stats is not None
+    return set(g), stats
+
+
+def test_rename_person_matches_full_rebuild(movies, tmp_path):
+    renamed = rename(movies, "Person 5", "Renamed Person")
+    assert not renamed.equals(movies)
+    updated, stats = incremental(movies, renamed, tmp_path)
+    assert stats["changed"] > 0
+    assert updated == build(renamed)
+
+
+def test_rename_keyword_matches_full_rebuild(movies, tmp_path):
+    renamed = rename(movies, "love", "romance")
+    updated, _ = incremental(movies, renamed, tmp_path)
+    assert updated == build(renamed)
+
+
+def test_added_and_removed_movies_match_full_rebuild(movies, tmp_path):
+    changed = pd.concat([movies.iloc[5:], movies.iloc[:2].assign(id=[900, 901], movie_id=[900, 901])])
+    changed.loc[changed["id"] == 20, "revenue"] = 123
+    updated, stats = incremental(movies, changed.reset_index(drop=True), tmp_path)
+    assert stats["removed"] == 5 and stats["added"] == 2
+    assert updated == build(changed.reset_index(drop=True))
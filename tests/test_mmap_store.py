@@ -0,0 +1,45 @@
+import pytest
+from rdflib import Literal, URIRef
+from rdflib.namespace import RDF, XSD
+
+from graph_snapshot import snapshot_path, write_snapshot
+from mmap_store import build_index, is_fresh, open_index_graph
+
+FR = "http://example.org/film-rating#"
+MOVIE = URIRef(FR + "movie/100")
+
+
+@pytest.fixture(scope="module", params=["ttl", "snapshot"])
+def mapped(graph, tmp_path_factory, request):
+    """Граф поверх индекса, построенного из TTL или из свежего снимка рядом с ним."""
+    ttl = str(tmp_path_factory.mktemp(request.param) / "graph.ttl")
+    graph.serialize(ttl, format="turtle")
+    if request.param == "snapshot":
+        write_snapshot(graph, snapshot_path(ttl), source=ttl)
+    path = build_index(ttl)
+    assert is_fresh(path, ttl)
+    g = open_index_graph(path)
+    yield g
+    g.close()
+
+
+def test_all_triples(graph, mapped):
+    assert len(mapped) == len(graph)
+    assert set(mapped) == set(graph)
+
+
+@pytest.mark.parametrize("pattern", [
+    (MOVIE, None, None),
+    (None, URIRef(FR + "hasGenre"), None),
+    (None, None, URIRef(FR + "genre/18")),
+    (MOVIE, URIRef(FR + "hasCast"), None),
+    (None, RDF.type, URIRef(FR + "Movie")),
+    (MOVIE, None, URIRef(FR + "genre/878")),
+    (None, URIRef(FR + "label"), Literal("Drama", datatype=XSD.string)),
+    (MOVIE, RDF.type, URIRef(FR + "Movie")),
+    # терма нет в графе
+    (URIRef(FR + "movie/0"), None, None),
+    (None, URIRef(FR + "label"), Literal("Drama")),
+])
+def test_triples_by_pattern(graph, mapped, pattern):
+    assert set(mapped.triples(pattern)) == set(graph.triples(pattern))
@@ -0,0 +1,39 @@
+from collections import Counter
+
+import pytest
+from rdflib import Graph
+from rdflib.namespace import RDF
+
+from main import FR
+from parallel_build import SHARDS_PER_WORKER, build_parallel
+
+
+@pytest.mark.parametrize("derived", [False, True])
+def test_merged_shards_equal_single_process(movies, graph, derived_graph, tmp_path, derived):
+    expected = derived_graph if derived else graph
+    output = str(tmp_path / "graph.nt")
+    written = build_parallel(movies, output, workers=2, derived=derived)
+    merged = Graph()
+    merged.parse(output, format="nt")
+    assert set(merged) == set(expected)
+    # строки общих сущностей из разных шардов склеены в одну
+    assert written == len(expected)
+
+
+def test_shared_labels_written_once(movies, graph, tmp_path):
+    output = str(tmp_path / "graph.nt")
+    build_parallel(movies, output, workers=2)
+    n_shards = 2 * SHARDS_PER_WORKER
+
+    def shards(person):
+        """Шарды фильмов, в ролях которых есть person."""
+        movies = {m for role in graph.subjects(None, person) for m in graph.subjects(None, role)}
+        return {int(str(m).rsplit("/", 1)[1]) % n_shards for m in movies}
+
+    # человек, чьи фильмы попали в разные шарды: его label был в нескольких
+    assert any(len(shards(p)) > 1 for p in graph.subjects(RDF.type, FR.Person))
+    label = f"> <{FR.label}> "
+    with open(output, encoding="utf-8") as f:
+        subjects = Counter(line.split(" ", 1)[0] for line in f if label in line)
+    assert subjects
+    assert all(n == 1 for n in subjects.values())
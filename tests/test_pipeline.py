@@ -0,0 +1,52 @@
+import os
+import re
+import shutil
+
+import pandas as pd
+import pytest
+
+from pipeline import Pipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def workdir(tmdb_csv, tmp_path, monkeypatch):
+    """Каталог с CSV и схемой под именами, которые билдеры читают по умолчанию."""
+    movies_csv, credits_csv = tmdb_csv
+    shutil.copyfile(os.path.join(ROOT, "tmdb_schema.ttl"), tmp_path / "tmdb_schema.ttl")
+    shutil.copyfile(movies_csv, tmp_path / "tmdb_5000_movies.csv")
+    shutil.copyfile(credits_csv, tmp_path / "tmdb_5000_credits.csv")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def run(capsys, until="build", force=()):
+    """Результат и {стадия: "ran" | "cached"} по выводу Pipeline."""
+    result = Pipeline(cache_dir="cache", force=force).run(until)
+    out = capsys.readouterr().out
+    return result, dict(re.findall(r"^\[(\w+)\s*\] (ran|cached)", out, re.M))
+
+
+def test_second_run_hits_cache(workdir, capsys):
+    first, stages = run(capsys)
+    assert stages == {"load": "ran", "parse": "ran", "build": "ran"}
+    second, stages = run(capsys)
+    assert stages == {"load": "cached", "parse": "cached", "build": "cached"}
+    assert set(second) == set(first)
+
+
+def test_changed_csv_misses_cache(workdir, capsys):
+    run(capsys)
+    movies = pd.read_csv("tmdb_5000_movies.csv")
+    movies.loc[0, "title"] = "Renamed"
+    movies.to_csv("tmdb_5000_movies.csv", index=False)
+    g, stages = run(capsys)
+    assert stages == {"load": "ran", "parse": "ran", "build": "ran"}
+    assert "Renamed" in {str(t) for t in g.objects()}
+
+
+def test_forced_stage_reruns_alone(workdir, capsys):
+    run(capsys)
+    _, stages = run(capsys, force=["build"])
+    assert stages == {"load": "cached", "parse": "cached", "build": "ran"}
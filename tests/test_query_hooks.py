@@ -0,0 +1,122 @@
+import re
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+from rdflib import Literal
+from rdflib.plugins.sparql import CUSTOM_EVALS
+
+import query_planner
+import range_index
+import text_index
+from cq_registry import PREFIXES, REGISTRY, get_cq
+
+
+@pytest.fixture
+def hooks(derived_graph):
+    """Граф с планировщиком, диапазонными индексами и text_match; после теста хуки как были."""
+    saved = dict(CUSTOM_EVALS)
+    magic = set(query_planner.MAGIC_PREDICATES)
+    query_planner.enable(derived_graph)
+    index = range_index.graph_range_index(derived_graph)
+    text_index.enable()
+    yield derived_graph, index
+    CUSTOM_EVALS.clear()
+    CUSTOM_EVALS.update(saved)
+    query_planner.MAGIC_PREDICATES.clear()
+    query_planner.MAGIC_PREDICATES.update(magic)
+    derived_graph.__dict__.pop("range_index", None)
+
+
+def normalize(row):
+    """
+    AVG/SUM по float копятся в Decimal в порядке обхода решений, а он с
+    хуками другой: значения расходятся в последних знаках.
+    """
+    return tuple(round(float(term.toPython()), 9)
+                 if isinstance(term, Literal) and isinstance(term.toPython(), (Decimal, float))
+                 else term
+                 for term in row)
+
+
+def results(graph, index, query, bindings=None):
+    """Строки (с кратностью) с хуками и с пустым CUSTOM_EVALS — чистый rdflib."""
+    # при равных ключах ORDER BY ... LIMIT отрезает строки как придётся
+    query = re.sub(r"\bLIMIT\s+\d+", "", query)
+    graph.range_index = index
+    hooked = Counter(map(normalize, graph.query(query, initBindings=bindings or {})))
+    saved = dict(CUSTOM_EVALS)
+    CUSTOM_EVALS.clear()
+    del graph.range_index
+    try:
+        plain = Counter(map(normalize, graph.query(query, initBindings=bindings or {})))
+    finally:
+        CUSTOM_EVALS.update(saved)
+    return hooked, plain
+
+
+@pytest.mark.parametrize("name", sorted(REGISTRY))
+def test_registry_cq(hooks, name):
+    graph, index = hooks
+    bound = get_cq(name).bind()
+    hooked, plain = results(graph, index, bound.text, bound.bindings)
+    assert hooked == plain
+
+
+@pytest.mark.parametrize("name, params", [
+    ("top_directors", {"genre": "Drama", "year": 2004}),
+    ("top_actors", {"genre": "action", "year_from": 1998, "year_to": 2012, "min_rating": "5.5"}),
+    ("top_companies", {"year_from": 1990, "year_to": 2020}),
+    ("long_genres", {"year": 2012, "min_revenue": 0}),
+    ("top_keywords", {"year_from": 1998, "year_to": 2012, "min_rating": "0"}),
+    ("top_directors_exact", {"genre": "Drama", "year": 2004}),
+])
+def test_registry_cq_with_parameters(hooks, name, params):
+    graph, index = hooks
+    bound = get_cq(name).bind(**params)
+    hooked, plain = results(graph, index, bound.text, bound.bindings)
+    assert plain, "пустой результат ничего не проверяет"
+    assert hooked == plain
+
+
+SHAPES = [
+    # FILTER
+    """SELECT ?m ?r WHERE { ?m a fr:Movie ; fr:voteAverage ?r . FILTER(?r >= 7.0) }""",
+    """SELECT ?m ?g WHERE { ?m fr:hasGenre ?g ; fr:revenue ?rev . ?g fr:label ?l .
+         FILTER(CONTAINS(LCASE(?l), "action") && ?rev > 0) }""",
+    """SELECT ?m ?d WHERE { ?m fr:releaseDate ?d ; fr:voteAverage ?r .
+         FILTER(?d >= "2005-01-01"^^xsd:date && ?d <= "2010-12-31"^^xsd:date || ?r > 8) }""",
+    """SELECT ?m ?p WHERE { ?m fr:hasCrew ?c . ?c fr:creditsPerson ?p ; fr:crewJob ?j .
+         FILTER(?j = "Director") FILTER(?m != ?p) }""",
+    # BIND
+    """SELECT ?m ?y WHERE { ?m fr:releaseDate ?d . BIND(YEAR(?d) AS ?y) FILTER(?y = 2009) }""",
+    """SELECT ?m ?ratio WHERE { ?m fr:revenue ?rev ; fr:budget ?b . FILTER(?b > 0)
+         BIND(?rev / ?b AS ?ratio) FILTER(?ratio > 2) }""",
+    """SELECT ?m ?k WHERE { BIND("drama"^^xsd:string AS ?k) ?g fr:labelKey ?k . ?m fr:hasGenre ?g }""",
+    # OPTIONAL
+    """SELECT ?m ?t ?d WHERE { ?m a fr:Movie ; fr:movieTitle ?t .
+         OPTIONAL { ?m fr:releaseDate ?d } }""",
+    """SELECT ?m ?d WHERE { ?m a fr:Movie .
+         OPTIONAL { ?m fr:releaseDate ?d . FILTER(?d > "2009-01-01"^^xsd:date) }
+         FILTER(!BOUND(?d)) }""",
+    """SELECT ?m ?p ?n WHERE { ?m fr:hasCast ?c . ?c fr:playedBy ?p .
+         OPTIONAL { ?c fr:characterName ?n . FILTER(STRLEN(?n) > 0) } }""",
+    # вместе и вложенные
+    """SELECT ?g (COUNT(DISTINCT ?m) AS ?n) (AVG(?r) AS ?avg) WHERE {
+         ?m fr:hasGenre ?g ; fr:voteAverage ?r . OPTIONAL { ?m fr:runtime ?rt }
+         BIND(COALESCE(?rt, 0) AS ?runtime) FILTER(?runtime >= 0 && ?r > 0) } GROUP BY ?g""",
+    """SELECT ?m WHERE { { ?m fr:revenue ?v . FILTER(?v > 100000000) } UNION
+         { ?m fr:budget ?v . FILTER(?v >= 150000000) } }""",
+    """SELECT ?m ?r WHERE { ?m fr:voteAverage ?r .
+         MINUS { ?m fr:hasGenre ?g . ?g fr:labelKey "drama"^^xsd:string } }""",
+    """SELECT ?m ?top WHERE { { SELECT (MAX(?r) AS ?top) WHERE { ?x fr:voteAverage ?r } }
+         ?m fr:voteAverage ?top }""",
+]
+
+
+@pytest.mark.parametrize("query", SHAPES)
+def test_query_shapes(hooks, query):
+    graph, index = hooks
+    hooked, plain = results(graph, index, PREFIXES + query)
+    assert plain, "пустой результат ничего не проверяет"
+    assert hooked == plain
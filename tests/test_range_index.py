@@ -0,0 +1,70 @@
+import pytest
+from rdflib import Literal
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql import CUSTOM_EVALS
+
+import query_planner
+import range_index
+
+PREFIX = "PREFIX fr: <http://example.org/film-rating#>\nPREFIX xsd: <http://www.w3.org/2001/XMLSchema#>\n"
+
+
+@pytest.fixture
+def planned(graph):
+    saved = dict(CUSTOM_EVALS)
+    query_planner.enable(graph)
+    index = range_index.graph_range_index(graph)
+    yield graph, index
+    CUSTOM_EVALS.clear()
+    CUSTOM_EVALS.update(saved)
+    graph.__dict__.pop("range_index", None)
+
+
+def results(graph, index, query, bindings=None):
+    """Множества строк с индексом и без него."""
+    graph.range_index = index
+    with_index = set(graph.query(PREFIX + query, initBindings=bindings or {}))
+    del graph.range_index
+    without = set(graph.query(PREFIX + query, initBindings=bindings or {}))
+    return with_index, without
+
+
+@pytest.mark.parametrize("query", [
+    # граница другого рода, чем значения свойства
+    "SELECT ?m ?d WHERE { ?m fr:releaseDate ?d . FILTER(?d < 2010) }",
+    "SELECT ?m ?d WHERE { ?m fr:releaseDate ?d . FILTER(?d >= 0) }",
+    'SELECT ?m ?r WHERE { ?m fr:revenue ?r . FILTER(?r >= "2010-01-01"^^xsd:date) }',
+    'SELECT ?m ?r WHERE { ?m fr:voteAverage ?r . FILTER(?r < "2005-06-01"^^xsd:date) }',
+    # тот же род
+    'SELECT ?m ?d WHERE { ?m fr:releaseDate ?d . FILTER(?d >= "2005-01-01"^^xsd:date '
+    '&& ?d <= "2010-12-31"^^xsd:date) }',
+    "SELECT ?m ?r WHERE { ?m fr:voteAverage ?r . FILTER(?r >= 7.0) }",
+    "SELECT ?m ?r WHERE { ?m fr:revenue ?r . FILTER(50000000 <= ?r && ?r < 300000000) }",
+    "SELECT ?m ?r WHERE { ?m fr:runtime ?r . FILTER(?r = 104) }",
+    "SELECT ?m ?r WHERE { ?m fr:runtime ?r . FILTER(?r > 104 && ?r > 88) }",
+])
+def test_range_scan_matches_full_scan(planned, query):
+    graph, index = planned
+    with_index, without = results(graph, index, query)
+    assert with_index == without
+
+
+@pytest.mark.parametrize("low, high", [
+    (Literal(2000), Literal("2010-01-01", datatype=XSD.date)),
+    (Literal("2001-01-01", datatype=XSD.date), Literal("2008-01-01", datatype=XSD.date)),
+    (Literal("abc"), Literal(7)),
+])
+def test_range_scan_with_bound_variables(planned, low, high):
+    graph, index = planned
+    query = "SELECT ?m ?d WHERE { ?m fr:releaseDate ?d . FILTER(?d > ?low && ?d <= ?high) }"
+    with_index, without = results(graph, index, query, {"low": low, "high": high})
+    assert with_index == without
+
+
+def test_cross_kind_bound_keeps_other_columns(graph):
+    index = range_index.RangeIndex.build(graph)
+    dates = index.predicates[range_index.FR.releaseDate]
+    total = dates.size
+    # граница-число не сужает столбец дат
+    assert index.count(range_index.FR.releaseDate, ("number", (2010, True), None)) == total
+    assert len(list(index.rows(range_index.FR.releaseDate, ("number", None, (2010, False))))) == total
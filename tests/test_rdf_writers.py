@@ -0,0 +1,37 @@
+import pytest
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import XSD
+
+from rdf_writers import NTriplesWriter, TurtleWriter, nt_term
+
+FR = "http://example.org/film-rating#"
+LABEL = URIRef(FR + "label")
+
+
+@pytest.mark.parametrize("iri", [
+    FR + "person_a b", FR + "x<y>", FR + 'q"uote', FR + "{braces}|pipe",
+    FR + "caret^back`tick\\", FR + "tab\tnewline\n",
+])
+def test_nt_term_escapes_unsafe_iri(iri):
+    text = nt_term(URIRef(iri))
+    inner = text[1:-1]
+    assert text.startswith("<") and text.endswith(">")
+    assert not any(c in inner for c in ' <>"{}|^`\t\n')
+    assert "\\" not in inner.replace("\\u", "")
+
+
+@pytest.mark.parametrize("writer, fmt", [(NTriplesWriter, "nt"), (TurtleWriter, "turtle")])
+def test_unsafe_iris_round_trip(tmp_path, writer, fmt):
+    triples = {
+        (URIRef(FR + "person_a b<c>"), LABEL, Literal("A B")),
+        (URIRef(FR + "ok"), LABEL, Literal("7", datatype=XSD.integer)),
+        (URIRef(FR + "ok"), URIRef(FR + "odd{p}"), Literal("x", datatype=URIRef(FR + "d t"))),
+    }
+    path = str(tmp_path / f"out.{fmt}")
+    kwargs = {"prefixes": {"fr": FR}} if writer is TurtleWriter else {}
+    with writer(path, **kwargs) as w:
+        for triple in triples:
+            w.add(triple)
+    g = Graph()
+    g.parse(path, format=fmt)
+    assert set(g) == triples
@@ -0,0 +1,53 @@
+import pandas as pd
+from rdflib import Literal
+from rdflib.namespace import RDF, XSD
+
+import build_tmdb_ontology_with_roles as roles
+from build_tmdb_ontology_with_roles import (DEFAULT_ROLE, FR, canonical_roles, classify_crew,
+                                            get_canonical_role)
+
+CREW = pd.DataFrame({
+    "job": ["Director", "Stunts", "Stunt Coordinator", "Key Grip", "Foley Artist", "Caterer",
+            "Sound Re-Recording Mixer", "Sound Re-Recording Mixer", "Editor", "Stunts", None, ""],
+    "department": ["Directing", "Crew", "Crew", "Camera", "Sound", "Crew",
+                   "Sound", "Editing", "Editing", "Crew", "Crew", "Crew"],
+})
+
+
+def test_pattern_rule_reclassifies_other_role(monkeypatch):
+    assert get_canonical_role("Stunts", "Crew") == "StuntPerformer"
+    assert get_canonical_role("Key Grip", "Camera") == "Grip"
+    # департамент в правиле ограничивает его
+    assert get_canonical_role("Sound Re-Recording Mixer", "Editing") == DEFAULT_ROLE
+    monkeypatch.setattr(roles, "_ROLE_RULES", [])
+    assert get_canonical_role("Stunts", "Crew") == DEFAULT_ROLE
+
+
+def test_pattern_roles_are_role_types():
+    names = set(canonical_roles())
+    assert {role for _, _, role in roles.ROLE_PATTERNS} <= names
+    assert DEFAULT_ROLE in names
+
+
+def test_classify_crew_matches_per_credit():
+    per_credit = [get_canonical_role(job, dept)
+                  for job, dept in zip(CREW["job"].tolist(), CREW["department"].tolist())]
+    assert classify_crew(CREW) == per_credit
+    assert "StuntPerformer" in per_credit and DEFAULT_ROLE in per_credit
+
+
+def test_graph_role_types_match_per_credit(movies):
+    df = movies.copy()
+    df["crew"] = (df["crew"].str.replace('"job": "Editor"', '"job": "Stunt Double"', regex=False)
+                  .str.replace('"job": "Producer"', '"job": "Key Grip"', regex=False))
+    g = roles.build_graph(df)
+    checked = 0
+    for role in g.subjects(RDF.type, FR.CrewRole):
+        job = g.value(role, FR.crewJob)
+        department = g.value(role, FR.crewDepartment)
+        expected = get_canonical_role(str(job), str(department))
+        assert g.value(role, FR.roleType) == FR[f"role/{expected}"]
+        checked += 1
+    assert checked
+    assert (FR["role/StuntPerformer"], FR.label, Literal("StuntPerformer", datatype=XSD.string)) in g
+    assert next(g.subjects(FR.roleType, FR["role/Grip"]), None) is not None
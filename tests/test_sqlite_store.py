@@ -0,0 +1,99 @@
+import sqlite3
+
+import pytest
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import RDF, XSD
+
+from sqlite_store import open_store_graph
+
+FR = "http://example.org/film-rating#"
+MOVIE = URIRef(FR + "movie/100")
+
+
+@pytest.fixture
+def store_path(graph, tmp_path):
+    """Хранилище с триплетами графа."""
+    path = str(tmp_path / "graph.sqlite")
+    g = open_store_graph(path, create=True)
+    g.addN((s, p, o, g) for s, p, o in graph)
+    g.commit()
+    g.close()
+    return path
+
+
+@pytest.fixture
+def stored(store_path):
+    g = open_store_graph(store_path, read_only=True)
+    yield g
+    g.close()
+
+
+def test_all_triples(graph, stored):
+    assert len(stored) == len(graph)
+    assert set(stored) == set(graph)
+
+
+@pytest.mark.parametrize("pattern", [
+    (MOVIE, None, None),
+    (None, URIRef(FR + "hasGenre"), None),
+    (None, None, URIRef(FR + "genre/878")),
+    (MOVIE, URIRef(FR + "hasCast"), None),
+    (None, RDF.type, URIRef(FR + "Movie")),
+    (MOVIE, None, URIRef(FR + "genre/878")),
+    (None, URIRef(FR + "label"), Literal("Drama", datatype=XSD.string)),
+    (MOVIE, RDF.type, URIRef(FR + "Movie")),
+    # терма нет в хранилище
+    (URIRef(FR + "movie/0"), None, None),
+    (None, URIRef(FR + "label"), Literal("Drama")),
+])
+def test_triples_by_pattern(graph, stored, pattern):
+    assert set(stored.triples(pattern)) == set(graph.triples(pattern))
+
+
+def test_add_and_remove(tmp_path):
+    g = open_store_graph(str(tmp_path / "g.sqlite"), create=True)
+    title = Literal("Movie 100", datatype=XSD.string)
+    triples = [(MOVIE, RDF.type, URIRef(FR + "Movie")),
+               (MOVIE, URIRef(FR + "movieTitle"), title),
+               (MOVIE, URIRef(FR + "note"), Literal("фильм", lang="ru")),
+               (BNode("b1"), URIRef(FR + "about"), MOVIE)]
+    for t in triples:
+        g.add(t)
+    g.add(triples[0])
+    assert len(g) == 4
+    assert set(g) == set(triples)
+
+    g.remove((MOVIE, URIRef(FR + "movieTitle"), None))
+    assert (MOVIE, URIRef(FR + "movieTitle"), title) not in g
+    g.remove((None, None, MOVIE))
+    assert len(g) == 2
+    g.remove((None, None, None))
+    assert len(g) == 0
+    g.close()
+
+
+def test_read_only(store_path):
+    g = open_store_graph(store_path, read_only=True)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            g.add((MOVIE, RDF.type, URIRef(FR + "Person")))
+    finally:
+        g.close()
+    with pytest.raises(FileNotFoundError):
+        open_store_graph(store_path + ".missing", read_only=True)
+
+
+def test_build_version_changes_on_commit(store_path):
+    g = open_store_graph(store_path)
+    before = g.store.build_version()
+    assert before
+    g.commit()
+    assert g.store.build_version() == before
+    g.remove((MOVIE, None, None))
+    g.commit()
+    after = g.store.build_version()
+    g.close()
+    assert after != before
+    reader = open_store_graph(store_path, read_only=True)
+    assert reader.store.build_version() == after
+    reader.close()
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+import main
+import table_cache
+from table_cache import is_fresh, load_nested_tables, read_table
+from tmdb_parsing import parse_nested_columns
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture(scope="module")
+def expected(tmdb_csv):
+    """Таблицы, которые билдеры разбирают из merged-таблицы без кэша."""
+    return parse_nested_columns(main.load_movies(*tmdb_csv))
+
+
+@pytest.fixture
+def cached(tmdb_csv, tmp_path):
+    """Каталог кэша, записанный первым вызовом load_nested_tables."""
+    tables_dir = str(tmp_path / "tables")
+    load_nested_tables(*tmdb_csv, tables_dir=tables_dir)
+    assert is_fresh(tables_dir, *tmdb_csv)
+    return tables_dir
+
+
+def test_feather_round_trip(tmdb_csv, expected, cached):
+    tables = load_nested_tables(*tmdb_csv, tables_dir=cached)
+    assert set(tables) == set(expected)
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(tables[name].reset_index(drop=True),
+                                      df.reset_index(drop=True), obj=name)
+
+
+def test_categorical_columns_keep_values(expected, cached):
+    crew = read_table("crew", cached, categorical=True)
+    assert isinstance(crew["job"].dtype, pd.CategoricalDtype)
+    assert crew["job"].astype(object).where(crew["job"].notna(), None).tolist() == \
+        expected["crew"]["job"].tolist()
+
+
+def test_changed_csv_is_stale(tmdb_csv, cached, tmp_path):
+    movies_csv, credits_csv = tmdb_csv
+    changed = str(tmp_path / "movies.csv")
+    movies = pd.read_csv(movies_csv)
+    movies.loc[0, "genres"] = "[]"
+    movies.to_csv(changed, index=False)
+    assert not is_fresh(cached, changed, credits_csv)
+
+
+def test_without_pyarrow_parses_csv(tmdb_csv, expected, tmp_path, monkeypatch):
+    monkeypatch.setattr(table_cache, "pa", None)
+    tables_dir = tmp_path / "tables"
+    tables = load_nested_tables(*tmdb_csv, tables_dir=str(tables_dir))
+    assert not tables_dir.exists()
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(tables[name].reset_index(drop=True),
+                                      df.reset_index(drop=True), obj=name)
@@ -0,0 +1,73 @@
+import pytest
+from rdflib import Literal
+from rdflib.plugins.sparql import CUSTOM_EVALS
+
+import query_planner
+import text_index
+from cq_registry import PREFIXES
+
+
+@pytest.fixture
+def matching(graph):
+    """Граф с хуком text_match; после теста хуки и индекс как были."""
+    saved = dict(CUSTOM_EVALS)
+    magic = set(query_planner.MAGIC_PREDICATES)
+    text_index.enable()
+    yield graph
+    CUSTOM_EVALS.clear()
+    CUSTOM_EVALS.update(saved)
+    query_planner.MAGIC_PREDICATES.clear()
+    query_planner.MAGIC_PREDICATES.update(magic)
+    graph.__dict__.pop("text_index", None)
+
+
+def results(graph, magic, contains):
+    """Строки запроса с магическим свойством и его аналога на FILTER в чистом rdflib."""
+    found = set(graph.query(PREFIXES + magic))
+    saved = dict(CUSTOM_EVALS)
+    CUSTOM_EVALS.clear()
+    try:
+        expected = set(graph.query(PREFIXES + contains))
+    finally:
+        CUSTOM_EVALS.update(saved)
+    return found, expected
+
+
+# в корпусе из conftest слова не начинаются внутри других слов,
+# поэтому поиск по словам и по подстроке дают одно и то же
+@pytest.mark.parametrize("magic, contains", [
+    ('SELECT ?g WHERE { ?g fr:labelMatch "drama" }',
+     'SELECT ?g WHERE { ?g fr:label ?l . FILTER(CONTAINS(LCASE(?l), "drama")) }'),
+    ('SELECT ?k WHERE { ?k fr:labelMatch "lov*" }',
+     'SELECT ?k WHERE { ?k fr:label ?l . FILTER(CONTAINS(LCASE(?l), "lov")) }'),
+    ('SELECT ?m WHERE { ?m fr:titleMatch "Love Story" }',
+     'SELECT ?m WHERE { ?m fr:movieTitle ?t . FILTER(CONTAINS(LCASE(?t), "love story")) }'),
+    ('SELECT ?c WHERE { ?c fr:characterMatch "HERO" }',
+     'SELECT ?c WHERE { ?c fr:characterName ?n . FILTER(CONTAINS(LCASE(?n), "hero")) }'),
+    ('SELECT ?r WHERE { ?r fr:jobMatch "director" }',
+     'SELECT ?r WHERE { ?r fr:crewJob ?j . FILTER(CONTAINS(LCASE(?j), "director")) }'),
+    ('SELECT DISTINCT ?x WHERE { ?x fr:textMatch "person 4*" }',
+     'SELECT DISTINCT ?x WHERE { ?x ?p ?l . '
+     'VALUES ?p { fr:label fr:movieTitle fr:characterName fr:crewJob } '
+     'FILTER(CONTAINS(LCASE(?l), "person 4")) }'),
+    # с остатком BGP
+    ('SELECT ?m ?g WHERE { ?m fr:hasGenre ?g . ?g fr:labelMatch "science" }',
+     'SELECT ?m ?g WHERE { ?m fr:hasGenre ?g . ?g fr:label ?l . '
+     'FILTER(CONTAINS(LCASE(?l), "science")) }'),
+    ('SELECT ?m ?p WHERE { ?m fr:hasCrew ?c . ?c fr:jobMatch "director" ; fr:creditsPerson ?p }',
+     'SELECT ?m ?p WHERE { ?m fr:hasCrew ?c . ?c fr:crewJob ?j ; fr:creditsPerson ?p . '
+     'FILTER(CONTAINS(LCASE(?j), "director")) }'),
+])
+def test_magic_matches_contains(matching, magic, contains):
+    found, expected = results(matching, magic, contains)
+    assert expected, "пустой результат ничего не проверяет"
+    assert found == expected
+
+
+def test_query_from_bindings(matching):
+    query = PREFIXES + "SELECT ?k WHERE { ?k fr:labelMatch ?q }"
+    found = set(matching.query(query, initBindings={"q": Literal("revenge")}))
+    _, expected = results(matching, "SELECT ?k WHERE { ?k fr:labelMatch 'revenge' }",
+                          'SELECT ?k WHERE { ?k fr:label ?l . FILTER(CONTAINS(LCASE(?l), "revenge")) }')
+    assert expected
+    assert found == expected
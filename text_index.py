@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Инвертированный индекс по словам текстовых свойств и магическое
+свойство SPARQL для поиска по нему.
+
+Поиск по метке сейчас — FILTER(CONTAINS(LCASE(?label), "...")): rdflib
+перебирает все метки жанров, ключевых слов и людей и для каждой
+вычисляет выражение. Здесь литералы fr:label, fr:movieTitle,
+fr:characterName и fr:crewJob один раз разбиваются на слова (в
+casefold), и для каждого слова хранится отсортированный список
+документов (документ — один триплет субъект-свойство-литерал):
+
+    vocabulary   — отсортированные уникальные слова;
+    offsets      — postings[offsets[i]:offsets[i + 1]] — документы слова i;
+    doc_subjects — субъект документа (id в subjects), doc_fields — его свойство.
+
+Слова словаря лежат по порядку, поэтому префикс «lov*» — это один
+непрерывный срез postings между двумя bisect. Несколько слов запроса
+должны встретиться в одном литерале (пересечение документов).
+
+В запросе индекс доступен как магическое свойство: хук CUSTOM_EVALS
+(раньше stats_reorder из query_planner) находит в BGP паттерны вида
+
+    ?keyword fr:labelMatch "lov*" .        # только fr:label
+    ?movie   fr:titleMatch "star wars" .   # fr:movieTitle
+    ?role    fr:characterMatch ?q .        # ?q из initBindings
+    ?x       fr:textMatch "nolan" .        # любое из четырёх свойств
+
+связывает субъект совпадениями из индекса и вычисляет остаток BGP уже
+с ним (через обычный evalPart, то есть с планировщиком). Регистр не
+важен, «*» в конце слова — поиск по префиксу.
+
+Индекс кэшируется в <граф>.text.pkl по версии содержимого графа.
+
+    python text_index.py "lov*"                  # субъекты и их метки
+    python text_index.py "director" --field job
+"""
+import argparse
+import os
+import pickle
+import re
+import sys
+import time
+from bisect import bisect_left
+
+import numpy as np
+from rdflib import Literal, Namespace, Variable
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql.algebra import BGP
+from rdflib.plugins.sparql.evaluate import evalPart
+from rdflib.plugins.sparql.sparql import AlreadyBound, SPARQLError
+
+import query_planner
+
+FR = Namespace("http://example.org/film-rating#")
+
+HOOK = "text_match"
+TEXT_INDEX_VERSION = 1
+
+# индексируемые свойства; номер в списке — doc_fields
+FIELDS = [FR.label, FR.movieTitle, FR.characterName, FR.crewJob]
+# магическое свойство -> индексируемое свойство (None — любое из FIELDS)
+MATCH_PREDICATES = {
+    FR.textMatch: None,
+    FR.labelMatch: FR.label,
+    FR.titleMatch: FR.movieTitle,
+    FR.characterMatch: FR.characterName,
+    FR.jobMatch: FR.crewJob,
+}
+# имя для --field в CLI
+FIELD_NAMES = {"label": FR.label, "title": FR.movieTitle, "character": FR.characterName,
+               "job": FR.crewJob}
+
+WORD = re.compile(r"\w+")
+QUERY_WORD = re.compile(r"(\w+)(\*?)")
+# больше любого символа: все слова с префиксом p лежат в [p, p + LAST)
+LAST = chr(0x10FFFF)
+
+
+def text_index_path(graph_path):
+    return graph_path + ".text.pkl"
+
+
+def words(text):
+    """Слова литерала без учёта регистра."""
+    return WORD.findall(str(text).casefold())
+
+
+def parse_query(text):
+    """'Lov* story' -> [("lov", True), ("story", False)]: (слово, по префиксу)."""
+    return [(word, star == "*") for word, star in QUERY_WORD.findall(str(text).casefold())]
+
+
+# === Индекс ===
+
+class TextIndex:
+    def __init__(self, version=None):
+        self.version = version
+        self.format = TEXT_INDEX_VERSION
+        self.subjects = []
+        self.vocabulary = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int32)
+        self.doc_subjects = np.zeros(0, dtype=np.int32)
+        self.doc_fields = np.zeros(0, dtype=np.int8)
+
+    @classmethod
+    def build(cls, graph, version=None):
+        index = cls(version)
+        subject_ids = {}
+        doc_subjects, doc_fields = [], []
+        pair_words, pair_docs = [], []
+        for field, predicate in enumerate(FIELDS):
+            for s, o in graph.subject_objects(predicate):
+                if not isinstance(o, Literal):
+                    continue
+                doc = len(doc_subjects)
+                sid = subject_ids.get(s)
+                if sid is None:
+                    sid = subject_ids[s] = len(index.subjects)
+                    index.subjects.append(s)
+                doc_subjects.append(sid)
+                doc_fields.append(field)
+                # слово считается один раз на документ
+                for word in set(words(o)):
+                    pair_words.append(word)
+                    pair_docs.append(doc)
+
+        vocabulary, word_ids = np.unique(np.array(pair_words, dtype=str), return_inverse=True)
+        docs = np.array(pair_docs, dtype=np.int32)
+        order = np.lexsort((docs, word_ids))
+        index.vocabulary = vocabulary.tolist()
+        index.postings = docs[order]
+        index.offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(word_ids, minlength=len(vocabulary))))).astype(np.int64)
+        index.doc_subjects = np.array(doc_subjects, dtype=np.int32)
+        index.doc_fields = np.array(doc_fields, dtype=np.int8)
+        return index
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if not isinstance(index, cls) or index.format != TEXT_INDEX_VERSION:
+            raise ValueError(f"{path}: не текстовый индекс версии {TEXT_INDEX_VERSION}")
+        return index
+
+    # === Поиск ===
+
+    def _docs(self, word, prefix):
+        """Документы со словом word (или со словом, которое с него начинается)."""
+        lo = bisect_left(self.vocabulary, word)
+        if prefix:
+            hi = bisect_left(self.vocabulary, word + LAST, lo)
+        else:
+            hi = lo + 1 if lo < len(self.vocabulary) and self.vocabulary[lo] == word else lo
+        docs = self.postings[self.offsets[lo]:self.offsets[hi]]
+        # у одного документа может быть несколько слов с этим префиксом
+        return np.unique(docs) if prefix and hi - lo > 1 else docs
+
+    def search(self, text, field=None):
+        """Субъекты, у которых в одном литерале есть все слова запроса text."""
+        terms = parse_query(text)
+        if not terms:
+            return []
+        # сначала самые редкие слова: пересечения дальше только сужаются
+        postings = sorted((self._docs(word, prefix) for word, prefix in terms), key=len)
+        docs = postings[0]
+        for found in postings[1:]:
+            if len(docs) == 0:
+                return []
+            docs = np.intersect1d(docs, found, assume_unique=True)
+        if field is not None:
+            docs = docs[self.doc_fields[docs] == FIELDS.index(field)]
+        return [self.subjects[i] for i in np.unique(self.doc_subjects[docs]).tolist()]
+
+
+def graph_text_index(graph):
+    """
+    Индекс графа: уже привязанный, из <граф>.text.pkl той же версии или
+    построенный заново (и сохранённый рядом с графом, если он из файла).
+    """
+    index = getattr(graph, "text_index", None)
+    version = getattr(graph, "content_version", None)
+    if index is not None and index.version == version:
+        return index
+    path = getattr(graph, "source_path", None)
+    index = None
+    if path and version and os.path.exists(text_index_path(path)):
+        try:
+            index = TextIndex.load(text_index_path(path))
+        except (OSError, ValueError, AttributeError, pickle.UnpicklingError) as e:
+            print(f"Текстовый индекс {text_index_path(path)} не прочитан ({e}), строим заново")
+        if index is not None and index.version != version:
+            index = None
+    if index is None:
+        index = TextIndex.build(graph, version)
+        if path and version:
+            index.save(text_index_path(path))
+    graph.text_index = index
+    return index
+
+
+# === Магическое свойство в SPARQL ===
+
+def enable():
+    """Включает хук; он должен идти раньше stats_reorder, поэтому остальные переставляются за него."""
+    others = {name: CUSTOM_EVALS.pop(name) for name in list(CUSTOM_EVALS) if name != HOOK}
+    CUSTOM_EVALS[HOOK] = evaluate
+    CUSTOM_EVALS.update(others)
+    # группы с магическими паттернами планировщик не берёт: их BGP придут сюда
+    query_planner.MAGIC_PREDICATES.update(MATCH_PREDICATES)
+
+
+def disable():
+    CUSTOM_EVALS.pop(HOOK, None)
+    query_planner.MAGIC_PREDICATES.difference_update(MATCH_PREDICATES)
+
+
+def _run(ctx, index, matches, rest, i=0):
+    if i == len(matches):
+        if rest.triples:
+            yield from evalPart(ctx, rest)
+        else:
+            yield ctx.solution()
+        return
+    s, p, o = matches[i]
+    text = ctx[o] if isinstance(o, Variable) else o
+    if text is None:
+        raise SPARQLError(f"{p.n3()}: у {o.n3()} нет значения — нужен текст запроса")
+    found = index.search(text, MATCH_PREDICATES[p])
+    bound = ctx[s]
+    if bound is not None:
+        if bound in set(found):
+            yield from _run(ctx, index, matches, rest, i + 1)
+        return
+    for subject in found:
+        c = ctx.push()
+        try:
+            c[s] = subject
+        except AlreadyBound:
+            continue
+        yield from _run(c, index, matches, rest, i + 1)
+
+
+def evaluate(ctx, part):
+    """Хук CUSTOM_EVALS: BGP с fr:textMatch / fr:labelMatch / ... ."""
+    if part.name != "BGP":
+        raise NotImplementedError
+    matches = [t for t in part.triples if t[1] in MATCH_PREDICATES]
+    if not matches:
+        raise NotImplementedError
+    rest = BGP([t for t in part.triples if t[1] not in MATCH_PREDICATES])
+    return _run(ctx, graph_text_index(ctx.graph), matches, rest)
+
+
+# === Поиск из командной строки ===
+
+def main():
+    import sparql
+
+    parser = argparse.ArgumentParser(description="Поиск по словам в метках, названиях, "
+                                                 "ролях и должностях графа")
+    parser.add_argument("text", help="слова запроса; «*» в конце слова — по префиксу")
+    parser.add_argument("--field", choices=sorted(FIELD_NAMES),
+                        help="искать только в этом свойстве (по умолчанию — во всех)")
+    parser.add_argument("--graph", default=sparql.RDF_FILE)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    graph = sparql.load_graph(args.graph)
+    start = time.perf_counter()
+    index = graph_text_index(graph)
+    print(f"Индекс: {len(index.vocabulary):,} слов, {len(index.doc_subjects):,} литералов, "
+          f"{time.perf_counter() - start:.2f} сек")
+
+    enable()
+    predicate = {None: FR.textMatch, FR.label: FR.labelMatch, FR.movieTitle: FR.titleMatch,
+                 FR.characterName: FR.characterMatch, FR.crewJob: FR.jobMatch}[
+        FIELD_NAMES.get(args.field)]
+    query = f"""
+        SELECT ?s ?text WHERE {{
+          ?s {predicate.n3()} ?q .
+          ?s ?p ?text .
+          VALUES ?p {{ {" ".join(p.n3() for p in FIELDS)} }}
+        }}
+        ORDER BY ?s LIMIT {args.limit}
+    """
+    start = time.perf_counter()
+    rows = list(graph.query(query, initBindings={"q": Literal(args.text)}))
+    for s, text in rows:
+        print(f"{s}  {text}")
+    print(f"Найдено: {len(rows)} ({time.perf_counter() - start:.3f} сек)")
+    return 0
+
+
+if __name__ == "__main__":
+    # через импорт: иначе индекс запишется в pickle как __main__.TextIndex
+    import text_index
+
+    sys.exit(text_index.main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Массовый разбор вложенных колонок TMDB (genres, keywords, cast, crew, ...).
+
+В CSV эти колонки — JSON-строки вида
+"[{"id": 28, "name": "Action"}, ...]".
+Вместо iterrows + ast.literal_eval на каждую ячейку колонка разбирается
+целиком: все ячейки склеиваются в один JSON-массив и парсятся одним
+вызовом C-парсера. На выходе — плоские типизированные таблицы
+(movie_id, entity_id / code / person_id, name, ...), одна строка на
+вложенный объект.
+"""
+import ast
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    # orjson заметно быстрее стандартного json, но не обязателен
+    import orjson
+
+    _json_loads = orjson.loads
+    _JSON_ERRORS = (orjson.JSONDecodeError,)
+except ImportError:
+    _json_loads = json.loads
+    _JSON_ERRORS = (ValueError,)
+
+
+# === Описание вложенных колонок ===
+# колонка CSV -> (имя таблицы, [(поле JSON, колонка таблицы, тип)])
+# "int" -> pandas Int64 (с пропусками), "str" -> object со значениями str/None
+
+ENTITY_FIELDS = [("id", "entity_id", "int"), ("name", "name", "str")]
+
+NESTED_COLUMNS = {
+    "genres": ("genres", ENTITY_FIELDS),
+    "keywords": ("keywords", ENTITY_FIELDS),
+    "production_companies": ("companies", ENTITY_FIELDS),
+    "production_countries": ("countries", [
+        ("iso_3166_1", "code", "str"),
+        ("name", "name", "str"),
+    ]),
+    "spoken_languages": ("languages", [
+        ("iso_639_1", "code", "str"),
+        ("name", "name", "str"),
+    ]),
+    "cast": ("cast", [
+        ("id", "person_id", "int"),
+        ("name", "name", "str"),
+        ("character", "character", "str"),
+        ("order", "order", "int"),
+        ("cast_id", "cast_id", "int"),
+        ("gender", "gender", "int"),
+        ("credit_id", "credit_id", "str"),
+    ]),
+    "crew": ("crew", [
+        ("id", "person_id", "int"),
+        ("name", "name", "str"),
+        ("job", "job", "str"),
+        ("department", "department", "str"),
+        ("credit_id", "credit_id", "str"),
+        ("gender", "gender", "int"),
+    ]),
+}
+
+MOVIE_COLUMNS = ["genres", "keywords", "production_companies",
+                 "production_countries", "spoken_languages"]
+CREDIT_COLUMNS = ["cast", "crew"]
+
+
+# === Разбор ===
+
+def parse_json_list(value):
+    """
+    Разбор одной ячейки. JSON-парсер, а если ячейка оказалась
+    Python-литералом (одинарные кавычки) — ast.literal_eval как запасной путь.
+    """
+    if not isinstance(value, str) or not value.strip():
+        return []
+    try:
+        parsed = _json_loads(value)
+    except _JSON_ERRORS:
+        try:
+            parsed = ast.literal_eval(value)
+        except Exception:
+            return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def parse_json_column(cells):
+    """
+    Разбор целой колонки одним вызовом парсера.
+    Возвращает список списков — по одному на ячейку.
+    Если хоть одна ячейка невалидна, откатываемся на разбор по ячейкам.
+    """
+    parts = [c if isinstance(c, str) and c.strip() else "[]" for c in cells]
+    try:
+        parsed = _json_loads("[" + ",".join(parts) + "]")
+    except _JSON_ERRORS:
+        parsed = None
+    if (parsed is None or len(parsed) != len(parts)
+            or not all(isinstance(p, list) for p in parsed)):
+        parsed = [parse_json_list(c) for c in parts]
+    return parsed
+
+
+def _typed_column(values, kind):
+    if kind == "int":
+        return pd.to_numeric(values, errors="coerce").astype("Int64")
+    col = values.astype(object)
+    return col.where(col.notna(), None)
+
+
+def explode_column(movie_ids, cells, fields):
+    """
+    Одна вложенная колонка -> плоская таблица
+    (movie_id, <поля из fields>), одна строка на вложенный объект.
+    """
+    parsed = parse_json_column(cells)
+    lengths = np.fromiter((len(p) for p in parsed), dtype=np.int64, count=len(parsed))
+    records = [obj if isinstance(obj, dict) else {} for p in parsed for obj in p]
+
+    json_fields = [f for f, _, _ in fields]
+    raw = pd.DataFrame.from_records(records, columns=json_fields)
+
+    table = pd.DataFrame({"movie_id": np.repeat(np.asarray(movie_ids, dtype=np.int64), lengths)})
+    for field, column, kind in fields:
+        col = _typed_column(raw[field], kind)
+        # с явным dtype: из голого object-массива pandas 3 выведет str, и None станут NaN
+        table[column] = pd.Series(col.to_numpy(), index=table.index, dtype=col.dtype)
+    return table
+
+
+def parse_nested_columns(df, id_column="id", columns=None):
+    """
+    Разбирает все (или только перечисленные) вложенные колонки df.
+    Возвращает dict: имя таблицы -> DataFrame,
+    например {"genres": ..., "cast": ..., "crew": ...}.
+    """
+    if columns is None:
+        columns = [c for c in NESTED_COLUMNS if c in df.columns]
+    movie_ids = df[id_column].to_numpy()
+
+    tables = {}
+    for column in columns:
+        name, fields = NESTED_COLUMNS[column]
+        tables[name] = explode_column(movie_ids, df[column].tolist(), fields)
+    return tables
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Слой между билдерами и хранилищем триплетов.
+
+- интернирует URIRef/Literal: один объект на каждый person/genre/... и
+  на повторяющиеся литералы (crewJob, crewDepartment, castOrder);
+- пишет триплеты сущностей (rdf:type + fr:label) один раз на сущность,
+  а не на каждое упоминание в cast/crew;
+- с key_predicate рядом с label пишет его ключ (fr:labelKey — label в
+  нижнем регистре): фильтр по названию жанра становится точным
+  совпадением вместо CONTAINS(LCASE(...));
+- отдаёт триплеты в хранилище пачками через addN вместо g.add по одному.
+
+Хранилище — rdflib.Graph или любой объект с addN (например, писатели
+из rdf_writers).
+"""
+from itertools import repeat
+
+from rdflib import Graph, Literal
+from rdflib.term import Node
+from rdflib.namespace import RDF
+
+BATCH_SIZE = 10_000
+
+
+def label_key(label):
+    """Нормализованный ключ метки: без крайних пробелов, в нижнем регистре."""
+    return str(label).strip().lower()
+
+
+class TripleEmitter:
+    def __init__(self, store, label_predicate, batch_size=BATCH_SIZE, key_predicate=None):
+        self.store = store
+        self.label_predicate = label_predicate
+        self.key_predicate = key_predicate
+        self.batch_size = batch_size
+        # Graph.addN принимает квады и берёт только те, где контекст — он сам
+        self._context = store if isinstance(store, Graph) else None
+        self._batch = []
+        self._uris = {}
+        self._literals = {}
+        self._typed = set()
+        self._labelled = set()
+        self.emitted = 0
+        self.skipped = 0
+
+    # === интернирование термов ===
+
+    def uri(self, factory, *key):
+        """URI из помощника вида movie_uri(mid), один объект на ключ."""
+        cache_key = (factory, key)
+        term = self._uris.get(cache_key)
+        if term is None:
+            term = self._uris[cache_key] = factory(*key)
+        return term
+
+    def literal(self, value, datatype=None):
+        # тип значения в ключе: 1 == 1.0 == True, а литералы у них разные
+        cache_key = (value, type(value), datatype)
+        term = self._literals.get(cache_key)
+        if term is None:
+            term = self._literals[cache_key] = Literal(value, datatype=datatype)
+        return term
+
+    def clear_interned(self):
+        """
+        Забывает интернированные URI/литералы (но не то, какие сущности уже
+        описаны): при загрузке по пачкам кэш не растёт с числом фильмов.
+        """
+        self._uris.clear()
+        self._literals.clear()
+
+    # === эмиссия ===
+
+    def add(self, triple):
+        s, p, o = triple
+        self._batch.append((s, p, o, self._context))
+        if len(self._batch) >= self.batch_size:
+            self._send_batch()
+
+    def entity(self, uri, cls, label=None, datatype=None):
+        """Тип и label сущности — только при первом упоминании."""
+        if uri in self._typed:
+            self.skipped += 1
+        else:
+            self._typed.add(uri)
+            self.add((uri, RDF.type, cls))
+        if label:
+            # label может прийти не с первым упоминанием, поэтому отдельно
+            if uri in self._labelled:
+                self.skipped += 1
+            else:
+                self._labelled.add(uri)
+                self.add((uri, self.label_predicate, Literal(label, datatype=datatype)))
+                if self.key_predicate is not None:
+                    self.add((uri, self.key_predicate, Literal(label_key(label), datatype=datatype)))
+        return uri
+
+    def add_column(self, subjects, predicate, objects):
+        """
+        Целая колонка триплетов: subjects и objects — списки одной длины,
+        либо один из них — одиночный терм, общий для всех строк.
+        """
+        n = len(objects) if isinstance(subjects, Node) else len(subjects)
+        subjects = repeat(subjects, n) if isinstance(subjects, Node) else subjects
+        objects = repeat(objects, n) if isinstance(objects, Node) else objects
+        ctx = self._context
+        self._batch.extend((s, predicate, o, ctx) for s, o in zip(subjects, objects))
+        if len(self._batch) >= self.batch_size:
+            self._send_batch()
+
+    def entities(self, uris, cls, labels=None, datatype=None):
+        """entity() для колонки упоминаний, без вызова на каждую строку."""
+        new = [u for u in dict.fromkeys(uris) if u not in self._typed]
+        self._typed.update(new)
+        self.skipped += len(uris) - len(new)
+        self.add_column(new, RDF.type, cls)
+        if labels is None:
+            return
+        first = {}
+        mentions = 0
+        for uri, label in zip(uris, labels):
+            if label:
+                mentions += 1
+                first.setdefault(uri, label)
+        new = [(u, label) for u, label in first.items() if u not in self._labelled]
+        self._labelled.update(u for u, _ in new)
+        self.skipped += mentions - len(new)
+        self.add_column([u for u, _ in new], self.label_predicate,
+                        [Literal(label, datatype=datatype) for _, label in new])
+        if self.key_predicate is not None:
+            self.add_column([u for u, _ in new], self.key_predicate,
+                            [Literal(label_key(label), datatype=datatype) for _, label in new])
+
+    def _send_batch(self):
+        if self._batch:
+            self.store.addN(self._batch)
+            self.emitted += len(self._batch)
+            self._batch = []
+
+    def flush(self):
+        """Отдаёт остаток пачки; потоковым писателям — ещё и конец блока."""
+        self._send_batch()
+        if hasattr(self.store, "flush"):
+            self.store.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()